@@ -1,14 +1,16 @@
 from test_pytorch_nn import train_nn#, fire_nn
 from test_pytorch_nn_sigmoid import train_nn_sigmoid, fire_nn
 import torch
-import xlrd
+import os.path
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'conic_disp_training_generation'))
+from dispatch.workbook_cache import load_workbook
 import xlsxwriter
 import numpy as np
 from numpy import degrees, radians, sin, cos, tan, arcsin, arccos
 import datetime
 import matplotlib as plt
 import time
-import os.path
 ####### dispatch the neural network in a receding horizon
 
 def receding_horizon():
@@ -17,48 +19,46 @@ def receding_horizon():
     ngens = 14
     one_year_in = 365*24+1
     # load forecast data
-    wb = xlrd.open_workbook('campus_testdata_2011_2014.xlsx')
-    sheet = wb.sheet_by_index(0)
+    sheet = load_workbook('campus_testdata_2011_2014.xlsx')[0]
     inputs = torch.zeros(ndisps+horizon,4)#18
     renew_gen = torch.zeros(ndisps+horizon,1)
 
     for row in range(ndisps+horizon):
         r = row
-        inputs[r, 0] = sheet.cell_value(row+1, 6) #E_demand
-        inputs[r, 1] = sheet.cell_value(row+1, 7) #H_demand
-        inputs[r, 2] = sheet.cell_value(row+1, 8) #C_demand
-        inputs[r, 3] = sheet.cell_value(row+1, 11) #cost
-        date = [datetime.datetime(int(sheet.cell_value(row+1,0)), 
-            int(sheet.cell_value(row+1,1)), int(sheet.cell_value(row+1,2)),
-            int(sheet.cell_value(row+1,3)), int(sheet.cell_value(row+1,4)), 
-            int(sheet.cell_value(row+1,5)))]
-        #renew_power = renewable_out(sheet.cell_value(row+1,10), date)
+        inputs[r, 0] = sheet[row+1, 6] #E_demand
+        inputs[r, 1] = sheet[row+1, 7] #H_demand
+        inputs[r, 2] = sheet[row+1, 8] #C_demand
+        inputs[r, 3] = sheet[row+1, 11] #cost
+        date = [datetime.datetime(int(sheet[row+1,0]), 
+            int(sheet[row+1,1]), int(sheet[row+1,2]),
+            int(sheet[row+1,3]), int(sheet[row+1,4]), 
+            int(sheet[row+1,5]))]
+        #renew_power = renewable_out(sheet[row+1,10], date)
         #renew_gen[r, 0] = renew_power[0]
-        renew_gen[r,0] = sheet.cell_value(row+1,12) #solar generation
+        renew_gen[r,0] = sheet[row+1,12] #solar generation
         inputs[r,0] = inputs[r,0]-renew_gen[r,0]
 
     #inputs[:,0] -= renew_gen
 
     #read in initial condition
-    wb = xlrd.open_workbook('Campus_MI_18component.xlsx')
-    sheet = wb.sheet_by_index(0)
+    sheet = load_workbook('Campus_MI_18component.xlsx')[0]
     IC = torch.zeros(horizon,14)
     for row in range(one_year_in,one_year_in+horizon):
         r = row-365*24-1
-        IC[r,0] = sheet.cell_value(row,2)/7000#GT1
-        IC[r,1] = sheet.cell_value(row,3)/5000#GT2
-        IC[r,2] = sheet.cell_value(row,4)/2000#FC1
-        IC[r,3] = sheet.cell_value(row,5)/2000#FC2
-        IC[r,4] = sheet.cell_value(row,6)/500#sGT
-        IC[r,5] = sheet.cell_value(row,7)/1500#Diesel
-        IC[r,6] = sheet.cell_value(row,8)/20000#Heater
-        IC[r,7] = sheet.cell_value(row,9)/10000#chiller1
-        IC[r,8] = sheet.cell_value(row,10)/10000#chiller2
-        IC[r,9] = sheet.cell_value(row,11)/7500#small Chiller1
-        IC[r,10] = sheet.cell_value(row,12)/7500#small Chiller2
-        IC[r,11] = sheet.cell_value(row,13)/30000#battery
-        IC[r,12] = sheet.cell_value(row,14)/75000#hot water tank
-        IC[r,13] = sheet.cell_value(row,15)/200000#cold water tank    
+        IC[r,0] = sheet[row,2]/7000#GT1
+        IC[r,1] = sheet[row,3]/5000#GT2
+        IC[r,2] = sheet[row,4]/2000#FC1
+        IC[r,3] = sheet[row,5]/2000#FC2
+        IC[r,4] = sheet[row,6]/500#sGT
+        IC[r,5] = sheet[row,7]/1500#Diesel
+        IC[r,6] = sheet[row,8]/20000#Heater
+        IC[r,7] = sheet[row,9]/10000#chiller1
+        IC[r,8] = sheet[row,10]/10000#chiller2
+        IC[r,9] = sheet[row,11]/7500#small Chiller1
+        IC[r,10] = sheet[row,12]/7500#small Chiller2
+        IC[r,11] = sheet[row,13]/30000#battery
+        IC[r,12] = sheet[row,14]/75000#hot water tank
+        IC[r,13] = sheet[row,15]/200000#cold water tank    
         
     # train NN
     layers = 7
@@ -1,7 +1,10 @@
 from test_pytorch_nn_wsu import train_nn#, fire_nn
 from test_pytorch_nn_sigmoid_wsu_transfer_base import train_nn_sigmoid, fire_nn
 import torch
-import xlrd
+import os.path
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'conic_disp_training_generation'))
+from dispatch.workbook_cache import load_workbook
 import xlsxwriter
 import numpy as np
 from numpy import degrees, radians, sin, cos, tan, arcsin, arccos
@@ -16,84 +19,82 @@ def receding_horizon():
     ngens = 23
     one_year_in = 365*24+1
     # load forecast data
-    wb = xlrd.open_workbook('c:/Users/Nadia Panossian/Documents/GitHub/EAGERS_wsu/GUI/Optimization/Results/wsu_campus_2009_2012.xlsx')
-    sheet = wb.sheet_by_index(0)
+    sheet = load_workbook('c:/Users/Nadia Panossian/Documents/GitHub/EAGERS_wsu/GUI/Optimization/Results/wsu_campus_2009_2012.xlsx')[0]
     inputs = torch.zeros(ndisps+horizon,16)#18
     renew_gen = torch.zeros(ndisps+horizon,1)
-    e_dem_max = [3787.993,6311.181,4533.527,378.7993]#sheet.cell_value(1,7)
-    h_dem_max = [7570.097,12612.55,9060.006,757.0097]#sheet.cell_value(1,8)
-    c_dem_max = [8345.065,13903.73,9987.5,834.5065]#sheet.cell_value(1,9)
+    e_dem_max = [3787.993,6311.181,4533.527,378.7993]#sheet[1,7]
+    h_dem_max = [7570.097,12612.55,9060.006,757.0097]#sheet[1,8]
+    c_dem_max = [8345.065,13903.73,9987.5,834.5065]#sheet[1,9]
     cost_max = 0.07
 
     for row in range(ndisps+horizon):
         r = row
-        inputs[row,0] = sheet.cell_value(row+1,0)*38480/117415.7#/e_dem_max[2]#E_dem_0
-        inputs[row,1] = sheet.cell_value(row+1,0)*38480/117415.7#/e_dem_max[2]#E_dem_1
-        inputs[row,2] = sheet.cell_value(row+1,0)*32152/117415.7#/e_dem_max[0]#E_dem_2
-        inputs[row,3] = sheet.cell_value(row+1,0)*53568.5/117415.7#/e_dem_max[1]#E_dem_3
-        inputs[row,4] = sheet.cell_value(row+1,0)*3215.2/117415.7#/e_dem_max[3]#E_dem_4
-        inputs[row,5] = sheet.cell_value(row+1,0)*38480/117415.7#/e_dem_max[2]#E_dem_5
-        inputs[row,6] = sheet.cell_value(row+1,0)*3215.2/117415.7#/e_dem_max[3]#E_dem_6
-        inputs[row,7] = sheet.cell_value(row+1,1)*32152/117415.7#/h_dem_max[0]#H_dem_2
-        inputs[row,8] = sheet.cell_value(row+1,1)*53568.5/117415.7#/h_dem_max[1]#H_dem_3
-        inputs[row,9] = sheet.cell_value(row+1,1)*38480/117415.7#/h_dem_max[2]#H_dem_4
-        inputs[row,10] = sheet.cell_value(row+1,1)*3215.2/117415.7#/h_dem_max[3]#H_dem_5
-        inputs[row,11] = sheet.cell_value(row+1,2)*32152/117415.7#/c_dem_max[0]#C_dem_2
-        inputs[row,12] = sheet.cell_value(row+1,2)*53568.5/117415.7#/c_dem_max[1]#C_dem_3
-        inputs[row,13] = sheet.cell_value(row+1,2)*38480/117415.7#/c_dem_max[2]#C_dem_4
-        inputs[row,14] = sheet.cell_value(row+1,2)*3215.2/117415.7#/c_dem_max[3]#C_dem_5
-        inputs[row,15] = 1#sheet.cell_value(row+1,4) #utility electric cost
-        # inputs[r, 0] = sheet.cell_value(row+1, 6) #E_demand
-        # inputs[r, 1] = sheet.cell_value(row+1, 7) #H_demand
-        # inputs[r, 2] = sheet.cell_value(row+1, 8) #C_demand
-        # inputs[r, 3] = sheet.cell_value(row+1, 11) #cost
+        inputs[row,0] = sheet[row+1,0]*38480/117415.7#/e_dem_max[2]#E_dem_0
+        inputs[row,1] = sheet[row+1,0]*38480/117415.7#/e_dem_max[2]#E_dem_1
+        inputs[row,2] = sheet[row+1,0]*32152/117415.7#/e_dem_max[0]#E_dem_2
+        inputs[row,3] = sheet[row+1,0]*53568.5/117415.7#/e_dem_max[1]#E_dem_3
+        inputs[row,4] = sheet[row+1,0]*3215.2/117415.7#/e_dem_max[3]#E_dem_4
+        inputs[row,5] = sheet[row+1,0]*38480/117415.7#/e_dem_max[2]#E_dem_5
+        inputs[row,6] = sheet[row+1,0]*3215.2/117415.7#/e_dem_max[3]#E_dem_6
+        inputs[row,7] = sheet[row+1,1]*32152/117415.7#/h_dem_max[0]#H_dem_2
+        inputs[row,8] = sheet[row+1,1]*53568.5/117415.7#/h_dem_max[1]#H_dem_3
+        inputs[row,9] = sheet[row+1,1]*38480/117415.7#/h_dem_max[2]#H_dem_4
+        inputs[row,10] = sheet[row+1,1]*3215.2/117415.7#/h_dem_max[3]#H_dem_5
+        inputs[row,11] = sheet[row+1,2]*32152/117415.7#/c_dem_max[0]#C_dem_2
+        inputs[row,12] = sheet[row+1,2]*53568.5/117415.7#/c_dem_max[1]#C_dem_3
+        inputs[row,13] = sheet[row+1,2]*38480/117415.7#/c_dem_max[2]#C_dem_4
+        inputs[row,14] = sheet[row+1,2]*3215.2/117415.7#/c_dem_max[3]#C_dem_5
+        inputs[row,15] = 1#sheet[row+1,4] #utility electric cost
+        # inputs[r, 0] = sheet[row+1, 6] #E_demand
+        # inputs[r, 1] = sheet[row+1, 7] #H_demand
+        # inputs[r, 2] = sheet[row+1, 8] #C_demand
+        # inputs[r, 3] = sheet[row+1, 11] #cost
         #date = 
-        # date = [datetime.datetime(int(sheet.cell_value(row+1,0)), 
-        #     int(sheet.cell_value(row+1,1)), int(sheet.cell_value(row+1,2)),
-        #     int(sheet.cell_value(row+1,3)), int(sheet.cell_value(row+1,4)), 
-        #     int(sheet.cell_value(row+1,5)))]
-        #renew_power = renewable_out(sheet.cell_value(row+1,10), date)
+        # date = [datetime.datetime(int(sheet[row+1,0]), 
+        #     int(sheet[row+1,1]), int(sheet[row+1,2]),
+        #     int(sheet[row+1,3]), int(sheet[row+1,4]), 
+        #     int(sheet[row+1,5]))]
+        #renew_power = renewable_out(sheet[row+1,10], date)
         #renew_gen[r, 0] = renew_power[0]
         
 
     #inputs[:,0] -= renew_gen
 
     #read in initial condition
-    wb = xlrd.open_workbook('c:/Users/Nadia Panossian/Documents/GitHub/EAGERS_wsu/GUI/Optimization/Results/wsu_cqp.xlsx')
-    sheet = wb.sheet_by_index(0)
+    sheet = load_workbook('c:/Users/Nadia Panossian/Documents/GitHub/EAGERS_wsu/GUI/Optimization/Results/wsu_cqp.xlsx')[0]
     IC = torch.zeros(horizon,26)
     for row in range(one_year_in,one_year_in+horizon):
         r = row-365*24-1
-        IC[r,0] = sheet.cell_value(row,3)/2500#GT1
-        IC[r,1] = sheet.cell_value(row,15)/2187.5#GT2
-        IC[r,2] = sheet.cell_value(row,24)/1375#GT3
-        IC[r,3] = sheet.cell_value(row,25)/1375#GT4
-        IC[r,4] = sheet.cell_value(row,6)/20000#boiler1
-        IC[r,5] = sheet.cell_value(row,17)/20000#boiler2
-        IC[r,6] = sheet.cell_value(row,18)/20000#boiler3
-        IC[r,7] = sheet.cell_value(row,19)/20000#boiler4
-        IC[r,8] = sheet.cell_value(row,20)/20000#boiler5
-        IC[r,9] = sheet.cell_value(row,4)/(7.279884675000000e+03)#carrier1
-        IC[r,10] = sheet.cell_value(row,7)/(5.268245045000001e+03)#york1
-        IC[r,11] = sheet.cell_value(row,8)/(5.268245045000001e+03)#york3
-        IC[r,12] = sheet.cell_value(row,9)/(5.275278750000000e+03)#carrier7
-        IC[r,13] = sheet.cell_value(row,10)/(5.275278750000000e+03)#carrier8    
-        IC[r,14] = sheet.cell_value(row,11)/(4.853256450000000e+03)#carrier2
-        IC[r,15] = sheet.cell_value(row,12)/(4.853256450000000e+03)#carrier3
-        IC[r,16] = sheet.cell_value(row,13)/(1.758426250000000e+03)#carrier4
-        IC[r,17] = sheet.cell_value(row,14)/(1.415462794200000e+03)#trane
-        IC[r,18] = sheet.cell_value(row,5)/2000000#cold water tank
-
-        IC[r,19] = .9/1.1#sheet.cell_value(row,11)#voltage0
-        IC[r,20] = 1.1/1.1#sheet.cell_value(row,12)#voltage1
-        IC[r,21] = .9/1.1#sheet.cell_value(row,13)#voltage2
-        IC[r,22] = .9/1.1#sheet.cell_value(row,13)#voltage3
-        IC[r,23] = .9/1.1#sheet.cell_value(row,14)#voltage4
-        IC[r,24] = .9/1.1#sheet.cell_value(row,15)#voltage5
+        IC[r,0] = sheet[row,3]/2500#GT1
+        IC[r,1] = sheet[row,15]/2187.5#GT2
+        IC[r,2] = sheet[row,24]/1375#GT3
+        IC[r,3] = sheet[row,25]/1375#GT4
+        IC[r,4] = sheet[row,6]/20000#boiler1
+        IC[r,5] = sheet[row,17]/20000#boiler2
+        IC[r,6] = sheet[row,18]/20000#boiler3
+        IC[r,7] = sheet[row,19]/20000#boiler4
+        IC[r,8] = sheet[row,20]/20000#boiler5
+        IC[r,9] = sheet[row,4]/(7.279884675000000e+03)#carrier1
+        IC[r,10] = sheet[row,7]/(5.268245045000001e+03)#york1
+        IC[r,11] = sheet[row,8]/(5.268245045000001e+03)#york3
+        IC[r,12] = sheet[row,9]/(5.275278750000000e+03)#carrier7
+        IC[r,13] = sheet[row,10]/(5.275278750000000e+03)#carrier8    
+        IC[r,14] = sheet[row,11]/(4.853256450000000e+03)#carrier2
+        IC[r,15] = sheet[row,12]/(4.853256450000000e+03)#carrier3
+        IC[r,16] = sheet[row,13]/(1.758426250000000e+03)#carrier4
+        IC[r,17] = sheet[row,14]/(1.415462794200000e+03)#trane
+        IC[r,18] = sheet[row,5]/2000000#cold water tank
+
+        IC[r,19] = .9/1.1#sheet[row,11]#voltage0
+        IC[r,20] = 1.1/1.1#sheet[row,12]#voltage1
+        IC[r,21] = .9/1.1#sheet[row,13]#voltage2
+        IC[r,22] = .9/1.1#sheet[row,13]#voltage3
+        IC[r,23] = .9/1.1#sheet[row,14]#voltage4
+        IC[r,24] = .9/1.1#sheet[row,15]#voltage5
         IC[r,25] = .9/1.1#voltage6
     
     for row in range(ndisps+horizon):
-        rg = sheet.cell_value(row+1, 21) + sheet.cell_value(row+1,22)#sheet.cell_value(row+1,12) #solar generation
+        rg = sheet[row+1, 21] + sheet[row+1,22]#sheet[row+1,12] #solar generation
         inputs[row-2,6] = inputs[row-2,6]-max(rg,0)
         renew_gen[row] = rg
 
@@ -1,6 +1,9 @@
 #pytorch tests
 import numpy as np 
-import xlrd
+import os.path
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'conic_disp_training_generation'))
+from dispatch.workbook_cache import load_workbook
 import torch
 
 def train_nn_sigmoid(layers=4):
@@ -15,20 +18,19 @@ def train_nn_sigmoid(layers=4):
     t_db = []
     irrad = []
 
-    wb = xlrd.open_workbook('Campus_loads_weather.xlsx')
-    sheet = wb.sheet_by_index(0)
-    inputs= torch.zeros(sheet.nrows-3,4)#, device=device, dtype=dtype)
-    e_dem_max = sheet.cell_value(1,7)
-    h_dem_max = sheet.cell_value(1,8)
-    c_dem_max = sheet.cell_value(1,9)
-    cost_max = sheet.cell_value(1,12)
-    for row in range(2,sheet.nrows-1):
-        inputs[row-2,0] = sheet.cell_value(row,1)#E_dem
-        inputs[row-2,1] = sheet.cell_value(row,2)#H_dem
-        inputs[row-2,2] = sheet.cell_value(row,3)#C_dem
-        inputs[row-2,3] = sheet.cell_value(row,4)/cost_max #utility electric cost
-        #inputs[row-2,3] = sheet.cell_value(row,4)/sheet.cell_value(1,10)#Temp_db_C
-        #inputs[row-2,4] = sheet.cell_value(row,5)/sheet.cell_value(1,11)#Direct_normal_irradiance
+    sheet = load_workbook('Campus_loads_weather.xlsx')[0]
+    inputs= torch.zeros(sheet.shape[0]-3,4)#, device=device, dtype=dtype)
+    e_dem_max = sheet[1,7]
+    h_dem_max = sheet[1,8]
+    c_dem_max = sheet[1,9]
+    cost_max = sheet[1,12]
+    for row in range(2,sheet.shape[0]-1):
+        inputs[row-2,0] = sheet[row,1]#E_dem
+        inputs[row-2,1] = sheet[row,2]#H_dem
+        inputs[row-2,2] = sheet[row,3]#C_dem
+        inputs[row-2,3] = sheet[row,4]/cost_max #utility electric cost
+        #inputs[row-2,3] = sheet[row,4]/sheet[1,10]#Temp_db_C
+        #inputs[row-2,4] = sheet[row,5]/sheet[1,11]#Direct_normal_irradiance
         # load_e.append(row)
         # load_h.append(row[1])
         # load_c.append(row[2])
@@ -43,26 +45,25 @@ def train_nn_sigmoid(layers=4):
 
     print('inputs read')
 
-    wb = xlrd.open_workbook('Campus_MI_18component.xlsx')
-    sheet = wb.sheet_by_index(0)
-    disp = torch.zeros(sheet.nrows-2,14)#, device=device, dtype=dtype)
-    for row in range(1,sheet.nrows-1):
+    sheet = load_workbook('Campus_MI_18component.xlsx')[0]
+    disp = torch.zeros(sheet.shape[0]-2,14)#, device=device, dtype=dtype)
+    for row in range(1,sheet.shape[0]-1):
         r = row-1
-        inputs[r,0] -=sheet.cell_value(row,1)
-        disp[r,0] = sheet.cell_value(row,2)/7000#GT1
-        disp[r,1] = sheet.cell_value(row,3)/5000#GT2
-        disp[r,2] = sheet.cell_value(row,4)/2000#FC1
-        disp[r,3] = sheet.cell_value(row,5)/2000#FC2
-        disp[r,4] = sheet.cell_value(row,6)/500#sGT
-        disp[r,5] = sheet.cell_value(row,7)/1500#Diesel
-        disp[r,6] = sheet.cell_value(row,8)/20000#Heater
-        disp[r,7] = sheet.cell_value(row,9)/10000#chiller1
-        disp[r,8] = sheet.cell_value(row,10)/10000#chiller2
-        disp[r,9] = sheet.cell_value(row,11)/7500#small Chiller1
-        disp[r,10] = sheet.cell_value(row,12)/7500#small Chiller2
-        disp[r,11] = sheet.cell_value(row,13)/30000#battery
-        disp[r,12] = sheet.cell_value(row,14)/75000#hot water tank
-        disp[r,13] = sheet.cell_value(row,15)/200000#cold water tank
+        inputs[r,0] -=sheet[row,1]
+        disp[r,0] = sheet[row,2]/7000#GT1
+        disp[r,1] = sheet[row,3]/5000#GT2
+        disp[r,2] = sheet[row,4]/2000#FC1
+        disp[r,3] = sheet[row,5]/2000#FC2
+        disp[r,4] = sheet[row,6]/500#sGT
+        disp[r,5] = sheet[row,7]/1500#Diesel
+        disp[r,6] = sheet[row,8]/20000#Heater
+        disp[r,7] = sheet[row,9]/10000#chiller1
+        disp[r,8] = sheet[row,10]/10000#chiller2
+        disp[r,9] = sheet[row,11]/7500#small Chiller1
+        disp[r,10] = sheet[row,12]/7500#small Chiller2
+        disp[r,11] = sheet[row,13]/30000#battery
+        disp[r,12] = sheet[row,14]/75000#hot water tank
+        disp[r,13] = sheet[row,15]/200000#cold water tank
 
     inputs[:,0] = inputs[:,0]/e_dem_max#inputs[:,0] = (inputs[:,0]-min(inputs[:,0]))/max(inputs[:,0])
     #inputs[1:,4:] = disp[:-1,:]
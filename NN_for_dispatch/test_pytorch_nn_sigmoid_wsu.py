@@ -1,6 +1,9 @@
 #pytorch tests
 import numpy as np 
-import xlrd
+import os.path
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'conic_disp_training_generation'))
+from dispatch.workbook_cache import load_workbook
 import torch
 
 def train_nn_sigmoid(layers=4):
@@ -15,37 +18,36 @@ def train_nn_sigmoid(layers=4):
     t_db = []
     irrad = []
 
-    wb = xlrd.open_workbook('c:/Users/Nadia Panossian/Documents/GitHub/EAGERS_wsu/GUI/Optimization/Results/wsu_campus_2009_2012.xlsx')
-    sheet = wb.sheet_by_index(0)
+    sheet = load_workbook('c:/Users/Nadia Panossian/Documents/GitHub/EAGERS_wsu/GUI/Optimization/Results/wsu_campus_2009_2012.xlsx')[0]
     n_disps = 365*24
     inputs= torch.zeros(n_disps,16)#, device=device, dtype=dtype)
-    e_dem_max = [3787.993,6311.181,4533.527,378.7993]#sheet.cell_value(1,7)
-    h_dem_max = [7570.097,12612.55,9060.006,757.0097]#sheet.cell_value(1,8)
-    c_dem_max = [8345.065,13903.73,9987.5,834.5065]#sheet.cell_value(1,9)
-    cost_max = 0.07#sheet.cell_value(1,12)
+    e_dem_max = [3787.993,6311.181,4533.527,378.7993]#sheet[1,7]
+    h_dem_max = [7570.097,12612.55,9060.006,757.0097]#sheet[1,8]
+    c_dem_max = [8345.065,13903.73,9987.5,834.5065]#sheet[1,9]
+    cost_max = 0.07#sheet[1,12]
     for row in range(1,n_disps):
-        inputs[row-1,0] = sheet.cell_value(row,0)*38480/117415.7/e_dem_max[2]#E_dem_0
-        inputs[row-1,1] = sheet.cell_value(row,0)*38480/117415.7/e_dem_max[2]#E_dem_1
-        inputs[row-1,2] = sheet.cell_value(row,0)*32152/117415.7/e_dem_max[0]#E_dem_2
-        inputs[row-1,3] = sheet.cell_value(row,0)*53568.5/117415.7/e_dem_max[1]#E_dem_3
-        inputs[row-1,4] = sheet.cell_value(row,0)*3215.2/117415.7/e_dem_max[3]#E_dem_4
-        inputs[row-1,5] = sheet.cell_value(row,0)*38480/117415.7/e_dem_max[2]#E_dem_5
-        inputs[row-1,6] = sheet.cell_value(row,0)*3215.2/117415.7/e_dem_max[3]#E_dem_6
-        inputs[row-1,7] = sheet.cell_value(row,1)*32152/117415.7/h_dem_max[0]#H_dem_2
-        inputs[row-1,8] = sheet.cell_value(row,1)*53568.5/117415.7/h_dem_max[1]#H_dem_3
-        inputs[row-1,9] = sheet.cell_value(row,1)*38480/117415.7/h_dem_max[2]#H_dem_4
-        inputs[row-1,10] = sheet.cell_value(row,1)*3215.2/117415.7/h_dem_max[3]#H_dem_5
-        inputs[row-1,11] = sheet.cell_value(row,2)*32152/117415.7/c_dem_max[0]#C_dem_2
-        inputs[row-1,12] = sheet.cell_value(row,2)*53568.5/117415.7/c_dem_max[1]#C_dem_3
-        inputs[row-1,13] = sheet.cell_value(row,2)*38480/117415.7/c_dem_max[2]#C_dem_4
-        inputs[row-1,14] = sheet.cell_value(row,2)*3215.2/117415.7/c_dem_max[3]#C_dem_5
-        inputs[row-1,15] = sheet.cell_value(row,4) #utility electric cost
-        # inputs[row-2,0] = sheet.cell_value(row,1)#E_dem
-        # inputs[row-2,1] = sheet.cell_value(row,2)#H_dem
-        # inputs[row-2,2] = sheet.cell_value(row,3)#C_dem
-        # inputs[row-2,3] = sheet.cell_value(row,4)/cost_max #utility electric cost
-        #inputs[row-2,3] = sheet.cell_value(row,4)/sheet.cell_value(1,10)#Temp_db_C
-        #inputs[row-2,4] = sheet.cell_value(row,5)/sheet.cell_value(1,11)#Direct_normal_irradiance
+        inputs[row-1,0] = sheet[row,0]*38480/117415.7/e_dem_max[2]#E_dem_0
+        inputs[row-1,1] = sheet[row,0]*38480/117415.7/e_dem_max[2]#E_dem_1
+        inputs[row-1,2] = sheet[row,0]*32152/117415.7/e_dem_max[0]#E_dem_2
+        inputs[row-1,3] = sheet[row,0]*53568.5/117415.7/e_dem_max[1]#E_dem_3
+        inputs[row-1,4] = sheet[row,0]*3215.2/117415.7/e_dem_max[3]#E_dem_4
+        inputs[row-1,5] = sheet[row,0]*38480/117415.7/e_dem_max[2]#E_dem_5
+        inputs[row-1,6] = sheet[row,0]*3215.2/117415.7/e_dem_max[3]#E_dem_6
+        inputs[row-1,7] = sheet[row,1]*32152/117415.7/h_dem_max[0]#H_dem_2
+        inputs[row-1,8] = sheet[row,1]*53568.5/117415.7/h_dem_max[1]#H_dem_3
+        inputs[row-1,9] = sheet[row,1]*38480/117415.7/h_dem_max[2]#H_dem_4
+        inputs[row-1,10] = sheet[row,1]*3215.2/117415.7/h_dem_max[3]#H_dem_5
+        inputs[row-1,11] = sheet[row,2]*32152/117415.7/c_dem_max[0]#C_dem_2
+        inputs[row-1,12] = sheet[row,2]*53568.5/117415.7/c_dem_max[1]#C_dem_3
+        inputs[row-1,13] = sheet[row,2]*38480/117415.7/c_dem_max[2]#C_dem_4
+        inputs[row-1,14] = sheet[row,2]*3215.2/117415.7/c_dem_max[3]#C_dem_5
+        inputs[row-1,15] = sheet[row,4] #utility electric cost
+        # inputs[row-2,0] = sheet[row,1]#E_dem
+        # inputs[row-2,1] = sheet[row,2]#H_dem
+        # inputs[row-2,2] = sheet[row,3]#C_dem
+        # inputs[row-2,3] = sheet[row,4]/cost_max #utility electric cost
+        #inputs[row-2,3] = sheet[row,4]/sheet[1,10]#Temp_db_C
+        #inputs[row-2,4] = sheet[row,5]/sheet[1,11]#Direct_normal_irradiance
         # load_e.append(row)
         # load_h.append(row[1])
         # load_c.append(row[2])
@@ -61,54 +63,53 @@ def train_nn_sigmoid(layers=4):
 
     print('inputs read')
 
-    wb = xlrd.open_workbook('c:/Users/Nadia Panossian/Documents/GitHub/EAGERS_wsu/GUI/Optimization/Results/wsu_mod3.xlsx')
-    sheet = wb.sheet_by_index(0)
+    sheet = load_workbook('c:/Users/Nadia Panossian/Documents/GitHub/EAGERS_wsu/GUI/Optimization/Results/wsu_mod3.xlsx')[0]
     disp = torch.zeros(n_disps,23)#, device=device, dtype=dtype)
     for row in range(1,n_disps):
         r = row-1
-        # inputs[r,0] -=sheet.cell_value(row,1)
-        disp[r,0] = sheet.cell_value(row,3)/5000#GT1
-        disp[r,1] = sheet.cell_value(row,15)/43750#GT2
-        disp[r,2] = sheet.cell_value(row,24)/2750#GT3
-        disp[r,3] = sheet.cell_value(row,25)/2750#GT4
-        disp[r,4] = sheet.cell_value(row,6)/20000#boiler1
-        disp[r,5] = sheet.cell_value(row,17)/20000#boiler2
-        disp[r,6] = sheet.cell_value(row,18)/20000#boiler3
-        disp[r,7] = sheet.cell_value(row,19)/20000#boiler4
-        disp[r,8] = sheet.cell_value(row,20)/20000#boiler5
-        disp[r,9] = sheet.cell_value(row,4)/(7.279884675000000e+03)#carrier1
-        disp[r,10] = sheet.cell_value(row,7)/(5.268245045000001e+03)#york1
-        disp[r,11] = sheet.cell_value(row,8)/(5.268245045000001e+03)#york3
-        disp[r,12] = sheet.cell_value(row,9)/(5.275278750000000e+03)#carrier7
-        disp[r,13] = sheet.cell_value(row,10)/(5.275278750000000e+03)#carrier8
-        disp[r,14] = sheet.cell_value(row,11)/(4.853256450000000e+03)#carrier2
-        disp[r,15] = sheet.cell_value(row,12)/(4.853256450000000e+03)#carrier3
-        disp[r,16] = sheet.cell_value(row,13)/(1.758426250000000e+03)#carrier4
-        disp[r,17] = sheet.cell_value(row,14)/(1.415462794200000e+03)#trane
-        disp[r,18] = sheet.cell_value(row,5)/2000000#cold water tank
+        # inputs[r,0] -=sheet[row,1]
+        disp[r,0] = sheet[row,3]/5000#GT1
+        disp[r,1] = sheet[row,15]/43750#GT2
+        disp[r,2] = sheet[row,24]/2750#GT3
+        disp[r,3] = sheet[row,25]/2750#GT4
+        disp[r,4] = sheet[row,6]/20000#boiler1
+        disp[r,5] = sheet[row,17]/20000#boiler2
+        disp[r,6] = sheet[row,18]/20000#boiler3
+        disp[r,7] = sheet[row,19]/20000#boiler4
+        disp[r,8] = sheet[row,20]/20000#boiler5
+        disp[r,9] = sheet[row,4]/(7.279884675000000e+03)#carrier1
+        disp[r,10] = sheet[row,7]/(5.268245045000001e+03)#york1
+        disp[r,11] = sheet[row,8]/(5.268245045000001e+03)#york3
+        disp[r,12] = sheet[row,9]/(5.275278750000000e+03)#carrier7
+        disp[r,13] = sheet[row,10]/(5.275278750000000e+03)#carrier8
+        disp[r,14] = sheet[row,11]/(4.853256450000000e+03)#carrier2
+        disp[r,15] = sheet[row,12]/(4.853256450000000e+03)#carrier3
+        disp[r,16] = sheet[row,13]/(1.758426250000000e+03)#carrier4
+        disp[r,17] = sheet[row,14]/(1.415462794200000e+03)#trane
+        disp[r,18] = sheet[row,5]/2000000#cold water tank
 
-        disp[r,19] = 0.05#.9/1.1#sheet.cell_value(row,11)#GT1 Q
-        disp[r,20] = 0.05#1.1/1.1#sheet.cell_value(row,12)#GT2 Q
-        disp[r,21] = 0.05#.9/1.1#sheet.cell_value(row,13)#GT3 Q
-        disp[r,22] = 0.05#.9/1.1#sheet.cell_value(row,13)#GT4 Q
-        #disp[r,23] = #.9/1.1#sheet.cell_value(row,14)#voltage4
-        #disp[r,24] = #.9/1.1#sheet.cell_value(row,15)#voltage5
+        disp[r,19] = 0.05#.9/1.1#sheet[row,11]#GT1 Q
+        disp[r,20] = 0.05#1.1/1.1#sheet[row,12]#GT2 Q
+        disp[r,21] = 0.05#.9/1.1#sheet[row,13]#GT3 Q
+        disp[r,22] = 0.05#.9/1.1#sheet[row,13]#GT4 Q
+        #disp[r,23] = #.9/1.1#sheet[row,14]#voltage4
+        #disp[r,24] = #.9/1.1#sheet[row,15]#voltage5
         #disp[r,25] = #.9/1.1#voltage6
-        # disp[r,0] = sheet.cell_value(row,2)/7000#GT1
-        # disp[r,1] = sheet.cell_value(row,3)/5000#GT2
-        # disp[r,2] = sheet.cell_value(row,4)/2000#FC1
-        # disp[r,3] = sheet.cell_value(row,5)/2000#FC2
-        # disp[r,4] = sheet.cell_value(row,6)/500#sGT
-        # disp[r,5] = sheet.cell_value(row,7)/1500#Diesel
-        # disp[r,6] = sheet.cell_value(row,8)/20000#Heater
-        # disp[r,7] = sheet.cell_value(row,9)/10000#chiller1
-        # disp[r,8] = sheet.cell_value(row,10)/10000#chiller2
-        # disp[r,9] = sheet.cell_value(row,11)/7500#small Chiller1
-        # disp[r,10] = sheet.cell_value(row,12)/7500#small Chiller2
-        # disp[r,11] = sheet.cell_value(row,13)/30000#battery
-        # disp[r,12] = sheet.cell_value(row,14)/75000#hot water tank
-        # disp[r,13] = sheet.cell_value(row,15)/200000#cold water tank
-        renew_gen = sheet.cell_value(row+1, 21) + sheet.cell_value(row+1,22)#sheet.cell_value(row+1,12) #solar generation
+        # disp[r,0] = sheet[row,2]/7000#GT1
+        # disp[r,1] = sheet[row,3]/5000#GT2
+        # disp[r,2] = sheet[row,4]/2000#FC1
+        # disp[r,3] = sheet[row,5]/2000#FC2
+        # disp[r,4] = sheet[row,6]/500#sGT
+        # disp[r,5] = sheet[row,7]/1500#Diesel
+        # disp[r,6] = sheet[row,8]/20000#Heater
+        # disp[r,7] = sheet[row,9]/10000#chiller1
+        # disp[r,8] = sheet[row,10]/10000#chiller2
+        # disp[r,9] = sheet[row,11]/7500#small Chiller1
+        # disp[r,10] = sheet[row,12]/7500#small Chiller2
+        # disp[r,11] = sheet[row,13]/30000#battery
+        # disp[r,12] = sheet[row,14]/75000#hot water tank
+        # disp[r,13] = sheet[row,15]/200000#cold water tank
+        renew_gen = sheet[row+1, 21] + sheet[row+1,22]#sheet[row+1,12] #solar generation
         inputs[row-2,6] = inputs[row-2,6]-max(renew_gen,0)/e_dem_max[3]
 
     # inputs[:,0] = inputs[:,0]/e_dem_max#inputs[:,0] = (inputs[:,0]-min(inputs[:,0]))/max(inputs[:,0])
@@ -0,0 +1,205 @@
+'''
+Build time of the Gurobi dispatch model: matrix API against per scalar.
+GurobiDispatchModel creates each variable group with one addMVar and each
+constraint family with one matrix constraint. The per-scalar build below
+creates the same model the way gurobi_conic_opt.py does, with one addVar
+per scalar and piece and one addConstr per index, and the two models are
+checked to have the same number of variables and constraints.
+
+run from conic_disp_training_generation:
+    python -m benchmark.gurobi_build [T]
+'''
+
+import os
+import sys
+import time
+import pickle
+import itertools
+
+import numpy as np
+import gurobipy as gp
+from gurobipy import GRB
+
+from class_definition.plant_struct import Plant, Network, Optimoptions
+from class_definition.test_data import TestData
+from dispatch.gurobi_model import GurobiDispatchModel
+
+
+#one addVar per index and piece, like VariableGroup in gurobi_conic_opt.py
+def scalar_group(model, name, n, T, pieces=None, vtype=GRB.CONTINUOUS, lb=0.0, ub=GRB.INFINITY):
+    variables = {}
+    for i, t in itertools.product(range(n), range(T)):
+        lb_i = lb[i] if np.ndim(lb) else lb
+        ub_i = ub[i] if np.ndim(ub) else ub
+        if pieces is None:
+            variables[i,t] = model.addVar(lb=lb_i, ub=ub_i, vtype=vtype, name="{}_{}_{}".format(name, i, t))
+        else:
+            variables[i,t] = [model.addVar(lb=lb_i, ub=ub_i, vtype=vtype, name="{}_{}_{}[{}]".format(name, i, t, k)) for k in range(pieces[i])]
+    return variables
+
+#(fuel or power use, c, [(output, b, f)]) of each consumption curve of a unit
+def consume_terms(kind, f):
+    if kind == 'turbine':
+        return [('turbine_y', np.add(f["cp"], f["cq"]), [('xp', f["bp"], f["fp"]), ('xq', f["bq"], f["fq"])])]
+    if kind == 'dieselgen':
+        return [('dieselgen_y', -np.add(f["cp"], f["cq"]), [('xp', f["bp"], f["fp"]), ('xq', f["bq"], f["fq"])])]
+    if kind == 'boiler':
+        return [(None, f["d"], [('x', f["b"], f["f"])])]
+    return [('chiller_yp', f["cp"], [('x', f["bp"], f["fp"])]), ('chiller_yq', f["cq"], [('x', f["bq"], f["fq"])])]
+
+#the model of GurobiDispatchModel built one scalar at a time
+def build_scalar(dm):
+    T = dm.T
+    model = gp.Model("campus_disp_scalar", env=dm.env)
+    free = -GRB.INFINITY
+    v = {}
+    for name in ("ep_elecfromgrid", "eq_elecfromgrid", "ep_electogrid", "eq_electogrid"):
+        v[name] = scalar_group(model, name, dm.n_grid, T)
+    for name in ("heat_unserve", "heat_dump", "cool_unserve", "cool_dump"):
+        if dm.options['allow_dumping'] and (dm.n_boilers if name.startswith('heat') else dm.n_chillers) > 0:
+            v[name] = scalar_group(model, name, dm.n_nodes, T)
+    units = (('turbine', dm.turbine_para, dm.turbine_pieces, ('xp', 'xq')), ('dieselgen', dm.diesel_para, dm.diesel_pieces, ('xp', 'xq')),
+             ('boiler', dm.boiler_para, dm.boiler_pieces, ('x',)), ('chiller', dm.chiller_para, dm.chiller_pieces, ('x',)))
+    for kind, para, pieces, outputs in units:
+        for name in ('yp', 'yq') if kind == 'chiller' else ('y',):
+            v[kind + '_' + name] = scalar_group(model, kind + '_' + name, len(para), T)
+        for x in outputs:
+            v[kind + '_' + x] = scalar_group(model, kind + '_' + x, len(para), T)
+            v[kind + '_' + x + '_k'] = scalar_group(model, kind + '_' + x + '_k', len(para), T, pieces=pieces, lb=free)
+        v[kind + '_s_k'] = scalar_group(model, kind + '_s_k', len(para), T, pieces=pieces, vtype=GRB.BINARY)
+    for kind in ('e_storage', 'h_storage', 'c_storage'):
+        para = getattr(dm, kind + '_para')
+        peak = [s.peak_disch*s.size for s in para]
+        v[kind + '_disch'] = scalar_group(model, kind + '_disch', len(para), T, ub=peak)
+        v[kind + '_ch'] = scalar_group(model, kind + '_ch', len(para), T, ub=peak)
+        v[kind + '_state'] = scalar_group(model, kind + '_state', len(para), T, lb=[s.max_dod for s in para], ub=[s.size for s in para])
+    v_nominal = dm.options['v_nominal']
+    if dm.options['network_limits']:
+        v['x_m'] = scalar_group(model, 'x_m', dm.n_nodes, T, lb=(v_nominal*.9)**2, ub=(v_nominal*1.1)**2)
+    else:
+        v['x_m'] = scalar_group(model, 'x_m', dm.n_nodes, T)
+    for name, carrier in (('y_mn', 'electrical'), ('z_mn', 'electrical'), ('h_mn', 'district_heat'), ('c_mn', 'district_cooling')):
+        v[name] = scalar_group(model, name, dm.topology.carrier(carrier).n_lines, T, lb=free)
+
+    #consumption, generation, piece bounds, status and ramps of every unit
+    for kind, para, pieces, outputs in units:
+        for i, t in itertools.product(range(len(para)), range(T)):
+            s = v[kind + '_s_k'][i,t]
+            for y_name, c, parts in consume_terms(kind, para[i].fundata):
+                c = np.asarray(c, dtype=float).reshape(-1)
+                expr = gp.quicksum(c[k]*s[k] for k in range(pieces[i]))
+                for x, b, fx in parts:
+                    x_k = v[kind + '_' + x + '_k'][i,t]
+                    b = np.asarray(b, dtype=float).reshape(-1)
+                    fx = np.asarray(fx, dtype=float).reshape(-1)
+                    r = model.addVar(lb=0)
+                    model.addConstr(gp.quicksum(b[k]**2*x_k[k]*x_k[k] for k in range(pieces[i])) <= r*r)
+                    expr += r + gp.quicksum(fx[k]*x_k[k] for k in range(pieces[i]))
+                if y_name is not None:
+                    expr -= v[y_name][i,t]
+                model.addConstr(expr <= 0)
+            for x in outputs:
+                model.addConstr(v[kind + '_' + x][i,t] == gp.quicksum(v[kind + '_' + x + '_k'][i,t]))
+            x_k = v[kind + '_' + outputs[0] + '_k'][i,t]
+            lb = np.asarray(para[i].lb, dtype=float).reshape(-1)
+            ub = np.asarray(para[i].ub, dtype=float).reshape(-1)
+            for k in range(pieces[i]):
+                model.addConstr(lb[k]*s[k] <= x_k[k])
+                if len(outputs) == 2:
+                    xq_k = v[kind + '_xq_k'][i,t]
+                    model.addConstr(x_k[k]*x_k[k] + xq_k[k]*xq_k[k] <= ub[k]**2*s[k])
+                else:
+                    model.addConstr(x_k[k] <= ub[k]*s[k])
+            model.addConstr(gp.quicksum(s) <= 1)
+        x = v[kind + '_' + outputs[0]]
+        for i in range(len(para)):
+            model.addConstr(x[i,0] <= para[i].ramp_rate)
+            model.addConstr(x[i,0] >= -para[i].ramp_rate)
+            for t in range(1, T):
+                model.addConstr(x[i,t] - x[i,t-1] <= para[i].ramp_rate)
+                model.addConstr(x[i,t-1] - x[i,t] <= para[i].ramp_rate)
+
+    #storage state
+    for kind, eta_ch, eta_disch in (('e_storage', 'eta_ch', 'eta_disch'), ('h_storage', 'eta_ch', 'eta_disch'), ('c_storage', 'charge_eff', 'disch_eff')):
+        para = getattr(dm, kind + '_para')
+        state, ch, disch = v[kind + '_state'], v[kind + '_ch'], v[kind + '_disch']
+        for i, t in itertools.product(range(len(para)), range(T)):
+            previous = state[i,t-1] if t > 0 else 0
+            model.addConstr(state[i,t] == previous + getattr(para[i], eta_ch)*ch[i,t] - 1/getattr(para[i], eta_disch)*disch[i,t])
+
+    #nodal balances, one constraint per hour and node
+    at = dict((kind, incidence.tocsr()) for kind, incidence in dm.at_node.items())
+    def at_node(kind, m, group, scale=None):
+        return gp.quicksum((1 if scale is None else scale[j])*group[j,t] for j in at[kind][m].indices)
+    electrical = dm.topology.electrical
+    f_heat = [gen.fundata["f_heat"] for gen in dm.turbine_para]
+    for t, m in itertools.product(range(T), range(dm.n_nodes)):
+        lines = electrical.lines_by_node[m]
+        power = at_node('turbine', m, v['turbine_xp']) + at_node('grid', m, v['ep_elecfromgrid']) - at_node('grid', m, v['ep_electogrid'])\
+         - at_node('chiller', m, v['chiller_yp']) + at_node('e_storage', m, v['e_storage_disch']) - at_node('e_storage', m, v['e_storage_ch'])\
+         + at_node('diesel', m, v['dieselgen_xp'])
+        model.addConstr(power/dm.options['pu_e'] - dm.G[m,m]*v['x_m'][m,t]\
+         - gp.quicksum(dm.G_lines[m,l]*v['y_mn'][l,t] + dm.B_lines[m,l]*v['z_mn'][l,t] for l in lines) == 0)
+        reactive = at_node('turbine', m, v['turbine_xq']) + at_node('grid', m, v['eq_elecfromgrid']) - at_node('grid', m, v['eq_electogrid'])\
+         - at_node('chiller', m, v['chiller_yq']) + at_node('diesel', m, v['dieselgen_xq'])
+        model.addConstr(reactive/dm.options['pu_e'] + dm.B[m,m]*v['x_m'][m,t]\
+         - gp.quicksum(dm.G_lines[m,l]*v['z_mn'][l,t] - dm.B_lines[m,l]*v['y_mn'][l,t] for l in lines) == 0)
+        heat = at_node('boiler', m, v['boiler_x']) + at_node('turbine', m, v['turbine_xp'], f_heat)\
+         + at_node('h_storage', m, v['h_storage_disch']) - at_node('h_storage', m, v['h_storage_ch'])\
+         - gp.quicksum(dm.heat_line_loss[m,l]*v['h_mn'][l,t] for l in dm.topology.district_heat.lines_by_node[m])
+        cool = at_node('chiller', m, v['chiller_x']) + at_node('c_storage', m, v['c_storage_disch']) - at_node('c_storage', m, v['c_storage_ch'])\
+         - gp.quicksum(dm.cool_line_loss[m,l]*v['c_mn'][l,t] for l in dm.topology.district_cooling.lines_by_node[m])
+        if 'heat_dump' in v:
+            heat += v['heat_unserve'][m,t] - v['heat_dump'][m,t]
+        if 'cool_dump' in v:
+            cool += v['cool_unserve'][m,t] - v['cool_dump'][m,t]
+        model.addConstr(cool == 0)
+        model.addConstr(heat == 0)
+
+    #line limits and flows
+    for t in range(T):
+        if dm.options['network_limits']:
+            for l in range(electrical.n_lines):
+                m, n = electrical.line_from[l], electrical.line_to[l]
+                if n < 0:
+                    continue
+                k = dm.G[m,m]**2 + dm.B[m,n]**2
+                model.addConstr(k*(v['x_m'][m,t] + v['x_m'][n,t] - 2*v['y_mn'][l,t]) <= dm.options['current_limit_value']**2)
+                model.addConstr(v['y_mn'][l,t]*v['y_mn'][l,t] + v['z_mn'][l,t]*v['z_mn'][l,t] <= v['x_m'][m,t]*v['x_m'][n,t])
+        for name, carrier in (('h_mn', dm.topology.district_heat), ('c_mn', dm.topology.district_cooling)):
+            for l in range(carrier.n_lines):
+                if l < carrier.reverse[l]:
+                    model.addConstr(v[name][l,t] == -v[name][carrier.reverse[l],t])
+    model.update()
+    return model
+
+def size(model):
+    return model.NumVars, model.NumConstrs, model.NumQConstrs
+
+def run(T=24, plant_file=os.path.join('library', 'wsu_campus.pickle'), demand_file=os.path.join('library', 'data', 'wsu_campus_demand_2009_2012')):
+    with open(plant_file, 'rb') as file_object:
+        plant = pickle.load(file_object)
+    with open(demand_file, 'rb') as file_object:
+        test_data = pickle.load(file_object)
+
+    dm = GurobiDispatchModel(T=T)
+    dm.load_plant(plant, test_data)
+
+    tic = time.time()
+    dm.build()
+    dm.model.update()
+    t_matrix = time.time() - tic
+
+    tic = time.time()
+    scalar = build_scalar(dm)
+    t_scalar = time.time() - tic
+
+    if size(scalar) != size(dm.model):
+        raise RuntimeError("per-scalar model {} differs from matrix model {}".format(size(scalar), size(dm.model)))
+    print('T = {}: {} variables, {} linear and {} quadratic constraints'.format(T, *size(dm.model)))
+    print('build: per scalar {:.3f} s, matrix {:.3f} s, speedup {:.1f}x'.format(t_scalar, t_matrix, t_scalar/max(t_matrix, 1e-9)))
+    return t_scalar, t_matrix
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,126 @@
+'''
+Scaling benchmark of the dispatch model on synthetic plants.
+Every configuration (nodes, units of each type, horizon T) builds a plant
+with benchmark.synthetic_plant and times load_plant, build, compile, solve
+and extract of a DispatchModel, with the peak memory traced in each phase.
+One JSON line per configuration is appended to the results file, with the
+commit it was run on, so runs of two commits can be compared with compare
+and a phase that got slower as the plant grows shows up as a regression.
+
+run from conic_disp_training_generation:
+    python -m benchmark.scaling [results_file] [solver]
+    python -m benchmark.scaling compare results_file base_commit [head_commit]
+'''
+
+import sys
+import json
+import datetime
+import subprocess
+
+import cvxpy
+
+from dispatch.model import DispatchModel
+from dispatch.timing import PhaseTimer
+from benchmark.synthetic_plant import synthetic_plant
+
+
+#(nodes, units of each type, T) of the default run
+CONFIGURATIONS = [(3, 1, 24), (6, 2, 24), (12, 4, 24), (24, 8, 24), (6, 2, 48), (6, 2, 96)]
+PHASES = ('load_plant', 'build', 'compile', 'solve', 'extract')
+
+
+#short hash of the checked out commit, with a + if the tree has changes
+def git_commit():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+        dirty = subprocess.call(['git', 'diff', '--quiet', 'HEAD'], stderr=subprocess.DEVNULL) != 0
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('+' if dirty else '')
+
+#scalar variables and constraints of a problem
+def problem_size(prob):
+    return sum(var.size for var in prob.variables()), sum(constraint.size for constraint in prob.constraints)
+
+#timing record of one configuration. solver is used alone, the chain of the
+#model's SolverConfig if None; heuristic solves with solve_heuristic. A
+#solve that fails is recorded with its error and the other phases are kept
+def benchmark(n_nodes, n_units, T, solver=None, heuristic=False, seed=0, trace_memory=True, start_date=datetime.datetime(2009, 1, 2)):
+    days = (T + 23)//24 + 2
+    plant, test_data = synthetic_plant(n_nodes, n_units, days=days, seed=seed, start_date=start_date - datetime.timedelta(days=1))
+    model = DispatchModel(T=T, timer=PhaseTimer(trace_memory=trace_memory))
+    model.load_plant(plant, test_data)
+    model.build()
+    model.update_forecast(start_date)
+    n_variables, n_constraints = problem_size(model.prob)
+    error = None
+    result = None
+    try:
+        #the heuristic solves problems of its own, compiled in its solves
+        if not heuristic:
+            model.compile(solver or model.solver_config.chain()[0])
+        if heuristic:
+            result = model.solve_heuristic(solver=solver)
+        else:
+            result = model.solve(solver=solver)
+        model.extract()
+    except cvxpy.error.SolverError as exception:
+        error = str(exception)
+    return model.timing_record(commit=git_commit(), n_nodes=n_nodes, n_units=n_units, seed=seed, heuristic=heuristic,
+                               n_variables=n_variables, n_constraints=n_constraints, objective=result, error=error)
+
+#one record per configuration, appended to file_name if given
+def run(file_name=None, configurations=CONFIGURATIONS, solver=None, heuristic=False, seed=0, trace_memory=True):
+    records = []
+    for n_nodes, n_units, T in configurations:
+        record = benchmark(n_nodes, n_units, T, solver, heuristic, seed, trace_memory)
+        records.append(record)
+        if file_name is not None:
+            PhaseTimer().write(file_name, record)
+        print(summary(record))
+    return records
+
+def summary(record):
+    times = ', '.join('{} {:.3f} s'.format(name, record['phases'][name]['time']) for name in PHASES if name in record['phases'])
+    peak = max(phase['peak_memory'] for phase in record['phases'].values())/2**20
+    return 'nodes {n_nodes:>3d}, units {n_units:>2d}, T {T:>3d}: {n_variables} variables, {n_constraints} constraints; '.format(**record)\
+        + times + ', peak {:.1f} MB'.format(peak) + ('' if record['error'] is None else ', ' + record['error'])
+
+def load(file_name):
+    with open(file_name) as file_object:
+        return [json.loads(line) for line in file_object if line.strip()]
+
+def configuration(record):
+    return record['n_nodes'], record['n_units'], record['T'], record.get('seed', 0), record.get('heuristic', False)
+
+#time of each phase for every configuration in head relative to base, the
+#last run of each commit is used. Ratios above 1 + tolerance are listed as
+#regressions, which are returned
+def compare(file_name, base, head=None, tolerance=0.2):
+    records = load(file_name)
+    head = head or records[-1]['commit']
+    runs = {}
+    for record in records:
+        if record['commit'] in (base, head):
+            runs.setdefault(record['commit'], {})[configuration(record)] = record
+    regressions = []
+    print('{:<24s} {:<12s} {:>10s} {:>10s} {:>8s}'.format('nodes, units, T', 'phase', base, head, 'ratio'))
+    for key in sorted(set(runs.get(base, {})) & set(runs.get(head, {}))):
+        for name in PHASES:
+            phases = [runs[commit][key]['phases'].get(name) for commit in (base, head)]
+            if None in phases:
+                continue
+            ratio = phases[1]['time']/max(phases[0]['time'], 1e-9)
+            flag = ''
+            if ratio > 1 + tolerance:
+                regressions.append((key, name, ratio))
+                flag = ' slower'
+            print('{:<24s} {:<12s} {:>10.3f} {:>10.3f} {:>8.2f}{}'.format(str(key[:3]), name, phases[0]['time'], phases[1]['time'], ratio, flag))
+    return regressions
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['compare']:
+        compare(*sys.argv[2:5])
+    else:
+        run(*sys.argv[1:3])
@@ -0,0 +1,145 @@
+'''
+Synthetic plants of any size for the scaling benchmarks.
+synthetic_plant: Plant with n_nodes nodes on a ring and n_units components
+    of each type, made of the component classes of class_definition with
+    efficiency curves shaped like those of the WSU campus plant, and
+    TestData of matching demands, irradiance and prices.
+The sizes, curves and demands are drawn from a seeded RandomState, so a
+configuration gives the same plant on every commit.
+'''
+
+import datetime
+
+import numpy as np
+
+from class_definition.component import (Utility, MicroTurbine, ElectricGenerator, Heater, ElectricChiller, Solar)
+from class_definition.component import (ElectricStorage, ThermalStorage)
+from class_definition.generator_struct import Output
+from class_definition.plant_struct import Optimoptions, Network, Location, NetworkDemand, Plant
+from class_definition.test_data import TestData, Demand, Weather
+
+
+#component types in the order they are spread over the nodes
+UNIT_TYPES = ('turbine', 'diesel', 'boiler', 'chiller', 'e_storage', 'h_storage', 'c_storage', 'solar')
+#capacity fractions the efficiency curves are given at
+CAPACITY = np.linspace(0, 1, 11)
+
+
+#efficiency rising from zero output to a plateau of peak, with noise
+def efficiency_curve(rng, peak, rise=6.0):
+    curve = peak*(1 - np.exp(-rise*CAPACITY))*(1 + 0.02*rng.randn(len(CAPACITY)))
+    curve[0] = 0
+    return curve
+
+def setup_turbine(rng, name):
+    size = 1000*(0.8 + 0.4*rng.rand())
+    out = Output(capacity=CAPACITY, electricity=efficiency_curve(rng, 0.35), heat=np.ones(len(CAPACITY))*0.5)
+    return MicroTurbine(name=name, output=out, size=size, start_cost=323.4671, restart_time=15, ramp_rate=1.3344*size)
+
+def setup_diesel_gen(rng, name):
+    size = 1000*(0.8 + 0.4*rng.rand())
+    out = Output(capacity=CAPACITY, electricity=efficiency_curve(rng, 0.45, rise=3.0))
+    return ElectricGenerator(name=name, source='diesel', output=out, size=size, start_cost=66.6667, ramp_rate=0.6667*size)
+
+def setup_boiler(rng, name):
+    size = 20000*(0.8 + 0.4*rng.rand())
+    out = Output(capacity=CAPACITY, heat=np.ones(len(CAPACITY))*(0.85 + 0.05*rng.rand()))
+    return Heater(name=name, output=out, size=size, start_cost=0, ramp_rate=0.0667*size)
+
+def setup_chiller(rng, name):
+    size = 5000*(0.8 + 0.4*rng.rand())
+    out = Output(capacity=CAPACITY, cooling=efficiency_curve(rng, 5.0, rise=4.0))
+    return ElectricChiller(name=name, output=out, size=size, start_cost=0, ramp_rate=0.6667*size, source='electricity')
+
+def setup_electric_storage(rng, name):
+    size = 2000*(0.8 + 0.4*rng.rand())
+    return ElectricStorage(name=name, size=size, eta_ch=0.95, eta_disch=0.95, max_dod=0.2*size, peak_disch=0.5)
+
+def setup_heat_storage(rng, name):
+    size = 20000*(0.8 + 0.4*rng.rand())
+    return ThermalStorage(name=name, source='heat', size=size, eta_ch=0.95, eta_disch=0.95, max_dod=0.2*size, peak_disch=0.2)
+
+def setup_cold_storage(rng, name):
+    size = 20000*(0.8 + 0.4*rng.rand())
+    return ThermalStorage(name=name, source='cooling', size=size, charge_eff=0.99, disch_eff=0.99, max_dod=0.2*size, peak_disch=0.2)
+
+def setup_solar(rng, name):
+    return Solar(name=name, output=Output(capacity=CAPACITY, electricity=np.ones(len(CAPACITY))), size=30,
+                 eff=0.174, size_m2=200*(0.8 + 0.4*rng.rand()), gen_frac=0.8719)
+
+SETUP = {'turbine': setup_turbine, 'diesel': setup_diesel_gen, 'boiler': setup_boiler, 'chiller': setup_chiller,
+         'e_storage': setup_electric_storage, 'h_storage': setup_heat_storage, 'c_storage': setup_cold_storage,
+         'solar': setup_solar}
+
+#time of use electric utility like the campus feeder, peak prices on
+#weekday afternoons
+def setup_elec_utility(name='Elec Utility'):
+    rate_table = np.ones((7,24))*0.0551
+    rate_table[1:6,8:20] = 3*0.0551
+    return Utility(name=name, sum_rate_table=rate_table, win_rate_table=rate_table,
+                   sum_start_month=6, sum_start_day=1, win_start_month=10, win_start_day=1)
+
+#daily fuel prices varying around rate
+def setup_fuel_utility(rng, name, source, days, start_date, rate):
+    timestamp = [start_date + datetime.timedelta(days=d) for d in range(days)]
+    return Utility(name=name, source=source, size=0, timestamp=timestamp, rate=rate*(1 + 0.05*rng.randn(days)))
+
+#nodes on a ring, every carrier connects each node to its two neighbors.
+#Every node has an electric load, which the forecast reads from the one
+#row of the electric demand, and heat and cooling loads of its own row
+def ring_network(n_nodes, equipment):
+    names = ['node_{}'.format(m) for m in range(n_nodes)]
+    network = []
+    for m in range(n_nodes):
+        connections = sorted(set(names[(m + k) % n_nodes] for k in (-1, 1)) - set([names[m]]))
+        demands = {}
+        for carrier in ('electrical', 'district_heat', 'district_cooling'):
+            demands[carrier] = NetworkDemand({'connections': connections, 'trans_eff': [], 'trans_limit': [], 'load': 0 if carrier == 'electrical' else m})
+        node = Network(gens=True, info_dct=dict(equipment=equipment[m], name=names[m], location=Location(), **demands))
+        network.append(node)
+    return network
+
+#daily profile of n rows with random phase and amplitude, mean 1
+def daily_profile(rng, n, hours):
+    hour = np.arange(hours)
+    phase = rng.rand(n, 1)*2*np.pi
+    profile = 1 + 0.3*rng.rand(n, 1)*np.sin(hour*2*np.pi/24 + phase) + 0.05*rng.randn(n, hours)
+    return np.maximum(profile, 0)
+
+#demands sized to load the units of each type to fill of their capacity,
+#with the rest left to storage, the grid and the unserved slacks
+def synthetic_test_data(rng, n_nodes, components, days, start_date, fill=0.6):
+    hours = 24*days
+    capacity = dict((kind, sum(gen.size for gen in components[kind])) for kind in ('turbine', 'diesel', 'boiler', 'chiller'))
+    #every node carries the one electric demand row
+    e = fill*(capacity['turbine'] + capacity['diesel'])/n_nodes*daily_profile(rng, 1, hours)
+    h = fill*capacity['boiler']/n_nodes*daily_profile(rng, n_nodes, hours)
+    c = fill*capacity['chiller']/n_nodes*daily_profile(rng, n_nodes, hours)
+    hour = np.arange(hours)
+    irradiance = np.maximum(np.sin((hour % 24 - 6)*np.pi/12), 0)*(0.8 + 0.2*rng.rand(hours))
+    return TestData(timestamp=[start_date + datetime.timedelta(hours=i) for i in range(hours)],
+                    demand=Demand(e=e, h=h, c=c), weather=Weather(irrad_dire_norm=irradiance, t_db=np.ones(hours)*20))
+
+#plant of n_nodes nodes with n_units components of every type, the i-th of
+#a type at node i mod n_nodes, one electric grid connection and the gas
+#and diesel utilities at the first node. Returns the plant and its test
+#data of days days from start_date
+def synthetic_plant(n_nodes=3, n_units=1, days=7, seed=0, start_date=datetime.datetime(2009, 1, 1)):
+    rng = np.random.RandomState(seed)
+    components = dict((kind, [SETUP[kind](rng, '{}_{}'.format(kind, i)) for i in range(n_units)]) for kind in UNIT_TYPES)
+    elec_utility = setup_elec_utility()
+    #the gas utility has to come before the diesel utility, they are fuels 0 and 1
+    gas_utility = setup_fuel_utility(rng, 'Gas Utility', 'ng', days, start_date, 5.6173)
+    diesel_utility = setup_fuel_utility(rng, 'Diesel Utility', 'diesel', days, start_date, 24)
+
+    equipment = [[] for m in range(n_nodes)]
+    equipment[0].extend([elec_utility, gas_utility, diesel_utility])
+    for kind in UNIT_TYPES:
+        for i, gen in enumerate(components[kind]):
+            equipment[i % n_nodes].append(gen)
+    generator = [elec_utility, gas_utility, diesel_utility] + [gen for kind in UNIT_TYPES for gen in components[kind]]
+
+    optimoptions = Optimoptions({'interval': days, 'horizon': 24, 'resolution': 1, 'excess_heat': True, 'mixed_integer': True, 'excess_cool': True})
+    plant = Plant({'name': 'synthetic_{}_nodes_{}_units'.format(n_nodes, n_units), 'generator': generator,
+                   'optimoptions': optimoptions, 'network': ring_network(n_nodes, equipment)})
+    return plant, synthetic_test_data(rng, n_nodes, components, days, start_date)
@@ -0,0 +1,60 @@
+'''
+Micro-benchmark of RANGE lookups on a year-long VariableGroup.
+Compares the indexed VariableGroup.match with the linear scan over all
+keys that the dispatch scripts used before, and checks both return the
+same variables in the same order.
+
+run from conic_disp_training_generation:
+    python -m benchmark.variable_group_match
+'''
+
+import time
+
+from dispatch.variable_group import VariableGroup, RANGE, constant_zero
+
+
+#the previous match: scan every key of the group for each lookup
+def scan_match(group, key):
+    position = key.index(RANGE)
+    def predicate(xs, ys):
+        z=0
+        for i, (x, y) in enumerate(zip(xs, ys)):
+            if i != position and x==y:
+                z += 1
+        return z == len(key)-1
+
+    keys = list(group.variables.keys())
+    keys = [k for k in keys if predicate(k,key)]
+    keys.sort(key=lambda k: k[position])
+
+    return [group.variables[k] for k in keys]
+
+def time_lookups(match, group, keys):
+    tic = time.time()
+    for key in keys:
+        match(key)
+    return time.time() - tic
+
+def run(n_components=10, T=8760, n_lookups=200):
+    tic = time.time()
+    group = VariableGroup("turbine_x", indexes=(range(n_components), range(T)), lower_bound_func=constant_zero)
+    print('built {} variables in {:.2f} s'.format(len(group.variables), time.time()-tic))
+
+    #component profiles over the year and single hours over all components,
+    #the two lookups the constraint functions make
+    keys = [(i % n_components, RANGE) for i in range(n_lookups)]
+    keys += [(RANGE, t*T//n_lookups) for t in range(n_lookups)]
+
+    for key in keys[::n_lookups//4]:
+        if [v.id for v in group[key]] != [v.id for v in scan_match(group, key)]:
+            raise RuntimeError("indexed match differs from scan for key {}".format(key))
+
+    t_scan = time_lookups(lambda key: scan_match(group, key), group, keys)
+    t_index = time_lookups(group.match, group, keys)
+    print('{} lookups: scan {:.3f} s, indexed {:.4f} s, speedup {:.0f}x'.format(
+        len(keys), t_scan, t_index, t_scan/max(t_index, 1e-9)))
+    return t_scan, t_index
+
+
+if __name__ == '__main__':
+    run()
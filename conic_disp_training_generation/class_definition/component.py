@@ -43,9 +43,12 @@ Component
 |__ ACDCConverter
 """
 
+import numpy as np
+
 from class_definition.specifiable import Specifiable
 from class_definition.generator_struct import (Output, StateSpace, Startup,
     Shutdown, Comm, Measure)
+from class_definition.tariff import Tariff
 
 
 class Component(Specifiable):
@@ -457,6 +460,35 @@ class Utility(Component):
         )
         self.set_attrs(**kwargs)
 
+    def rate_for(self, datetimes):
+        '''Rate of the day of each datetime, from the daily timestamp and
+        rate lists of a fuel utility. The day numbers of timestamp are
+        indexed once, so each lookup is an array offset.'''
+        index = getattr(self, '_day_index', None)
+        if index is None or index[0] is not self.timestamp or index[1] is not self.rate:
+            days = np.array(self.timestamp, dtype='datetime64[D]').astype(np.int64)
+            positions = np.full(days.max() - days.min() + 1, -1)
+            positions[days - days.min()] = np.arange(len(days))
+            index = (self.timestamp, self.rate, days.min(), positions, np.asarray(self.rate, dtype=float))
+            self._day_index = index
+        _, _, first, positions, rate = index
+        day = np.array(datetimes, dtype='datetime64[D]').astype(np.int64) - first
+        found = (day >= 0) & (day < len(positions))
+        found[found] = positions[day[found]] >= 0
+        if not np.all(found):
+            raise KeyError("{} has no rate for {}".format(self.name, np.array(datetimes, dtype='datetime64[D]')[~found][0]))
+        return rate[positions[day]]
+
+    def tariff(self, tiered=False):
+        '''Tariff of the rate tables, compiled once per year and cached.
+        The Tariff compiles its years again when the rate tables, rates or
+        season starts change.'''
+        tariff = getattr(self, '_tariff', None)
+        if tariff is None or tariff.tiered != tiered:
+            tariff = Tariff(self, tiered=tiered)
+            self._tariff = tariff
+        return tariff
+
 class DistrictHeat(Utility):
     '''District Heat class.
 
@@ -0,0 +1,114 @@
+'''
+Defines the Tariff class, the hourly electric prices of a Utility.
+The summer and winter rate tables and the season boundaries are compiled
+into one price per hour of a year with NumPy calendar masks, so the prices
+of a horizon are a slice of that array instead of a rate table lookup per
+timestamp.
+'''
+
+import datetime
+
+import numpy as np
+
+
+HOUR = np.timedelta64(1, 'h')
+
+
+class Tariff:
+    '''Hourly real and reactive power prices of an electric utility.
+
+    Without tiered the entries of sum_rate_table and win_rate_table
+    (weekday x hour, Monday first) are the prices, as the dispatch scripts
+    read them. With tiered they are 0-based tiers, and the price is the
+    first column of the tier's row of sum_rates or win_rates, as the
+    multinode AC 04 and 05 scripts price the WSU utility. Reactive
+    power costs reactive_ratio of the real power price; selling back is
+    paid sellback_ratio of the real power price and the full reactive
+    power price, and is returned as a negative cost.
+
+    ATTRIBUTES:
+    utility
+    tiered
+    reactive_ratio
+    sellback_ratio
+    years       year -> price of every hour of the year, from January 1 0:00
+    key         rate tables, rates and season starts the years were compiled
+                from; the years are compiled again when these change
+    '''
+
+    def __init__(self, utility, tiered=False, reactive_ratio=0.2, sellback_ratio=0.5):
+        self.utility = utility
+        self.tiered = tiered
+        self.reactive_ratio = reactive_ratio
+        self.sellback_ratio = sellback_ratio
+        self.years = {}
+        self.key = None
+
+    #(7 x 24) prices of season 'sum' or 'win'
+    def season_table(self, season):
+        table = np.asarray(getattr(self.utility, season + '_rate_table'), dtype=float)
+        if not self.tiered:
+            return table
+        rates = getattr(self.utility, season + '_rates')
+        return np.asarray(rates, dtype=float).reshape(len(rates), -1)[table.astype(int), 0]
+
+    #everything of the utility the prices depend on, compared by value so a
+    #rate table changed in place is noticed
+    def inputs(self):
+        u = self.utility
+        names = ('sum_rate_table', 'win_rate_table') + (('sum_rates', 'win_rates') if self.tiered else ())
+        tables = tuple((np.shape(getattr(u, name)), np.asarray(getattr(u, name), dtype=float).tobytes()) for name in names)
+        return tables + (u.sum_start_month, u.sum_start_day, u.win_start_month, u.win_start_day)
+
+    #True for the hours of a year in the summer season, with the boundaries
+    #of the scripts' hourly pricing: the summer starts on its start day and
+    #the winter on its own, and a month holding both starts is read as summer
+    def summer(self, month, day):
+        u = self.utility
+        between = (month > u.sum_start_month) & (month < u.win_start_month)
+        summer_start = (month == u.sum_start_month) & (day >= u.sum_start_day)
+        winter_start = (month == u.win_start_month) & (month != u.sum_start_month) & (day < u.win_start_day)
+        return between | summer_start | winter_start
+
+    #prices of every hour of a year, compiled on first use and again after
+    #the utility's rate tables change
+    def year_prices(self, year):
+        key = self.inputs()
+        if key != self.key:
+            self.years = {}
+            self.key = key
+        if year not in self.years:
+            start = np.datetime64(datetime.datetime(year, 1, 1), 'h')
+            hours = np.arange(start, np.datetime64(datetime.datetime(year + 1, 1, 1), 'h'), HOUR)
+            days = hours.astype('datetime64[D]')
+            months = days.astype('datetime64[M]')
+            month = (months - months.astype('datetime64[Y]')).astype(int) + 1
+            day = (days - months).astype(int) + 1
+            #1970-01-01 was a Thursday, weekday 3 with Monday 0
+            weekday = (days.astype(int) + 3) % 7
+            hour = (hours - days).astype(int)
+            summer = self.season_table('sum')[weekday, hour]
+            winter = self.season_table('win')[weekday, hour]
+            self.years[year] = np.where(self.summer(month, day), summer, winter)
+        return self.years[year]
+
+    #real power price of the hours from start_date, a view of the year's
+    #prices unless the hours run into the next year
+    def prices(self, start_date, hours):
+        parts = []
+        date = start_date
+        while hours > 0:
+            year = self.year_prices(date.year)
+            first = int((np.datetime64(date, 'h') - np.datetime64(datetime.datetime(date.year, 1, 1), 'h'))//HOUR)
+            part = year[first:first + hours]
+            parts.append(part)
+            hours -= len(part)
+            date = datetime.datetime(date.year + 1, 1, 1)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    #real and reactive purchase and sellback prices of the hours from start_date
+    def horizon(self, start_date, hours):
+        pelec_cost = self.prices(start_date, hours)
+        qelec_cost = self.reactive_ratio*pelec_cost
+        return {'pelec_cost': pelec_cost, 'qelec_cost': qelec_cost,
+                'pselback_rate': -self.sellback_ratio*pelec_cost, 'qselback_rate': -qelec_cost}
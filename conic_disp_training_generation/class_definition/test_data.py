@@ -2,8 +2,14 @@
 Defines the TestData class and supporting classes.
 TestData contains information necessary for running EAGERS in simulation
 mode (i.e. when not connected to a real building).
+TimeIndex: datetime64 index of the timestamps, which finds the positions
+    of a whole horizon at once.
 '''
 
+import datetime
+
+import numpy as np
+
 from class_definition.specifiable import Specifiable
 
 
@@ -27,6 +33,90 @@ class TestData(Specifiable):
 
         self.set_attrs(**kwargs)
 
+    #TimeIndex of timestamp, made on first use and again when timestamp is
+    #replaced
+    def time_index(self):
+        index = getattr(self, '_time_index', None)
+        if index is None or index.timestamp is not self.timestamp:
+            index = TimeIndex(self.timestamp)
+            self._time_index = index
+        return index
+
+
+class TimeIndex:
+    '''datetime64 index of a list of timestamps.
+
+    Positions on a regular grid are computed from the offset to the first
+    timestamp, otherwise the timestamps are searched with searchsorted. A
+    horizon of evenly spaced hours on a regular grid is a slice, so the
+    demand and weather of a horizon are NumPy views of the data.
+
+    ATTRIBUTES:
+    timestamp   the list of datetimes indexed
+    stamps      datetime64 array of timestamp
+    step        spacing of a regular grid, None if the spacing varies
+    '''
+
+    def __init__(self, timestamp):
+        self.timestamp = timestamp
+        self.stamps = np.array(timestamp, dtype='datetime64[us]')
+        steps = np.diff(self.stamps)
+        self.step = None
+        if len(steps) > 0 and steps[0] > np.timedelta64(0) and np.all(steps == steps[0]):
+            self.step = steps[0]
+        self._sorter = None
+        if self.step is None and np.any(steps < np.timedelta64(0)):
+            self._sorter = np.argsort(self.stamps, kind='stable')
+
+    def __len__(self):
+        return len(self.stamps)
+
+    def __contains__(self, date_stamp):
+        return bool(self._find(np.array([date_stamp], dtype='datetime64[us]'))[1][0])
+
+    #positions of stamps and whether each one is in the index
+    def _find(self, stamps):
+        n = len(self.stamps)
+        if n == 0:
+            return np.zeros(len(stamps), dtype=int), np.zeros(len(stamps), dtype=bool)
+        if self.step is not None:
+            offset = stamps - self.stamps[0]
+            positions = (offset // self.step).astype(int)
+            found = (offset % self.step == np.timedelta64(0)) & (positions >= 0) & (positions < n)
+            return np.clip(positions, 0, n - 1), found
+        positions = np.minimum(np.searchsorted(self.stamps, stamps, sorter=self._sorter), n - 1)
+        if self._sorter is not None:
+            positions = self._sorter[positions]
+        return positions, self.stamps[positions] == stamps
+
+    #positions of a list or array of dates, KeyError if one is missing
+    def positions(self, date_stamps):
+        stamps = np.array(date_stamps, dtype='datetime64[us]')
+        positions, found = self._find(stamps)
+        if not np.all(found):
+            raise KeyError("{} is not in the test data timestamps".format(stamps[~found][0]))
+        return positions
+
+    def position(self, date_stamp):
+        return int(self.positions([date_stamp])[0])
+
+    #index of the n timestamps from start_date, resolution apart: a slice
+    #where the grid allows it, else an array of positions
+    def horizon(self, start_date, n, resolution=datetime.timedelta(hours=1)):
+        resolution = np.timedelta64(resolution, 'us')
+        if self.step is not None and resolution % self.step == np.timedelta64(0):
+            stride = int(resolution // self.step)
+            first = self.position(start_date)
+            last = first + (n - 1)*stride
+            if last >= len(self.stamps):
+                raise KeyError("{} is not in the test data timestamps".format(self.stamps[0] + last*self.step))
+            return slice(first, last + 1, stride)
+        return self.positions(np.datetime64(start_date, 'us') + resolution*np.arange(n))
+
+    #values of the horizon along the last axis, a view on a regular grid
+    def window(self, values, start_date, n, resolution=datetime.timedelta(hours=1)):
+        return np.asarray(values)[..., self.horizon(start_date, n, resolution)]
+
 
 class Demand(Specifiable):
     '''Demand class.
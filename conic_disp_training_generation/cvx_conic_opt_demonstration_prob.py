@@ -39,6 +39,8 @@ from coreapi import codecs
 from copy import copy
 #import xlsxwriter
 import cvxpy
+from dispatch.variable_group import VariableGroup as BaseVariableGroup, RANGE, constant_zero
+from dispatch.topology import NetworkTopology
 import pickle
 from class_definition.plant_struct import Plant, Network, Optimoptions
 from class_definition.test_data import TestData
@@ -118,30 +120,16 @@ for i in range(len(gen)):
     
 
 
-#find_nodes creates a list of lists of indexes of equipment by node
-def find_nodes(comp_list):
-    comp_by_node = []
-    for node in network:
-        this_node = []
-        i = 0
-        for comp in comp_list:
-            check = any([True for equip in node.equipment if equip.name==comp.name])
-            if check:
-                this_node.append(i)
-            i = i+1
-        comp_by_node.append(this_node)
-    return comp_by_node
+#index the network once: node and line numbers, equipment by node and incidence matrices
+topology = NetworkTopology(network)
 
 #create a list of lines by node
-e_lines_by_node = [] #list of connections by list of nodes
-i_e = 0 #index of line connections
+e_lines_by_node = topology.electrical.lines_by_node #list of connections by list of nodes
 i = 0
 e_nodes = [] #list of electrical nodes
 e_connected_nodes = []
 for node in network:
     n_e = len(node.electrical.connections)
-    e_lines_by_node.append([i_e+i for i in range(n_e)])
-    i_e += n_e
     if n_e>0:
         e_connected_nodes.append(i)
     if n_e>0 or node.electrical.load !=None:
@@ -149,7 +137,7 @@ for node in network:
     i +=1
 n_e_nodes = len(e_nodes) #number of electrical nodes
 n_e_connected_nodes = len(e_connected_nodes) #number of electrical nodes that are connected to other nodes
-n_e_lines = i_e
+n_e_lines = topology.electrical.n_lines
 
 
 Y = np.zeros((5,5), dtype = np.complex)
@@ -187,7 +175,7 @@ states = []
 constraints = []
 date_range = [start_date+datetime.timedelta(hours=i) for i in range(T)]
 ## create list of components of each type at each node
-turbine_by_node = find_nodes(turbine_para)
+turbine_by_node = topology.components_by_node(turbine_para)
 
 # set the starting value for x_n
 # it is used as an upper limit, so allow it to be the upper bound on voltage
@@ -197,9 +185,6 @@ x_n = np.ones((n_e_nodes,T))*(1+voltage_deviation)**2
 # x_n[2,0] = 1.03**2+0.1
 
 
-# variable to indicate that we want all variables that match a pattern
-# one item in the tuple key can be RANGE
-RANGE = -1
 
 
 ####### POWER NETWORK OBJECT CLASS DEFINITIONS AND FUNCTIONS
@@ -219,117 +204,23 @@ class BuildAsset_init(object):
         self.status1 = np.zeros(T)
         self.output = output
 
-def binary_var(var_name):
-    return cvxpy.Variable(name=var_name, boolean=True)
-
 
 
 #gas utility pricing function
 def find_gas_pricing(date_stamp):
-    i=0
-    day_stamp = datetime.datetime(year=date_stamp.year, month=date_stamp.month, day=date_stamp.day)
-    price_ind = fuel_para[i].timestamp.index(day_stamp)
-    gas_rate = fuel_para[i].rate[price_ind] # price in $/thousand cubic feet
+    fuel = [f for f in fuel_para if f.source == 'ng'][0]
+    gas_rate = fuel.rate_for([date_stamp])[0] # price in $/thousand cubic feet
     gas_rate = gas_rate*(1/293.07) # convert to $/kWh gas --> 293.07 kWh/thousand cubic feet natural gas
     return gas_rate
 
 
 #  all network objects create a group of variables associated with that object
-class VariableGroup(object):
-    def __init__(self, name, indexes=(), is_binary_var=False, lower_bound_func=None, upper_bound_func=None, T=T, pieces=[1]):
-        global var_name_list
-        self.variables = {}
-
-        name_base = name
-        #if it is a piecewise function, make the variable group be a group of arrays (1,KK)
-        if pieces==[1]:
-            pieces = [1 for i in indexes[0]]
-
-        #create name base string
-        for _ in range(len(indexes)):
-            name_base += "_{}"
-
-        #create variable for each timestep and each component with a corresponding name
-        for index in itertools.product(*indexes):
-            var_name = name_base.format(*index)
-
-            if is_binary_var:
-                var = binary_var(var_name)
-            else:
-                #assign upper and lower bounds for the variable
-                if lower_bound_func is not None:
-                    lower_bound = lower_bound_func(index)
-                else:
-                    lower_bound = None
-
-                if upper_bound_func is not None:
-                    upper_bound = upper_bound_func(index)
-                else:
-                    upper_bound = None
-
-                #the lower bound should always be set if the upper bound is set
-                if lower_bound is None and upper_bound is not None:
-                    raise RuntimeError("Lower bound should not be unset while upper bound is set")
-
-                #create the cp variable
-                if lower_bound_func == constant_zero:
-                    var = cvxpy.Variable(pieces[index[0]], name = var_name, nonneg=True)
-                elif lower_bound is not None:
-                    var = cvxpy.Variable(pieces[index[0]], name=var_name)
-                    #constr = [var>=lower_bound]
-                elif upper_bound is not None:
-                    var = cvxpy.Variable(pieces[index[0]],name=var_name)
-                    #constr = [var<=upper_bound, var>=lower_bound]
-                else:
-                    var = cvxpy.Variable(pieces[index[0]], name=var_name)
-                
-
-            self.variables[index] = var
-            var_name_list.append(var_name)
-            #self.constraints[index] = constr
-        
-    #internal function to find variables associated with your key
-    def match(self, key):
-        position = key.index(RANGE)
-        def predicate(xs, ys):
-            z=0
-            for i, (x, y) in enumerate(zip(xs, ys)):
-                if i != position and x==y:
-                    z += 1
-            return z == len(key)-1
-
-
-        keys = list(self.variables.keys())
-        keys = [k for k in keys if predicate(k,key)]
-        keys.sort(key=lambda k: k[position]) 
-
-        return [self.variables[k] for k in keys]
-
-    #variable function to get the variables associated with the key
-    def __getitem__(self, key):
-        if type(key) != tuple:
-            key = (key,)
-            
-        #n_ones = 0
-        #for i, x in enumerate(key):
-        #    if x == RANGE:
-        #        n_ones+=1
-        n_range = key.count(RANGE)
-
-        if n_range == 0:
-            return self.variables[key]
-        elif n_range ==1:
-            return self.match(key)
-        else:
-            raise ValueError("Can only get RANGE for one index.")
-
-
-def constant(x):
-    def _constant(*args, **kwargs):
-        return x
-    return _constant
+#  and add the variable names to var_name_list for writing the solution
+class VariableGroup(BaseVariableGroup):
+    def __init__(self, *args, **kwargs):
+        BaseVariableGroup.__init__(self, *args, **kwargs)
+        var_name_list.extend(self.names)
 
-constant_zero = constant(0)
 
 
 ######### CONSTRAINT FUNCTIONS
@@ -362,7 +253,7 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
     #electric nodal balance
     def electric_p_balance(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_turb = turbine_by_node[m]
         i_lines = e_lines_by_node[m]
         #sum of power at node = Gmmxm + sum(Gmnymn+Bmnymn)
@@ -381,7 +272,7 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
     # reactive power nodal balance
     def electric_q_balance(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_turb = turbine_by_node[m]
         i_lines = e_lines_by_node[m]
         # sum of reactive power at node = -Bmmxm + sum(Gmnzmn - Bmnymn)
@@ -410,11 +301,10 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
         # find lines out
         m_lines = e_lines_by_node[m]
         # find lines back in
-        node_ns = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        node_ns = topology.electrical.neighbors[m]
         n_lines = []
         for n in node_ns:
-            this_line = [i for i in range(len(e_lines_by_node[n])) if network[m].name == network[n].electrical.connections[i]]
-            n_lines.append(e_lines_by_node[n][this_line[0]])
+            n_lines.append(topology.electrical.line_index[(n, m)])
         # set those lines equal for y_mn
         return y_mn[m_lines[RANGE],t] == y_mn[n_lines[RANGE],t]
 
@@ -423,11 +313,10 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
         # find lines out
         m_lines = e_lines_by_node[m]
         # find lines back in
-        node_ns = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        node_ns = topology.electrical.neighbors[m]
         n_lines = []
         for n in node_ns:
-            this_line = [i for i in range(len(e_lines_by_node[n])) if network[m].name == network[n].electrical.connections[i]]
-            n_lines.append(e_lines_by_node[n][this_line[0]])
+            n_lines.append(topology.electrical.line_index[(n, m)])
         # set those lines equal to the negative of each other for z_mn
         return z_mn[m_lines[RANGE],t] == -z_mn[n_lines[RANGE],t]
 
@@ -452,14 +341,14 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
     # line current limits
     def current_limit(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_lines = e_lines_by_node[m]
         return (G[m,m]**2 + B[m,n[RANGE]]**2)*(x_m[m,t] + x_m[n[RANGE],t] - 2*y_mn[i_lines[RANGE],t])<= current_limit_value**2
 
     # equality to assure that x,y,z variable subsitution holds: xmxn = ymn^2 + zmn^2
     def electric_interrelation(index):
         t, m = index #m is the node
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_lines = e_lines_by_node[m]
         #return cvxpy.power(x_m[n[RANGE],t] + x_m[m,t],2) - cvxpy.power(x_m[n[RANGE],t], 2) - cvxpy.power(x_m[m,t], 2) >= cvxpy.power(y_mn[i_lines[RANGE],t], 2) + cvxpy.power(z_mn[i_lines[RANGE], t], 2) 
         #return x_m[n[RANGE],t]*x_m[m,t] == y_mn[i_lines[RANGE],t]**2 + z_mn[i_lines[RANGE],t]**2
@@ -562,7 +451,7 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
 
     #define utility costs
     if n_utility>0:
-        pelec_cost = [find_utility_pricing(date_stamp) for date_stamp in date_range]
+        pelec_cost = grid_para[0].tariff().prices(date_range[0], len(date_range))
         qelec_cost = np.multiply(pelec_cost,5)
     else:
         pelec_cost = 0
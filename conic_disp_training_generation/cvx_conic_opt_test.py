@@ -34,6 +34,8 @@ import os
 import numpy as np
 import pandas
 import cvxpy
+from dispatch.variable_group import VariableGroup, RANGE, constant_zero
+from dispatch.topology import NetworkTopology
 import pickle
 from class_definition.plant_struct import Plant, Network, Optimoptions
 from class_definition.test_data import TestData
@@ -266,19 +268,8 @@ boiler_para = convert_quadratic(boiler_para)
     
 
 
-#find_nodes creates a list of lists of indexes of equipment by node
-def find_nodes(comp_list):
-    comp_by_node = []
-    for node in network:
-        this_node = []
-        i = 0
-        for comp in comp_list:
-            check = any([True for equip in node.equipment if equip.name==comp.name])
-            if check:
-                this_node.append(i)
-            i = i+1
-        comp_by_node.append(this_node)
-    return comp_by_node
+#index the network once: node and line numbers, equipment by node and incidence matrices
+topology = NetworkTopology(network)
 
 #create a list of lines by node
 e_lines_by_node = [] #list of connections by list of nodes
@@ -360,16 +351,16 @@ states = []
 constraints = []
 date_range = [start_date+datetime.timedelta(hours=i) for i in range(T)]
 ## create list of components of each type at each node
-grid_by_node = [[0]]#find_nodes(grid_para)
-turbine_by_node = [list(range(n_turbines))]#find_nodes(turbine_para)
-diesel_by_node = [list(range(n_dieselgen))]#find_nodes(diesel_para)
-boiler_by_node = [list(range(n_boilers))]#find_nodes(boiler_para)
-chiller_by_node = [list(range(n_chillers))]#find_nodes(chiller_para)
-abs_by_node = [list(range(n_abs))]#find_nodes(abs_para)
-e_storage_by_node = [list(range(n_e_storage))]#find_nodes(e_storage_para)
-h_storage_by_node = [list(range(n_h_storage))]#find_nodes(h_storage_para)
-c_storage_by_node = [list(range(n_c_storage))]#find_nodes(c_storage_para)
-renew_by_node = [[0]]#find_nodes(renew_para)
+grid_by_node = [[0]]#topology.components_by_node(grid_para)
+turbine_by_node = [list(range(n_turbines))]#topology.components_by_node(turbine_para)
+diesel_by_node = [list(range(n_dieselgen))]#topology.components_by_node(diesel_para)
+boiler_by_node = [list(range(n_boilers))]#topology.components_by_node(boiler_para)
+chiller_by_node = [list(range(n_chillers))]#topology.components_by_node(chiller_para)
+abs_by_node = [list(range(n_abs))]#topology.components_by_node(abs_para)
+e_storage_by_node = [list(range(n_e_storage))]#topology.components_by_node(e_storage_para)
+h_storage_by_node = [list(range(n_h_storage))]#topology.components_by_node(h_storage_para)
+c_storage_by_node = [list(range(n_c_storage))]#topology.components_by_node(c_storage_para)
+renew_by_node = [[0]]#topology.components_by_node(renew_para)
 
 
 #read in initial conditions
@@ -380,9 +371,6 @@ boiler_init = np.zeros((n_boilers,1))
 abs_init = np.zeros((n_abs,1))
 
 
-# variable to indicate that we want all variables that match a pattern
-# one item in the tuple key can be RANGE
-RANGE = -1
 
 
 ####### POWER NETWORK OBJECT CLASS DEFINITIONS AND FUNCTIONS
@@ -416,9 +404,6 @@ class Storage(object):
         if now_soc is None:
             raise ValueError("STATE OF CHARGE IS NONE")
 
-def binary_var(var_name):
-    return cvxpy.Variable(name=var_name, boolean=True)
-
 #  storage functions
 def e_storage_pmax(index):
     i, t = index
@@ -490,11 +475,11 @@ def boiler_upper_bound(index):
 
 #forecast function
 def find_demand(date_stamp,demand_type, n=0):
-    f_ind = test_data.timestamp.index(date_stamp)
+    f_ind = test_data.time_index().position(date_stamp)
     return getattr(test_data.demand,demand_type)[n,f_ind]
 
 def find_solar_forecast(date_stamp, n=0):
-    f_ind = test_data.timestamp.index(date_stamp)
+    f_ind = test_data.time_index().position(date_stamp)
     irrad = test_data.weather.irrad_dire_norm[f_ind]
     solar_gen = 0
     if not renew_by_node[n] == []:
@@ -502,142 +487,15 @@ def find_solar_forecast(date_stamp, n=0):
     return solar_gen
 
 
-#electric utility pricing function
-def find_utility_pricing(date_stamp):
-    i = 0
-    weekday = date_stamp.weekday()
-    hour = date_stamp.hour
-    month = date_stamp.month
-    day = date_stamp.day
-    sum_start_month = grid_para[i].sum_start_month
-    win_start_month = grid_para[i].win_start_month
-    sum_start_day = grid_para[i].sum_start_day
-    win_start_day = grid_para[i].win_start_day
-    #determine which rate table to use (summer or winter)
-    if month > sum_start_month and month < win_start_month:
-        rate = grid_para[i].sum_rate_table[weekday, hour]
-    elif month < sum_start_month or month > win_start_month:
-        rate = grid_para[i].win_rate_table[weekday, hour]
-    elif month == sum_start_month:
-        if day>= sum_start_day:
-            rate = grid_para[i].sum_rate_table[weekday, hour]
-        else:
-            rate = grid_para[i].win_rate_table[weekday, hour]
-    elif month == win_start_month:
-        if day>= win_start_day:
-            rate = grid_para[i].win_rate_table[weekday, hour]
-        else:
-            rate = grid_para[i].sum_rate_table[weekday, hour]
-    return rate
-
 #gas utility pricing function
 def find_gas_pricing(date_stamp):
-    i=0
-    day_stamp = datetime.datetime(year=date_stamp.year, month=date_stamp.month, day=date_stamp.day)
-    price_ind = fuel_para[i].timestamp.index(day_stamp)
-    return fuel_para[i].rate[price_ind]
+    fuel = [f for f in fuel_para if f.source == 'ng'][0]
+    return fuel.rate_for([date_stamp])[0]
 
 #diesel supply pricing function
 def find_diesel_pricing(date_stamp):
-    i=1
-    day_stamp = datetime.datetime(year=date_stamp.year, month=date_stamp.month, day=date_stamp.day)
-    price_ind = fuel_para[i].timestamp.index(day_stamp)
-    return fuel_para[i].rate[price_ind]
-
-#  all network objects create a group of variables associated with that object
-class VariableGroup(object):
-    def __init__(self, name, indexes=(), is_binary_var=False, lower_bound_func=None, upper_bound_func=None, T=24, pieces=[1]):
-        self.variables = {}
-
-        name_base = name
-        #if it is a piecewise function, make the variable group be a group of arrays (1,KK)
-        if pieces==[1]:
-            pieces = [1 for i in indexes[0]]
-
-        #create name base string
-        for _ in range(len(indexes)):
-            name_base += "_{}"
-
-        #create variable for each timestep and each component with a corresponding name
-        for index in itertools.product(*indexes):
-            var_name = name_base.format(*index)
-
-            if is_binary_var:
-                var = binary_var(var_name)
-            else:
-                #assign upper and lower bounds for the variable
-                if lower_bound_func is not None:
-                    lower_bound = lower_bound_func(index)
-                else:
-                    lower_bound = None
-
-                if upper_bound_func is not None:
-                    upper_bound = upper_bound_func(index)
-                else:
-                    upper_bound = None
-
-                #the lower bound should always be set if the upper bound is set
-                if lower_bound is None and upper_bound is not None:
-                    raise RuntimeError("Lower bound should not be unset while upper bound is set")
-
-                #create the cp variable
-                if lower_bound_func == constant_zero:
-                    var = cvxpy.Variable(pieces[index[0]], name = var_name, nonneg=True)
-                elif lower_bound is not None:
-                    var = cvxpy.Variable(pieces[index[0]], name=var_name)
-                    #constr = [var>=lower_bound]
-                elif upper_bound is not None:
-                    var = cvxpy.Variable(pieces[index[0]],name=var_name)
-                    #constr = [var<=upper_bound, var>=lower_bound]
-                else:
-                    var = cvxpy.Variable(pieces[index[0]], name=var_name)
-                
-
-            self.variables[index] = var
-            #self.constraints[index] = constr
-        
-    #internal function to find variables associated with your key
-    def match(self, key):
-        position = key.index(RANGE)
-        def predicate(xs, ys):
-            z=0
-            for i, (x, y) in enumerate(zip(xs, ys)):
-                if i != position and x==y:
-                    z += 1
-            return z == len(key)-1
-
-
-        keys = list(self.variables.keys())
-        keys = [k for k in keys if predicate(k,key)]
-        keys.sort(key=lambda k: k[position]) 
-
-        return [self.variables[k] for k in keys]
-
-    #variable function to get the variables associated with the key
-    def __getitem__(self, key):
-        if type(key) != tuple:
-            key = (key,)
-            
-        #n_ones = 0
-        #for i, x in enumerate(key):
-        #    if x == RANGE:
-        #        n_ones+=1
-        n_range = key.count(RANGE)
-
-        if n_range == 0:
-            return self.variables[key]
-        elif n_range ==1:
-            return self.match(key)
-        else:
-            raise ValueError("Can only get RANGE for one index.")
-
-
-def constant(x):
-    def _constant(*args, **kwargs):
-        return x
-    return _constant
-
-constant_zero = constant(0)
+    fuel = [f for f in fuel_para if f.source == 'diesel'][0]
+    return fuel.rate_for([date_stamp])[0]
 
 
 ######### CONSTRAINT FUNCTIONS
@@ -655,7 +513,7 @@ def add_constraint(name, indexes, constraint_func):
 #electric nodal balance
 def electric_p_balance(index):
     t, m = index
-    n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+    n = topology.electrical.neighbors[m]
     i_turb = turbine_by_node[m]
     i_grid = grid_by_node[m]
     i_chiller = chiller_by_node[m]
@@ -679,7 +537,7 @@ def electric_p_balance(index):
 # reactive power nodal balance
 def electric_q_balance(index):
     t, m = index
-    n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+    n = topology.electrical.neighbors[m]
     i_turb = turbine_by_node[m]
     i_grid = grid_by_node[m]
     i_chiller = chiller_by_node[m]
@@ -700,7 +558,7 @@ def electric_q_balance(index):
 #heat nodal balance
 def heat_balance(index):
     t, m = index
-    n = [i for i in range(n_nodes) if network[i].name in network[m].district_heat.connections]
+    n = topology.district_heat.neighbors[m]
     i_turb = turbine_by_node[m]
     i_boiler = boiler_by_node[m]
     i_hs = h_storage_by_node[m]
@@ -719,7 +577,7 @@ def heat_balance(index):
 # cooling power nodal balance
 def cool_balance(index):
     t, m = index
-    n = [i for i in range(n_nodes) if network[i].name in network[m].district_cooling.connections]
+    n = topology.district_cooling.neighbors[m]
     i_chiller = chiller_by_node[m]
     i_abs = abs_by_node[m]
     i_cs = c_storage_by_node[m]
@@ -743,14 +601,14 @@ def voltage_limit_lower(index):
 # line current limits
 def current_limit(index):
     t, m = index
-    n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+    n = topology.electrical.neighbors[m]
     i_lines = e_lines_by_node[m]
     return (G[m,m]**2 + B[m,n[RANGE]]**2)*(x_m[m,t] + x_m[n[RANGE],t] - 2*y_mn[i_lines[RANGE],t])<= current_limit_value**2
 
 # equality to assure that x,y,z variable subsitution holds: xmxn = ymn^2 + zmn^2
 def electric_interrelation(index):
     t, m = index #m is the node
-    n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+    n = topology.electrical.neighbors[m]
     i_lines = e_lines_by_node[m]
     return cvxpy.norm(x_m[n[RANGE],t] + x_m[m,t],2) + cvxpy.norm(z_mn[i_lines[RANGE],t],2) + cvxpy.norm(y_mn[i_lines[RANGE],t],2) <=0
     #return cvxpy.norm(x_m[n[RANGE],t] + x_m[m,t],2) >= cvxpy.norm(y_mn[i_lines[RANGE],t],2) + cvxpy.norm(z_mn[i_lines[RANGE],t],2)
@@ -761,29 +619,29 @@ def electric_interrelation(index):
 def line_heat(index):
     t, m = index #m is the node
     m_line = h_lines_by_node[m]
-    n = [i for i in range(n_nodes) if network[i].name in network[m].district_heat.connections]
-    n_line = [h_lines_by_node[i][network[i].district_heat.connections.index(network[m].name)] for i in n]#index of line from n to m 
+    n = topology.district_heat.neighbors[m]
+    n_line = [topology.district_heat.line_index[(i, m)] for i in n]#index of line from n to m 
     return h_mn[m_line[RANGE],t] == -h_mn[n_line[RANGE],t]
 
 def line_cooling(index):
     t, m = index #m is the node
     m_line = c_lines_by_node[m]#index of line from m to n
-    n = [i for i in range(n_nodes) if network[i].name in network[m].district_cooling.connections]
-    n_line = [c_lines_by_node[i][network[i].district_cooling.connections.index(network[m].name)] for i in n]#index of line from n to m 
+    n = topology.district_cooling.neighbors[m]
+    n_line = [topology.district_cooling.line_index[(i, m)] for i in n]#index of line from n to m 
     return c_mn[m_line[RANGE],t] == -c_mn[n_line[RANGE],t]
 
 # def line_electric_p(index):
 #     t, m = index
 #     m_line = e_lines_by_node[m]#index of line from m to n
-#     n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
-#     n_line = [e_lines_by_node[i][network[i].electrical.connections.index(network[m].name)] for i in n]
+#     n = topology.electrical.neighbors[m]
+#     n_line = [topology.electrical.line_index[(i, m)] for i in n]
 #     return y_mn[m_line[RANGE],t] == -y_mn[n_line[RANGE],t]
 
 # def line_electric_q(index):
 #     t, m = index
 #     m_line = e_lines_by_node[m]#index of line from m to n
-#     n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
-#     n_line = [e_lines_by_node[i][network[i].electrical.connections.index(network[m].name)] for i in n]
+#     n = topology.electrical.neighbors[m]
+#     n_line = [topology.electrical.line_index[(i, m)] for i in n]
 #     return z_mn[m_line[RANGE],t] == -z_mn[n_line[RANGE],t]
 # storage constraint functions
 
@@ -1240,7 +1098,7 @@ if n_h_storage>0:
 #c_mn = VariableGroup("c_mn", indexes = index_c_lines)
 
 #define utility costs
-pelec_cost = [find_utility_pricing(date_stamp) for date_stamp in date_range]
+pelec_cost = grid_para[0].tariff().prices(date_range[0], len(date_range))
 qelec_cost = np.divide(pelec_cost,5)
 pselback_rate = np.divide(pelec_cost,-2)
 qselback_rate = -qelec_cost
@@ -36,6 +36,8 @@ import pandas as pd
 import openpyxl
 import xlsxwriter
 import cvxpy
+from dispatch.variable_group import VariableGroup as BaseVariableGroup, RANGE, constant_zero
+from dispatch.topology import NetworkTopology
 import pickle
 from class_definition.plant_struct import Plant, Network, Optimoptions
 from class_definition.test_data import TestData
@@ -246,27 +248,13 @@ boiler_para = convert_quadratic(boiler_para)
     
 
 
-#find_nodes creates a list of lists of indexes of equipment by node
-def find_nodes(comp_list):
-    comp_by_node = []
-    for node in network:
-        this_node = []
-        i = 0
-        for comp in comp_list:
-            check = any([True for equip in node.equipment if equip.name==comp.name])
-            if check:
-                this_node.append(i)
-            i = i+1
-        comp_by_node.append(this_node)
-    return comp_by_node
+#index the network once: node and line numbers, equipment by node and incidence matrices
+topology = NetworkTopology(network)
 
 #create a list of lines by node
-e_lines_by_node = [] #list of connections by list of nodes
-c_lines_by_node = []
-h_lines_by_node = []
-i_e = 0 #index of line connection
-i_c = 0
-i_h = 0
+e_lines_by_node = topology.electrical.lines_by_node #list of connections by list of nodes
+c_lines_by_node = topology.district_cooling.lines_by_node
+h_lines_by_node = topology.district_heat.lines_by_node
 i = 0
 e_nodes = [] #list of electrical nodes
 c_nodes = []
@@ -275,12 +263,6 @@ for node in network:
     n_e = len(node.electrical.connections)
     n_c = len(node.district_cooling.connections)
     n_h = len(node.district_heat.connections)
-    e_lines_by_node.append([i_e+i for i in range(n_e)])
-    c_lines_by_node.append([i_c+i for i in range(n_c)])
-    h_lines_by_node.append([i_h+i for i in range(n_h)])
-    i_e += n_e
-    i_c += n_c
-    i_h += n_h
     if n_e>0:
         e_nodes.append(i)
     if n_c>0:
@@ -291,9 +273,9 @@ for node in network:
 n_e_nodes = len(e_nodes) #number of electrical nodes
 n_c_nodes = len(c_nodes)
 n_h_nodes = len(h_nodes)
-n_e_lines = i_e
-n_c_lines = i_c
-n_h_lines = i_h
+n_e_lines = topology.electrical.n_lines
+n_c_lines = topology.district_cooling.n_lines
+n_h_lines = topology.district_heat.n_lines
 
 G = np.ones((len(network), len(network)))*-4
 B = np.ones((len(network), len(network)))*-6
@@ -373,22 +355,16 @@ states = []
 constraints = []
 date_range = [start_date+datetime.timedelta(hours=i) for i in range(T)]
 ## create list of components of each type at each node
-grid_by_node = find_nodes(grid_para)
-turbine_by_node = find_nodes(turbine_para)
-diesel_by_node = find_nodes(diesel_para)
-boiler_by_node = find_nodes(boiler_para)
-chiller_by_node = find_nodes(chiller_para)
-#abs_by_node = find_nodes(abs_para)
-e_storage_by_node = find_nodes(e_storage_para)
-h_storage_by_node = find_nodes(h_storage_para)
-c_storage_by_node = find_nodes(c_storage_para)
-renew_by_node = find_nodes(renew_para)
-
-
-
-# variable to indicate that we want all variables that match a pattern
-# one item in the tuple key can be RANGE
-RANGE = -1
+grid_by_node = topology.components_by_node(grid_para)
+turbine_by_node = topology.components_by_node(turbine_para)
+diesel_by_node = topology.components_by_node(diesel_para)
+boiler_by_node = topology.components_by_node(boiler_para)
+chiller_by_node = topology.components_by_node(chiller_para)
+#abs_by_node = topology.components_by_node(abs_para)
+e_storage_by_node = topology.components_by_node(e_storage_para)
+h_storage_by_node = topology.components_by_node(h_storage_para)
+c_storage_by_node = topology.components_by_node(c_storage_para)
+renew_by_node = topology.components_by_node(renew_para)
 
 
 ####### POWER NETWORK OBJECT CLASS DEFINITIONS AND FUNCTIONS
@@ -422,16 +398,13 @@ class Storage(object):
         if now_soc is None:
             raise ValueError("STATE OF CHARGE IS NONE")
 
-def binary_var(var_name):
-    return cvxpy.Variable(name=var_name, boolean=True)
-
 #forecast function
 def find_demand(date_stamp,demand_type, n=0):
-    f_ind = test_data.timestamp.index(date_stamp)
+    f_ind = test_data.time_index().position(date_stamp)
     return getattr(test_data.demand,demand_type)[n,f_ind]
 
 def find_solar_forecast(date_stamp, n=0):
-    f_ind = test_data.timestamp.index(date_stamp)
+    f_ind = test_data.time_index().position(date_stamp)
     irrad = test_data.weather.irrad_dire_norm[f_ind]
     solar_gen = 0
     if not renew_by_node[n] == []:
@@ -439,143 +412,23 @@ def find_solar_forecast(date_stamp, n=0):
     return solar_gen
 
 
-#electric utility pricing function
-def find_utility_pricing(date_stamp):
-    i = 0
-    weekday = date_stamp.weekday()
-    hour = date_stamp.hour
-    month = date_stamp.month
-    day = date_stamp.day
-    sum_start_month = grid_para[i].sum_start_month
-    win_start_month = grid_para[i].win_start_month
-    sum_start_day = grid_para[i].sum_start_day
-    win_start_day = grid_para[i].win_start_day
-    #determine which rate table to use (summer or winter)
-    if month > sum_start_month and month < win_start_month:
-        rate = grid_para[i].sum_rate_table[weekday, hour]
-    elif month < sum_start_month or month > win_start_month:
-        rate = grid_para[i].win_rate_table[weekday, hour]
-    elif month == sum_start_month:
-        if day>= sum_start_day:
-            rate = grid_para[i].sum_rate_table[weekday, hour]
-        else:
-            rate = grid_para[i].win_rate_table[weekday, hour]
-    elif month == win_start_month:
-        if day>= win_start_day:
-            rate = grid_para[i].win_rate_table[weekday, hour]
-        else:
-            rate = grid_para[i].sum_rate_table[weekday, hour]
-    return rate
-
 #gas utility pricing function
 def find_gas_pricing(date_stamp):
-    i=0
-    day_stamp = datetime.datetime(year=date_stamp.year, month=date_stamp.month, day=date_stamp.day)
-    price_ind = fuel_para[i].timestamp.index(day_stamp)
-    return fuel_para[i].rate[price_ind]
+    fuel = [f for f in fuel_para if f.source == 'ng'][0]
+    return fuel.rate_for([date_stamp])[0]
 
 #diesel supply pricing function
 def find_diesel_pricing(date_stamp):
-    i=1
-    day_stamp = datetime.datetime(year=date_stamp.year, month=date_stamp.month, day=date_stamp.day)
-    price_ind = fuel_para[i].timestamp.index(day_stamp)
-    return fuel_para[i].rate[price_ind]
+    fuel = [f for f in fuel_para if f.source == 'diesel'][0]
+    return fuel.rate_for([date_stamp])[0]
 
 #  all network objects create a group of variables associated with that object
-class VariableGroup(object):
-    def __init__(self, name, indexes=(), is_binary_var=False, lower_bound_func=None, upper_bound_func=None, T=T, pieces=[1]):
-        self.variables = {}
-
-        name_base = name
-        #if it is a piecewise function, make the variable group be a group of arrays (1,KK)
-        if pieces==[1]:
-            pieces = [1 for i in indexes[0]]
-
-        #create name base string
-        for _ in range(len(indexes)):
-            name_base += "_{}"
-
-        #create variable for each timestep and each component with a corresponding name
-        for index in itertools.product(*indexes):
-            var_name = name_base.format(*index)
-
-            if is_binary_var:
-                var = binary_var(var_name)
-            else:
-                #assign upper and lower bounds for the variable
-                if lower_bound_func is not None:
-                    lower_bound = lower_bound_func(index)
-                else:
-                    lower_bound = None
-
-                if upper_bound_func is not None:
-                    upper_bound = upper_bound_func(index)
-                else:
-                    upper_bound = None
-
-                #the lower bound should always be set if the upper bound is set
-                if lower_bound is None and upper_bound is not None:
-                    raise RuntimeError("Lower bound should not be unset while upper bound is set")
-
-                #create the cp variable
-                if lower_bound_func == constant_zero:
-                    var = cvxpy.Variable(pieces[index[0]], name = var_name, nonneg=True)
-                elif lower_bound is not None:
-                    var = cvxpy.Variable(pieces[index[0]], name=var_name)
-                    #constr = [var>=lower_bound]
-                elif upper_bound is not None:
-                    var = cvxpy.Variable(pieces[index[0]],name=var_name)
-                    #constr = [var<=upper_bound, var>=lower_bound]
-                else:
-                    var = cvxpy.Variable(pieces[index[0]], name=var_name)
-                
-
-            self.variables[index] = var
-            var_name_list.append(var_name)
-            #self.constraints[index] = constr
-        
-    #internal function to find variables associated with your key
-    def match(self, key):
-        position = key.index(RANGE)
-        def predicate(xs, ys):
-            z=0
-            for i, (x, y) in enumerate(zip(xs, ys)):
-                if i != position and x==y:
-                    z += 1
-            return z == len(key)-1
-
-
-        keys = list(self.variables.keys())
-        keys = [k for k in keys if predicate(k,key)]
-        keys.sort(key=lambda k: k[position]) 
-
-        return [self.variables[k] for k in keys]
-
-    #variable function to get the variables associated with the key
-    def __getitem__(self, key):
-        if type(key) != tuple:
-            key = (key,)
-            
-        #n_ones = 0
-        #for i, x in enumerate(key):
-        #    if x == RANGE:
-        #        n_ones+=1
-        n_range = key.count(RANGE)
-
-        if n_range == 0:
-            return self.variables[key]
-        elif n_range ==1:
-            return self.match(key)
-        else:
-            raise ValueError("Can only get RANGE for one index.")
-
-
-def constant(x):
-    def _constant(*args, **kwargs):
-        return x
-    return _constant
+#  and add the variable names to var_name_list for writing the solution
+class VariableGroup(BaseVariableGroup):
+    def __init__(self, *args, **kwargs):
+        BaseVariableGroup.__init__(self, *args, **kwargs)
+        var_name_list.extend(self.names)
 
-constant_zero = constant(0)
 
 
 ######### CONSTRAINT FUNCTIONS
@@ -597,7 +450,7 @@ def run_horizon(timestep):
     #electric nodal balance
     def electric_p_balance(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_turb = turbine_by_node[m]
         i_grid = grid_by_node[m]
         i_chiller = chiller_by_node[m]
@@ -622,7 +475,7 @@ def run_horizon(timestep):
     # reactive power nodal balance
     def electric_q_balance(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_turb = turbine_by_node[m]
         i_grid = grid_by_node[m]
         i_chiller = chiller_by_node[m]
@@ -642,7 +495,7 @@ def run_horizon(timestep):
     #heat nodal balance
     def heat_balance(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].district_heat.connections]
+        n = topology.district_heat.neighbors[m]
         i_turb = turbine_by_node[m]
         i_boiler = boiler_by_node[m]
         i_hs = h_storage_by_node[m]
@@ -662,7 +515,7 @@ def run_horizon(timestep):
     # cooling power nodal balance
     def cool_balance(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].district_cooling.connections]
+        n = topology.district_cooling.neighbors[m]
         i_chiller = chiller_by_node[m]
         #i_abs = abs_by_node[m]
         i_cs = c_storage_by_node[m]
@@ -704,14 +557,14 @@ def run_horizon(timestep):
     # line current limits
     def current_limit(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_lines = e_lines_by_node[m]
         return (G[m,m]**2 + B[m,n[RANGE]]**2)*(x_m[m,t] + x_m[n[RANGE],t] - 2*y_mn[i_lines[RANGE],t])<= current_limit_value**2
 
     # equality to assure that x,y,z variable subsitution holds: xmxn = ymn^2 + zmn^2
     def electric_interrelation(index):
         t, m = index #m is the node
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_lines = e_lines_by_node[m]
         #return cvxpy.power(x_m[n[RANGE],t] + x_m[m,t],2) - cvxpy.power(x_m[n[RANGE],t], 2) - cvxpy.power(x_m[m,t], 2) >= cvxpy.power(y_mn[i_lines[RANGE],t], 2) + cvxpy.power(z_mn[i_lines[RANGE], t], 2) 
         #return x_m[n[RANGE],t]*x_m[m,t] == y_mn[i_lines[RANGE],t]**2 + z_mn[i_lines[RANGE],t]**2
@@ -721,7 +574,7 @@ def run_horizon(timestep):
 
     def D1_def(index):
         t, m = index
-        #n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        #n = topology.electrical.neighbors[m]
         i_lines = e_lines_by_node[m]
         return D1_mn[i_lines[RANGE],t] == 2*y_mn[i_lines[RANGE],t]
 
@@ -732,13 +585,13 @@ def run_horizon(timestep):
 
     def D3_def(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_lines = e_lines_by_node[m]
         return D3_mn[i_lines[RANGE],t] == x_m[m,t] - x_m[n[RANGE],t]
     
     def D4_def(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_lines = e_lines_by_node[m]
         return D4_mn[i_lines[RANGE],t] == x_m[m,t] -x_m[n[RANGE],t]
 
@@ -751,16 +604,16 @@ def run_horizon(timestep):
     def line_heat(index):
         t, m = index #m is the node
         m_line = h_lines_by_node[m]
-        n = [i for i in range(n_nodes) if network[i].name in network[m].district_heat.connections]
-        n_line = [h_lines_by_node[i][network[i].district_heat.connections.index(network[m].name)] for i in n]#index of line from n to m 
+        n = topology.district_heat.neighbors[m]
+        n_line = [topology.district_heat.line_index[(i, m)] for i in n]#index of line from n to m 
         n_line = n_line[::-1] # this only works becase of heating and cooling loops being cyclical
         return h_mn[m_line[RANGE],t] == h_mn[n_line[RANGE],t]
 
     def line_cooling(index):
         t, m = index #m is the node
         m_line = c_lines_by_node[m]#index of line from m to n
-        n = [i for i in range(n_nodes) if network[i].name in network[m].district_cooling.connections]
-        n_line = [c_lines_by_node[i][network[i].district_cooling.connections.index(network[m].name)] for i in n]#index of line from n to m 
+        n = topology.district_cooling.neighbors[m]
+        n_line = [topology.district_cooling.line_index[(i, m)] for i in n]#index of line from n to m 
         n_line = n_line[::-1] # this only works because of heating and cooling loops having sequential connections
         return c_mn[m_line[RANGE],t] == c_mn[n_line[RANGE],t]
 
@@ -1175,7 +1028,7 @@ def run_horizon(timestep):
     c_mn = VariableGroup("c_mn", indexes = index_c_lines, lower_bound_func = constant_zero)
 
     #define utility costs
-    pelec_cost = [find_utility_pricing(date_stamp) for date_stamp in date_range]
+    pelec_cost = grid_para[0].tariff().prices(date_range[0], len(date_range))
     qelec_cost = np.divide(pelec_cost,5)
     pselback_rate = np.divide(pelec_cost,-2)
     qselback_rate = qelec_cost
@@ -36,6 +36,8 @@ import pandas as pd
 import openpyxl
 import xlsxwriter
 import cvxpy
+from dispatch.variable_group import VariableGroup as BaseVariableGroup, RANGE, constant_zero
+from dispatch.topology import NetworkTopology
 import pickle
 from class_definition.plant_struct import Plant, Network, Optimoptions
 from class_definition.test_data import TestData
@@ -85,6 +87,7 @@ T = 24 #horizon
 timesteps = 3 #number of receding horizon repetitions
 allow_dumping= False#True
 allow_thermal_slack = False
+parameterized = True # build the problem once and only update its cvxpy Parameters each solve, False rebuilds it every solve
 bigM = 10#1e2 #cost of not meeting demand exactly
 
 #functions to process information from generator list and network description
@@ -117,6 +120,9 @@ chiller_init = []
 boiler_init = []
 #abs_init = np.zeros((n_abs,1))
 var_name_list = []
+variable_groups = {} # variable groups of the problem by name
+horizon_prob = None # problem compiled by build_horizon
+horizon_parameters = {} # parameters of horizon_prob by name
 
 for i in range(len(gen)):
     if isinstance(gen[i], ElectricChiller):
@@ -270,27 +276,13 @@ boiler_para = convert_quadratic(boiler_para)
     
 
 
-#find_nodes creates a list of lists of indexes of equipment by node
-def find_nodes(comp_list):
-    comp_by_node = []
-    for node in network:
-        this_node = []
-        i = 0
-        for comp in comp_list:
-            check = any([True for equip in node.equipment if equip.name==comp.name])
-            if check:
-                this_node.append(i)
-            i = i+1
-        comp_by_node.append(this_node)
-    return comp_by_node
+#index the network once: node and line numbers, equipment by node and incidence matrices
+topology = NetworkTopology(network)
 
 #create a list of lines by node
-e_lines_by_node = [] #list of connections by list of nodes
-c_lines_by_node = []
-h_lines_by_node = []
-i_e = 0 #index of line connection
-i_c = 0
-i_h = 0
+e_lines_by_node = topology.electrical.lines_by_node #list of connections by list of nodes
+c_lines_by_node = topology.district_cooling.lines_by_node
+h_lines_by_node = topology.district_heat.lines_by_node
 i = 0
 e_nodes = [] #list of electrical nodes
 e_connected_nodes = []
@@ -300,12 +292,6 @@ for node in network:
     n_e = len(node.electrical.connections)
     n_c = len(node.district_cooling.connections)
     n_h = len(node.district_heat.connections)
-    e_lines_by_node.append([i_e+i for i in range(n_e)])
-    c_lines_by_node.append([i_c+i for i in range(n_c)])
-    h_lines_by_node.append([i_h+i for i in range(n_h)])
-    i_e += n_e
-    i_c += n_c
-    i_h += n_h
     if n_e>0:
         e_connected_nodes.append(i)
     if n_e>0 or node.electrical.load !=None:
@@ -319,9 +305,9 @@ n_e_nodes = len(e_nodes) #number of electrical nodes
 n_e_connected_nodes = len(e_connected_nodes) #number of electrical nodes that are connected to other nodes
 n_c_nodes = len(c_nodes)
 n_h_nodes = len(h_nodes)
-n_e_lines = i_e
-n_c_lines = i_c
-n_h_lines = i_h
+n_e_lines = topology.electrical.n_lines
+n_c_lines = topology.district_cooling.n_lines
+n_h_lines = topology.district_heat.n_lines
 
 #G = np.ones((len(network), len(network)))*-4
 #B = np.ones((len(network), len(network)))*-6
@@ -465,25 +451,22 @@ states = []
 constraints = []
 date_range = [start_date+datetime.timedelta(hours=i) for i in range(T)]
 ## create list of components of each type at each node
-grid_by_node = find_nodes(grid_para)
-turbine_by_node = find_nodes(turbine_para)
-diesel_by_node = find_nodes(diesel_para)
-boiler_by_node = find_nodes(boiler_para)
-chiller_by_node = find_nodes(chiller_para)
-#abs_by_node = find_nodes(abs_para)
-e_storage_by_node = find_nodes(e_storage_para)
-h_storage_by_node = find_nodes(h_storage_para)
-c_storage_by_node = find_nodes(c_storage_para)
-renew_by_node = find_nodes(renew_para)
+grid_by_node = topology.components_by_node(grid_para)
+turbine_by_node = topology.components_by_node(turbine_para)
+diesel_by_node = topology.components_by_node(diesel_para)
+boiler_by_node = topology.components_by_node(boiler_para)
+chiller_by_node = topology.components_by_node(chiller_para)
+#abs_by_node = topology.components_by_node(abs_para)
+e_storage_by_node = topology.components_by_node(e_storage_para)
+h_storage_by_node = topology.components_by_node(h_storage_para)
+c_storage_by_node = topology.components_by_node(c_storage_para)
+renew_by_node = topology.components_by_node(renew_para)
 
 # set the starting value for x_n
 # it is used as an upper limit, so allow it to be the upper bound on voltage
 x_n = np.ones((n_e_nodes,T))*(1+voltage_deviation)**2
 
 
-# variable to indicate that we want all variables that match a pattern
-# one item in the tuple key can be RANGE
-RANGE = -1
 
 
 ####### POWER NETWORK OBJECT CLASS DEFINITIONS AND FUNCTIONS
@@ -517,13 +500,10 @@ class Storage(object):
         if now_soc is None:
             raise ValueError("STATE OF CHARGE IS NONE")
 
-def binary_var(var_name):
-    return cvxpy.Variable(name=var_name, boolean=True)
-
 #forecast function
 def find_demand(date_stamp,demand_type, n=0):
     if n != None:
-        f_ind = test_data.timestamp.index(date_stamp)
+        f_ind = test_data.time_index().position(date_stamp)
         if demand_type == 'e':
             demand = getattr(test_data.demand,demand_type)[n,f_ind]/p_base
         elif demand_type == 'h':
@@ -535,7 +515,7 @@ def find_demand(date_stamp,demand_type, n=0):
     return demand
 
 def find_solar_forecast(date_stamp, n=0):
-    f_ind = test_data.timestamp.index(date_stamp)
+    f_ind = test_data.time_index().position(date_stamp)
     irrad = test_data.weather.irrad_dire_norm[f_ind]
     solar_gen = 0
     if not renew_by_node[n] == []:
@@ -543,152 +523,26 @@ def find_solar_forecast(date_stamp, n=0):
     return solar_gen
 
 
-#electric utility pricing function
-def find_utility_pricing(date_stamp):
-    i = 0
-    weekday = date_stamp.weekday()
-    hour = date_stamp.hour
-    month = date_stamp.month
-    day = date_stamp.day
-    sum_start_month = grid_para[i].sum_start_month
-    win_start_month = grid_para[i].win_start_month
-    sum_start_day = grid_para[i].sum_start_day
-    win_start_day = grid_para[i].win_start_day
-    #determine which rate table to use (summer or winter)
-    # then apply the indices from the rate table to the find the actual rates
-    if month > sum_start_month and month < win_start_month:
-        i_rate = grid_para[i].sum_rate_table[weekday][hour]
-        rate = grid_para[i].sum_rates[i_rate,0]
-    elif month < sum_start_month or month > win_start_month:
-        i_rate = grid_para[i].win_rate_table[weekday][hour]
-        rate = grid_para[i].win_rates[i_rate,0]
-    elif month == sum_start_month:
-        if day>= sum_start_day:
-            i_rate = grid_para[i].sum_rate_table[weekday][hour]
-            rate = grid_para[i].sum_rates[i_rate,0]
-        else:
-            i_rate = grid_para[i].win_rate_table[weekday][hour]
-            rate = grid_para[i].win_rates[i_rate,0]
-    elif month == win_start_month:
-        if day>= win_start_day:
-            i_rate = grid_para[i].win_rate_table[weekday][hour]
-            rate = grid_para[i].win_rates[i_rate,0]
-        else:
-            i_rate = grid_para[i].sum_rate_table[weekday][hour]
-            rate = grid_para[i].sum_rates[i_rate,0]
-    return rate
-
 #gas utility pricing function
 def find_gas_pricing(date_stamp):
-    i=0
-    day_stamp = datetime.datetime(year=date_stamp.year, month=date_stamp.month, day=date_stamp.day)
-    price_ind = fuel_para[i].timestamp.index(day_stamp)
-    gas_rate = fuel_para[i].rate[price_ind] # price in $/thousand cubic feet
+    fuel = [f for f in fuel_para if f.source == 'ng'][0]
+    gas_rate = fuel.rate_for([date_stamp])[0] # price in $/thousand cubic feet
     gas_rate = gas_rate*(1/293.07) # convert to $/kWh gas --> 293.07 kWh/thousand cubic feet natural gas
     return gas_rate
 
 #diesel supply pricing function
 def find_diesel_pricing(date_stamp):
-    i=1
-    day_stamp = datetime.datetime(year=date_stamp.year, month=date_stamp.month, day=date_stamp.day)
-    price_ind = fuel_para[i].timestamp.index(day_stamp)
-    return fuel_para[i].rate[price_ind]
+    fuel = [f for f in fuel_para if f.source == 'diesel'][0]
+    return fuel.rate_for([date_stamp])[0]
 
 #  all network objects create a group of variables associated with that object
-class VariableGroup(object):
-    def __init__(self, name, indexes=(), is_binary_var=False, lower_bound_func=None, upper_bound_func=None, T=T, pieces=[1]):
-        self.variables = {}
+#  and add the variable names to var_name_list for writing the solution
+class VariableGroup(BaseVariableGroup):
+    def __init__(self, *args, **kwargs):
+        BaseVariableGroup.__init__(self, *args, **kwargs)
+        var_name_list.extend(self.names)
+        variable_groups[self.name] = self
 
-        name_base = name
-        #if it is a piecewise function, make the variable group be a group of arrays (1,KK)
-        if pieces==[1]:
-            pieces = [1 for i in indexes[0]]
-
-        #create name base string
-        for _ in range(len(indexes)):
-            name_base += "_{}"
-
-        #create variable for each timestep and each component with a corresponding name
-        for index in itertools.product(*indexes):
-            var_name = name_base.format(*index)
-
-            if is_binary_var:
-                var = binary_var(var_name)
-            else:
-                #assign upper and lower bounds for the variable
-                if lower_bound_func is not None:
-                    lower_bound = lower_bound_func(index)
-                else:
-                    lower_bound = None
-
-                if upper_bound_func is not None:
-                    upper_bound = upper_bound_func(index)
-                else:
-                    upper_bound = None
-
-                #the lower bound should always be set if the upper bound is set
-                if lower_bound is None and upper_bound is not None:
-                    raise RuntimeError("Lower bound should not be unset while upper bound is set")
-
-                #create the cp variable
-                if lower_bound_func == constant_zero:
-                    var = cvxpy.Variable(pieces[index[0]], name = var_name, nonneg=True)
-                elif lower_bound is not None:
-                    var = cvxpy.Variable(pieces[index[0]], name=var_name)
-                    #constr = [var>=lower_bound]
-                elif upper_bound is not None:
-                    var = cvxpy.Variable(pieces[index[0]],name=var_name)
-                    #constr = [var<=upper_bound, var>=lower_bound]
-                else:
-                    var = cvxpy.Variable(pieces[index[0]], name=var_name)
-                
-
-            self.variables[index] = var
-            var_name_list.append(var_name)
-            #self.constraints[index] = constr
-        
-    #internal function to find variables associated with your key
-    def match(self, key):
-        position = key.index(RANGE)
-        def predicate(xs, ys):
-            z=0
-            for i, (x, y) in enumerate(zip(xs, ys)):
-                if i != position and x==y:
-                    z += 1
-            return z == len(key)-1
-
-
-        keys = list(self.variables.keys())
-        keys = [k for k in keys if predicate(k,key)]
-        keys.sort(key=lambda k: k[position]) 
-
-        return [self.variables[k] for k in keys]
-
-    #variable function to get the variables associated with the key
-    def __getitem__(self, key):
-        if type(key) != tuple:
-            key = (key,)
-            
-        #n_ones = 0
-        #for i, x in enumerate(key):
-        #    if x == RANGE:
-        #        n_ones+=1
-        n_range = key.count(RANGE)
-
-        if n_range == 0:
-            return self.variables[key]
-        elif n_range ==1:
-            return self.match(key)
-        else:
-            raise ValueError("Can only get RANGE for one index.")
-
-
-def constant(x):
-    def _constant(*args, **kwargs):
-        return x
-    return _constant
-
-constant_zero = constant(0)
 
 
 ######### CONSTRAINT FUNCTIONS
@@ -705,12 +559,94 @@ def add_constraint(name, indexes, constraint_func):
 toc = time.time()-tic
 print('load all data and functions' + str(toc))
 
-def run_horizon(timestep, v_iters, x_n):
+def forecast_horizon(date_range):
+    # INPUTS:
+    # date_range: the timestamps of the hours in the horizon
+    #
+    # OUTPUTS:
+    # forecast: demand and renewable generation at each node
+    # pelec_cost, qelec_cost: real and reactive electric utility costs
+    # gas_rate, diesel_rate: fuel costs
+    #
+    #define utility costs
+    pelec_cost = grid_para[0].tariff(tiered=True).prices(date_range[0], len(date_range))
+    qelec_cost = np.multiply(pelec_cost,5)
+    gas_rate = [find_gas_pricing(date_stamp) for date_stamp in date_range]
+    diesel_rate = [find_diesel_pricing(date_stamp) for date_stamp in date_range]
+
+    #forecast generation and demand
+    forecast = TestData()
+    forecast.demand.h = np.zeros((len(network),T))
+    forecast.demand.c = np.zeros((len(network),T))
+    setattr(forecast.demand, 'ep', np.zeros((len(network), T)))
+    setattr(forecast.demand, 'eq', np.zeros((len(network), T)))
+    setattr(forecast, 'renew', np.zeros((len(network),T)))
+    i = 0
+    for node in network:
+        #if not node.electrical.load == []:
+        ep_demand = [find_demand(date_stamp, 'e', n=node.electrical.load) for date_stamp in date_range]
+        forecast.demand.ep[i,:] = ep_demand #np.multiply(ep_demand, 1/n_nodes)
+        forecast.demand.eq[i,:] = np.multiply(ep_demand, 0.05)#assume high power factor for now
+        if not node.district_heat.load == None:
+            h = [find_demand(date_stamp, 'h', n =node.district_heat.load) for date_stamp in date_range]
+            #h = [load[0] for load in h]
+            forecast.demand.h[i,:] = np.multiply(h, 1)
+        if not node.district_cooling.load == None:
+            c = [find_demand(date_stamp, 'c', n=node.district_cooling.load) for date_stamp in date_range]
+            #c = [load[0] for load in c]
+            forecast.demand.c[i,:] = np.multiply(c,1)
+        forecast.renew[i,:] = np.array([find_solar_forecast(date_stamp, n=i) for date_stamp in date_range])
+        i +=1
+    return forecast, pelec_cost, qelec_cost, gas_rate, diesel_rate
+
+def build_horizon():
+    # builds the variables, objective and constraints of a horizon. The forecast,
+    # prices, initial conditions and voltage guesses x_n are cvxpy Parameters,
+    # so the problem is compiled once and later solves only update their values
+    #
+    # OUTPUTS:
+    # prob: the cvxpy problem
+    # parameters: dictionary of the problem's parameters by name
+    #
+    global constraints, var_name_list, variable_groups
+    constraints = []
+    var_name_list = []
+    variable_groups = {}
+
+    #forecast generation and demand
+    forecast = TestData()
+    forecast.demand.h = cvxpy.Parameter((len(network),T), name='h_demand')
+    forecast.demand.c = cvxpy.Parameter((len(network),T), name='c_demand')
+    setattr(forecast.demand, 'ep', cvxpy.Parameter((len(network),T), name='ep_demand'))
+    setattr(forecast.demand, 'eq', cvxpy.Parameter((len(network),T), name='eq_demand'))
+    setattr(forecast, 'renew', cvxpy.Parameter((len(network),T), name='renew'))
+    #utility costs
+    pelec_cost = cvxpy.Parameter(T, name='pelec_cost')
+    qelec_cost = cvxpy.Parameter(T, name='qelec_cost')
+    qselback_rate = qelec_cost
+    gas_rate = cvxpy.Parameter(T, name='gas_rate')
+    diesel_rate = cvxpy.Parameter(T, name='diesel_rate')
+    #initial conditions
+    turbine_init = cvxpy.Parameter(n_turbines, name='turbine_init')
+    dieselgen_init = cvxpy.Parameter(n_dieselgen, name='dieselgen_init')
+    boiler_init = cvxpy.Parameter(n_boilers, name='boiler_init')
+    chiller_init = cvxpy.Parameter(n_chillers, name='chiller_init')
+    e_storage0 = cvxpy.Parameter(n_e_storage, name='e_storage0')
+    h_storage0 = cvxpy.Parameter(n_h_storage, name='h_storage0')
+    c_storage0 = cvxpy.Parameter(n_c_storage, name='c_storage0')
+    #last iteration's attempt at voltage values
+    x_n = cvxpy.Parameter((n_e_nodes,T), name='x_n')
+    parameters = {}
+    for parameter in (forecast.demand.ep, forecast.demand.eq, forecast.demand.h, forecast.demand.c, forecast.renew,\
+        pelec_cost, qelec_cost, gas_rate, diesel_rate, turbine_init, dieselgen_init, boiler_init, chiller_init,\
+        e_storage0, h_storage0, c_storage0, x_n):
+        parameters[parameter.name()] = parameter
+
     #balance equations
     #electric nodal balance
     def electric_p_balance(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_turb = turbine_by_node[m]
         i_grid = grid_by_node[m]
         i_chiller = chiller_by_node[m]
@@ -746,7 +682,7 @@ def run_horizon(timestep, v_iters, x_n):
     # reactive power nodal balance
     def electric_q_balance(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_turb = turbine_by_node[m]
         i_grid = grid_by_node[m]
         i_chiller = chiller_by_node[m]
@@ -775,7 +711,7 @@ def run_horizon(timestep, v_iters, x_n):
     #heat nodal balance
     def heat_balance(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].district_heat.connections]
+        n = topology.district_heat.neighbors[m]
         i_turb = turbine_by_node[m]
         i_boiler = boiler_by_node[m]
         i_hs = h_storage_by_node[m]
@@ -795,7 +731,7 @@ def run_horizon(timestep, v_iters, x_n):
     # cooling power nodal balance
     def cool_balance(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].district_cooling.connections]
+        n = topology.district_cooling.neighbors[m]
         i_chiller = chiller_by_node[m]
         #i_abs = abs_by_node[m]
         i_cs = c_storage_by_node[m]
@@ -823,11 +759,10 @@ def run_horizon(timestep, v_iters, x_n):
         # find lines out
         m_lines = e_lines_by_node[m]
         # find lines back in
-        node_ns = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        node_ns = topology.electrical.neighbors[m]
         n_lines = []
         for n in node_ns:
-            this_line = [i for i in range(len(e_lines_by_node[n])) if network[m].name == network[n].electrical.connections[i]]
-            n_lines.append(e_lines_by_node[n][this_line[0]])
+            n_lines.append(topology.electrical.line_index[(n, m)])
         # set those lines equal for y_mn
         return y_mn[m_lines[RANGE],t] == y_mn[n_lines[RANGE],t]
 
@@ -836,11 +771,10 @@ def run_horizon(timestep, v_iters, x_n):
         # find lines out
         m_lines = e_lines_by_node[m]
         # find lines back in
-        node_ns = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        node_ns = topology.electrical.neighbors[m]
         n_lines = []
         for n in node_ns:
-            this_line = [i for i in range(len(e_lines_by_node[n])) if network[m].name == network[n].electrical.connections[i]]
-            n_lines.append(e_lines_by_node[n][this_line[0]])
+            n_lines.append(topology.electrical.line_index[(n, m)])
         # set those lines equal to the negative of each other for z_mn
         return z_mn[m_lines[RANGE],t] == -z_mn[n_lines[RANGE],t]
 
@@ -864,14 +798,14 @@ def run_horizon(timestep, v_iters, x_n):
     # line current limits
     def current_limit(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_lines = e_lines_by_node[m]
         return (G[m,m]**2 + B[m,n[RANGE]]**2)*(x_m[m,t] + x_m[n[RANGE],t] - 2*y_mn[i_lines[RANGE],t])<= current_limit_value**2
 
     # equality to assure that x,y,z variable subsitution holds: xmxn = ymn^2 + zmn^2
     def electric_interrelation(index):
         t, m = index #m is the node
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_lines = e_lines_by_node[m]
         #return cvxpy.power(x_m[n[RANGE],t] + x_m[m,t],2) - cvxpy.power(x_m[n[RANGE],t], 2) - cvxpy.power(x_m[m,t], 2) >= cvxpy.power(y_mn[i_lines[RANGE],t], 2) + cvxpy.power(z_mn[i_lines[RANGE], t], 2) 
         #return x_m[n[RANGE],t]*x_m[m,t] == y_mn[i_lines[RANGE],t]**2 + z_mn[i_lines[RANGE],t]**2
@@ -886,16 +820,16 @@ def run_horizon(timestep, v_iters, x_n):
     def line_heat(index):
         t, m = index #m is the node
         m_line = h_lines_by_node[m]
-        n = [i for i in range(n_nodes) if network[i].name in network[m].district_heat.connections]
-        n_line = [h_lines_by_node[i][network[i].district_heat.connections.index(network[m].name)] for i in n]#index of line from n to m 
+        n = topology.district_heat.neighbors[m]
+        n_line = [topology.district_heat.line_index[(i, m)] for i in n]#index of line from n to m 
         n_line = n_line[::-1] # this only works becase of heating and cooling loops being cyclical
         return h_mn[m_line[RANGE],t] == h_mn[n_line[RANGE],t]
 
     def line_cooling(index):
         t, m = index #m is the node
         m_line = c_lines_by_node[m]#index of line from m to n
-        n = [i for i in range(n_nodes) if network[i].name in network[m].district_cooling.connections]
-        n_line = [c_lines_by_node[i][network[i].district_cooling.connections.index(network[m].name)] for i in n]#index of line from n to m 
+        n = topology.district_cooling.neighbors[m]
+        n_line = [topology.district_cooling.line_index[(i, m)] for i in n]#index of line from n to m 
         n_line = n_line[::-1] # this only works because of heating and cooling loops having sequential connections
         return c_mn[m_line[RANGE],t] == c_mn[n_line[RANGE],t]
 
@@ -1306,39 +1240,6 @@ def run_horizon(timestep, v_iters, x_n):
     index_c_lines = range(n_c_lines), range(T)
     c_mn = VariableGroup("c_mn", indexes = index_c_lines, lower_bound_func = constant_zero)
 
-    #define utility costs
-    pelec_cost = [find_utility_pricing(date_stamp) for date_stamp in date_range]
-    qelec_cost = np.multiply(pelec_cost,5)
-    pselback_rate = np.divide(pelec_cost,-2)
-    qselback_rate = qelec_cost
-    gas_rate = [find_gas_pricing(date_stamp) for date_stamp in date_range]
-    diesel_rate = [find_diesel_pricing(date_stamp) for date_stamp in date_range]
-
-    #forecast generation and demand
-    forecast = TestData()
-    forecast.demand.h = np.zeros((len(network),T))
-    forecast.demand.c = np.zeros((len(network),T))
-    setattr(forecast.demand, 'ep', np.zeros((len(network), T)))
-    setattr(forecast.demand, 'eq', np.zeros((len(network), T)))
-    setattr(forecast, 'renew', np.zeros((len(network),T)))
-    i = 0
-    for node in network:
-        #if not node.electrical.load == []:
-        ep_demand = [find_demand(date_stamp, 'e', n=node.electrical.load) for date_stamp in date_range]
-        forecast.demand.ep[i,:] = ep_demand #np.multiply(ep_demand, 1/n_nodes)
-        forecast.demand.eq[i,:] = np.multiply(ep_demand, 0.05)#assume high power factor for now
-        if not node.district_heat.load == None:
-            h = [find_demand(date_stamp, 'h', n =node.district_heat.load) for date_stamp in date_range]
-            #h = [load[0] for load in h]
-            forecast.demand.h[i,:] = np.multiply(h, 1)
-        if not node.district_cooling.load == None:
-            c = [find_demand(date_stamp, 'c', n=node.district_cooling.load) for date_stamp in date_range]
-            #c = [load[0] for load in c]
-            forecast.demand.c[i,:] = np.multiply(c,1)
-        forecast.renew[i,:] = np.array([find_solar_forecast(date_stamp, n=i) for date_stamp in date_range])
-        i +=1
-
-
     toc = time.time()-tic
     print('Variables '+str(toc))
 
@@ -1528,11 +1429,32 @@ def run_horizon(timestep, v_iters, x_n):
 
     print('problem parameters loaded')
 
-
-    ######## SOLVE FINAL PROBLEM
     objective = cvxpy.Minimize(cvxpy.sum(objective_components))
     constraints_list = [x[0] for x in constraints]
     prob = cvxpy.Problem(objective, constraints_list)
+    if not prob.is_dcp(dpp=True):
+        print('problem is not DPP, it will be recompiled for every solve')
+    return prob, parameters
+
+def run_horizon(timestep, v_iters, x_n):
+    global horizon_prob, horizon_parameters
+    if horizon_prob is None or not parameterized:
+        horizon_prob, horizon_parameters = build_horizon()
+    prob = horizon_prob
+    x_m = variable_groups['x_m']
+
+    # update the parameters for this horizon and iteration
+    forecast, pelec_cost, qelec_cost, gas_rate, diesel_rate = forecast_horizon(date_range)
+    values = {'ep_demand': forecast.demand.ep, 'eq_demand': forecast.demand.eq, 'h_demand': forecast.demand.h,\
+        'c_demand': forecast.demand.c, 'renew': forecast.renew, 'pelec_cost': pelec_cost, 'qelec_cost': qelec_cost,\
+        'gas_rate': gas_rate, 'diesel_rate': diesel_rate, 'turbine_init': turbine_init, 'dieselgen_init': dieselgen_init,\
+        'boiler_init': boiler_init, 'chiller_init': chiller_init, 'e_storage0': e_storage0, 'h_storage0': h_storage0,\
+        'c_storage0': c_storage0, 'x_n': x_n}
+    for name, parameter in horizon_parameters.items():
+        parameter.value = np.array(values[name], dtype=float)
+
+
+    ######## SOLVE FINAL PROBLEM
     print('problem created, solving problem')
 
     tic = time.time()
@@ -1593,7 +1515,7 @@ def run_horizon(timestep, v_iters, x_n):
                         sheet1.write(t,n_col, var_name+'_'+str(j))
                 n_row = t+start_row
                 #write the value in the sheet
-                var = eval(var_name)[j,t]
+                var = variable_groups[var_name][j,t]
                 if var.attributes['boolean']:
                     val = var.value
                 elif var.value == None:
@@ -1631,14 +1553,14 @@ def run_horizon(timestep, v_iters, x_n):
                     _ = sheet1.cell(column=n_col+4, row=n_row, value=forecast.demand.h[0,t])
                     _ = sheet1.cell(column=n_col+5, row=n_row, value=forecast.demand.c[0,t])
                 book.save(output_filename)
-    del prob
+    if not parameterized:
+        horizon_prob = None
     return v_iters, x_n
 
 
 for t in range(timesteps):
     v_iters = 1
     while v_iters>0 and v_iters<10:
-        constraints = []
         v_iters, x_n = run_horizon(t, v_iters, x_n)
         if v_iters>0:
             v_iters = v_iters+1
@@ -34,11 +34,16 @@ import os
 import numpy as np
 import pandas as pd
 import openpyxl
-import csv
 from coreapi import codecs
 from copy import copy
 #import xlsxwriter
 import cvxpy
+from dispatch.variable_group import VariableGroup as BaseVariableGroup, RANGE, constant_zero
+from dispatch.topology import NetworkTopology
+from dispatch.solver_config import SolverConfig
+from dispatch.state import DispatchState, OUTPUT_GROUP, STATUS_GROUP, STORAGE
+from dispatch.result_store import ResultStore, group_columns
+from dispatch.voltage_iteration import VoltageIteration
 import pickle
 from class_definition.plant_struct import Plant, Network, Optimoptions
 from class_definition.test_data import TestData
@@ -90,8 +95,17 @@ T = 24 #horizon
 timesteps = 24*365 #number of receding horizon repetitions
 allow_dumping= False#True
 allow_thermal_slack = False
+parameterized = True # build the problem once and only update its cvxpy Parameters each solve, False rebuilds it every timestep
+output_store = 'command_output_wsu' # directory of the result store every timestep's dispatch is appended to, None keeps it in memory only
+warm_start = True # start each timestep from the last solution shifted by one hour, binaries included, as a MIP start (needs parameterized)
 bigM = 10#1e2 #cost of not meeting demand exactly
 grid_limit = 100
+# Gurobi first, then the installed fallback solvers; time_limit [s] and mip_gap bound each solve
+solver_config = SolverConfig(solver='GUROBI', time_limit=None, mip_gap=None, threads=None, solver_options={'GUROBI': {'NumericFocus': 3}})
+# voltage iterations of a timestep only update x_n, the next guess is a damped Anderson extrapolation of the last
+# iterations ('secant' per node and hour, 'plain' is x_n = x_m) and is kept within the voltage limits
+voltage_iteration = VoltageIteration(method='anderson', tolerance=0.005, max_iters=20, damping=0.7,
+                                     lower=(1-voltage_deviation)**2, upper=(1+voltage_deviation)**2, verbose=True)
 
 #functions to process information from generator list and network description
 ## this library sorts components by type and by type by node
@@ -123,6 +137,10 @@ chiller_init = []
 boiler_init = []
 #abs_init = np.zeros((n_abs,1))
 var_name_list = []
+variable_groups = {} # variable groups of the problem by name
+horizon_prob = None # problem compiled by build_horizon
+horizon_parameters = {} # parameters of horizon_prob by name
+result_store = None # ResultStore of the dispatch, created on the first timestep
 
 for i in range(len(gen)):
     if isinstance(gen[i], ElectricChiller):
@@ -276,27 +294,13 @@ boiler_para = convert_quadratic(boiler_para)
     
 
 
-#find_nodes creates a list of lists of indexes of equipment by node
-def find_nodes(comp_list):
-    comp_by_node = []
-    for node in network:
-        this_node = []
-        i = 0
-        for comp in comp_list:
-            check = any([True for equip in node.equipment if equip.name==comp.name])
-            if check:
-                this_node.append(i)
-            i = i+1
-        comp_by_node.append(this_node)
-    return comp_by_node
+#index the network once: node and line numbers, equipment by node and incidence matrices
+topology = NetworkTopology(network)
 
 #create a list of lines by node
-e_lines_by_node = [] #list of connections by list of nodes
-c_lines_by_node = []
-h_lines_by_node = []
-i_e = 0 #index of line connection
-i_c = 0
-i_h = 0
+e_lines_by_node = topology.electrical.lines_by_node #list of connections by list of nodes
+c_lines_by_node = topology.district_cooling.lines_by_node
+h_lines_by_node = topology.district_heat.lines_by_node
 i = 0
 e_nodes = [] #list of electrical nodes
 e_connected_nodes = []
@@ -306,12 +310,6 @@ for node in network:
     n_e = len(node.electrical.connections)
     n_c = len(node.district_cooling.connections)
     n_h = len(node.district_heat.connections)
-    e_lines_by_node.append([i_e+i for i in range(n_e)])
-    c_lines_by_node.append([i_c+i for i in range(n_c)])
-    h_lines_by_node.append([i_h+i for i in range(n_h)])
-    i_e += n_e
-    i_c += n_c
-    i_h += n_h
     if n_e>0:
         e_connected_nodes.append(i)
     if n_e>0 or node.electrical.load !=None:
@@ -325,9 +323,9 @@ n_e_nodes = len(e_nodes) #number of electrical nodes
 n_e_connected_nodes = len(e_connected_nodes) #number of electrical nodes that are connected to other nodes
 n_c_nodes = len(c_nodes)
 n_h_nodes = len(h_nodes)
-n_e_lines = i_e
-n_c_lines = i_c
-n_h_lines = i_h
+n_e_lines = topology.electrical.n_lines
+n_c_lines = topology.district_cooling.n_lines
+n_h_lines = topology.district_heat.n_lines
 
 #G = np.ones((len(network), len(network)))*-4
 #B = np.ones((len(network), len(network)))*-6
@@ -476,30 +474,30 @@ n_e_storage = len(e_storage_para)
 n_c_storage = len(c_storage_para)
 n_h_storage = len(h_storage_para)
 n_components = len(gen)
+# unit outputs, on/off status and storage states handed from one timestep to the next,
+# starting like the *_init lists at half of each size
+dispatch_state = DispatchState(turbine_para, diesel_para, boiler_para, chiller_para, e_storage_para, h_storage_para, c_storage_para, output_fraction=0.5)
 n_nodes = len(network)
 states = []
 constraints = []
 date_range = [start_date+datetime.timedelta(hours=i) for i in range(T)]
 ## create list of components of each type at each node
-grid_by_node = find_nodes(grid_para)
-turbine_by_node = find_nodes(turbine_para)
-diesel_by_node = find_nodes(diesel_para)
-boiler_by_node = find_nodes(boiler_para)
-chiller_by_node = find_nodes(chiller_para)
-#abs_by_node = find_nodes(abs_para)
-e_storage_by_node = find_nodes(e_storage_para)
-h_storage_by_node = find_nodes(h_storage_para)
-c_storage_by_node = find_nodes(c_storage_para)
-renew_by_node = find_nodes(renew_para)
+grid_by_node = topology.components_by_node(grid_para)
+turbine_by_node = topology.components_by_node(turbine_para)
+diesel_by_node = topology.components_by_node(diesel_para)
+boiler_by_node = topology.components_by_node(boiler_para)
+chiller_by_node = topology.components_by_node(chiller_para)
+#abs_by_node = topology.components_by_node(abs_para)
+e_storage_by_node = topology.components_by_node(e_storage_para)
+h_storage_by_node = topology.components_by_node(h_storage_para)
+c_storage_by_node = topology.components_by_node(c_storage_para)
+renew_by_node = topology.components_by_node(renew_para)
 
 # set the starting value for x_n
 # it is used as an upper limit, so allow it to be the upper bound on voltage
 x_n = np.ones((n_e_nodes,T))*(1+voltage_deviation)**2
 
 
-# variable to indicate that we want all variables that match a pattern
-# one item in the tuple key can be RANGE
-RANGE = -1
 
 
 ####### POWER NETWORK OBJECT CLASS DEFINITIONS AND FUNCTIONS
@@ -533,13 +531,10 @@ class Storage(object):
         if now_soc is None:
             raise ValueError("STATE OF CHARGE IS NONE")
 
-def binary_var(var_name):
-    return cvxpy.Variable(name=var_name, boolean=True)
-
 #forecast function
 def find_demand(date_stamp,demand_type, n=0):
     if n != None:
-        f_ind = test_data.timestamp.index(date_stamp)
+        f_ind = test_data.time_index().position(date_stamp)
         if demand_type == 'e':
             demand = getattr(test_data.demand,demand_type)[n][f_ind]/p_base
         elif demand_type == 'h':
@@ -551,7 +546,7 @@ def find_demand(date_stamp,demand_type, n=0):
     return demand
 
 def find_solar_forecast(date_stamp, n=0):
-    f_ind = test_data.timestamp.index(date_stamp)
+    f_ind = test_data.time_index().position(date_stamp)
     irrad = test_data.weather.irrad_dire_norm[f_ind]
     if irrad == -9900: #this value is an error from the sensor
         irrad = 0
@@ -561,153 +556,26 @@ def find_solar_forecast(date_stamp, n=0):
     return solar_gen
 
 
-#electric utility pricing function
-def find_utility_pricing(date_stamp):
-    i = 0
-    weekday = date_stamp.weekday()
-    hour = date_stamp.hour
-    month = date_stamp.month
-    day = date_stamp.day
-    sum_start_month = grid_para[i].sum_start_month
-    win_start_month = grid_para[i].win_start_month
-    sum_start_day = grid_para[i].sum_start_day
-    win_start_day = grid_para[i].win_start_day
-    #determine which rate table to use (summer or winter)
-    # then apply the indices from the rate table to the find the actual rates
-    if month > sum_start_month and month < win_start_month:
-        i_rate = grid_para[i].sum_rate_table[weekday][hour]
-        rate = grid_para[i].sum_rates[i_rate,0]
-    elif month < sum_start_month or month > win_start_month:
-        i_rate = grid_para[i].win_rate_table[weekday][hour]
-        rate = grid_para[i].win_rates[i_rate,0]
-    elif month == sum_start_month:
-        if day>= sum_start_day:
-            i_rate = grid_para[i].sum_rate_table[weekday][hour]
-            rate = grid_para[i].sum_rates[i_rate,0]
-        else:
-            i_rate = grid_para[i].win_rate_table[weekday][hour]
-            rate = grid_para[i].win_rates[i_rate,0]
-    elif month == win_start_month:
-        if day>= win_start_day:
-            i_rate = grid_para[i].win_rate_table[weekday][hour]
-            rate = grid_para[i].win_rates[i_rate,0]
-        else:
-            i_rate = grid_para[i].sum_rate_table[weekday][hour]
-            rate = grid_para[i].sum_rates[i_rate,0]
-    return rate
-
 #gas utility pricing function
 def find_gas_pricing(date_stamp):
-    i=0
-    day_stamp = datetime.datetime(year=date_stamp.year, month=date_stamp.month, day=date_stamp.day)
-    price_ind = fuel_para[i].timestamp.index(day_stamp)
-    gas_rate = fuel_para[i].rate[price_ind] # price in $/thousand cubic feet
+    fuel = [f for f in fuel_para if f.source == 'ng'][0]
+    gas_rate = fuel.rate_for([date_stamp])[0] # price in $/thousand cubic feet
     gas_rate = gas_rate*(1/293.07) # convert to $/kWh gas --> 293.07 kWh/thousand cubic feet natural gas
     return gas_rate
 
 #diesel supply pricing function
 def find_diesel_pricing(date_stamp):
-    i=1
-    day_stamp = datetime.datetime(year=date_stamp.year, month=date_stamp.month, day=date_stamp.day)
-    price_ind = fuel_para[i].timestamp.index(day_stamp)
-    return fuel_para[i].rate[price_ind]
+    fuel = [f for f in fuel_para if f.source == 'diesel'][0]
+    return fuel.rate_for([date_stamp])[0]
 
 #  all network objects create a group of variables associated with that object
-class VariableGroup(object):
-    def __init__(self, name, indexes=(), is_binary_var=False, lower_bound_func=None, upper_bound_func=None, T=T, pieces=[1]):
-        global var_name_list
-        self.variables = {}
-
-        name_base = name
-        #if it is a piecewise function, make the variable group be a group of arrays (1,KK)
-        if pieces==[1]:
-            pieces = [1 for i in indexes[0]]
-
-        #create name base string
-        for _ in range(len(indexes)):
-            name_base += "_{}"
-
-        #create variable for each timestep and each component with a corresponding name
-        for index in itertools.product(*indexes):
-            var_name = name_base.format(*index)
-
-            if is_binary_var:
-                var = binary_var(var_name)
-            else:
-                #assign upper and lower bounds for the variable
-                if lower_bound_func is not None:
-                    lower_bound = lower_bound_func(index)
-                else:
-                    lower_bound = None
-
-                if upper_bound_func is not None:
-                    upper_bound = upper_bound_func(index)
-                else:
-                    upper_bound = None
-
-                #the lower bound should always be set if the upper bound is set
-                if lower_bound is None and upper_bound is not None:
-                    raise RuntimeError("Lower bound should not be unset while upper bound is set")
-
-                #create the cp variable
-                if lower_bound_func == constant_zero:
-                    var = cvxpy.Variable(pieces[index[0]], name = var_name, nonneg=True)
-                elif lower_bound is not None:
-                    var = cvxpy.Variable(pieces[index[0]], name=var_name)
-                    #constr = [var>=lower_bound]
-                elif upper_bound is not None:
-                    var = cvxpy.Variable(pieces[index[0]],name=var_name)
-                    #constr = [var<=upper_bound, var>=lower_bound]
-                else:
-                    var = cvxpy.Variable(pieces[index[0]], name=var_name)
-                
-
-            self.variables[index] = var
-            var_name_list.append(var_name)
-            #self.constraints[index] = constr
-        
-    #internal function to find variables associated with your key
-    def match(self, key):
-        position = key.index(RANGE)
-        def predicate(xs, ys):
-            z=0
-            for i, (x, y) in enumerate(zip(xs, ys)):
-                if i != position and x==y:
-                    z += 1
-            return z == len(key)-1
-
-
-        keys = list(self.variables.keys())
-        keys = [k for k in keys if predicate(k,key)]
-        keys.sort(key=lambda k: k[position]) 
-
-        return [self.variables[k] for k in keys]
-
-    #variable function to get the variables associated with the key
-    def __getitem__(self, key):
-        if type(key) != tuple:
-            key = (key,)
-            
-        #n_ones = 0
-        #for i, x in enumerate(key):
-        #    if x == RANGE:
-        #        n_ones+=1
-        n_range = key.count(RANGE)
-
-        if n_range == 0:
-            return self.variables[key]
-        elif n_range ==1:
-            return self.match(key)
-        else:
-            raise ValueError("Can only get RANGE for one index.")
-
-
-def constant(x):
-    def _constant(*args, **kwargs):
-        return x
-    return _constant
+#  and add the variable names to var_name_list for writing the solution
+class VariableGroup(BaseVariableGroup):
+    def __init__(self, *args, **kwargs):
+        BaseVariableGroup.__init__(self, *args, **kwargs)
+        var_name_list.extend(self.names)
+        variable_groups[self.name] = self
 
-constant_zero = constant(0)
 
 
 ######### CONSTRAINT FUNCTIONS
@@ -724,23 +592,90 @@ def add_constraint(name, indexes, constraint_func):
 toc = time.time()-tic
 print('load all data and functions' + str(toc))
 
-def run_horizon(timestep, v_iters, x_n, pid_error_last):
+def forecast_horizon(date_range):
     # INPUTS:
-    # timestep: the timestamp for the timesteps in the horizon
-    # v_iters: an integer denoting how many times you have tried to converge on this problem
-    # x_n: last iterations attempt at voltage values
-    # pid_error: iteration error used for pid convergence
+    # date_range: the timestamps of the hours in the horizon
+    #
+    # OUTPUTS:
+    # forecast: demand and renewable generation at each node
+    # pelec_cost, qelec_cost: real and reactive electric utility costs
+    # gas_rate: natural gas cost
+    #
+    #define utility costs
+    pelec_cost = grid_para[0].tariff(tiered=True).prices(date_range[0], len(date_range))
+    qelec_cost = np.multiply(pelec_cost,5)
+    gas_rate = [find_gas_pricing(date_stamp) for date_stamp in date_range]
+    #diesel_rate = [find_diesel_pricing(date_stamp) for date_stamp in date_range]
+
+    #forecast generation and demand
+    forecast = TestData()
+    forecast.demand.h = np.zeros((len(network),T))
+    forecast.demand.c = np.zeros((len(network),T))
+    setattr(forecast.demand, 'ep', np.zeros((len(network), T)))
+    setattr(forecast.demand, 'eq', np.zeros((len(network), T)))
+    setattr(forecast, 'renew', np.zeros((len(network),T)))
+    i = 0
+    for node in network:
+        #if not node.electrical.load == []:
+        ep_demand = [find_demand(date_stamp, 'e', n=node.electrical.load) for date_stamp in date_range]
+        forecast.demand.ep[i,:] = ep_demand #np.multiply(ep_demand, 1/n_nodes)
+        forecast.demand.eq[i,:] = np.multiply(ep_demand, 0.05)#assume high power factor for now
+        if not node.district_heat.load == None:
+            h = [find_demand(date_stamp, 'h', n =node.district_heat.load) for date_stamp in date_range]
+            #h = [load[0] for load in h]
+            forecast.demand.h[i,:] = np.multiply(h, 1)
+        if not node.district_cooling.load == None:
+            c = [find_demand(date_stamp, 'c', n=node.district_cooling.load) for date_stamp in date_range]
+            #c = [load[0] for load in c]
+            forecast.demand.c[i,:] = np.multiply(c,1)
+        forecast.renew[i,:] = np.array([find_solar_forecast(date_stamp, n=i) for date_stamp in date_range])
+        i +=1
+    return forecast, pelec_cost, qelec_cost, gas_rate
+
+def build_horizon():
+    # builds the variables, objective and constraints of a horizon. The forecast,
+    # prices, initial conditions and voltage guesses x_n are cvxpy Parameters,
+    # so the problem is compiled once and later solves only update their values
     #
     # OUTPUTS:
-    # v_iters: integer denoting either number of iterations past, or 0 indicating convergence
-    # pid_error: error in voltage values as applied to the PID convergence
-    # x_n: the iteration's values for voltage at nodes
-    # 
+    # prob: the cvxpy problem
+    # parameters: dictionary of the problem's parameters by name
+    #
+    global constraints, var_name_list, variable_groups
+    constraints = []
+    var_name_list = []
+    variable_groups = {}
+
+    #forecast generation and demand
+    forecast = TestData()
+    forecast.demand.h = cvxpy.Parameter((len(network),T), name='h_demand')
+    forecast.demand.c = cvxpy.Parameter((len(network),T), name='c_demand')
+    setattr(forecast.demand, 'ep', cvxpy.Parameter((len(network),T), name='ep_demand'))
+    setattr(forecast.demand, 'eq', cvxpy.Parameter((len(network),T), name='eq_demand'))
+    setattr(forecast, 'renew', cvxpy.Parameter((len(network),T), name='renew'))
+    #utility costs
+    pelec_cost = cvxpy.Parameter(T, name='pelec_cost')
+    qelec_cost = cvxpy.Parameter(T, name='qelec_cost')
+    gas_rate = cvxpy.Parameter(T, name='gas_rate')
+    #initial conditions
+    turbine_init = cvxpy.Parameter(n_turbines, name='turbine_init')
+    boiler_init = cvxpy.Parameter(n_boilers, name='boiler_init')
+    chiller_init = cvxpy.Parameter(n_chillers, name='chiller_init')
+    e_storage0 = cvxpy.Parameter(n_e_storage, name='e_storage0')
+    h_storage0 = cvxpy.Parameter(n_h_storage, name='h_storage0')
+    c_storage0 = cvxpy.Parameter(n_c_storage, name='c_storage0')
+    #last iteration's attempt at voltage values
+    x_n = cvxpy.Parameter((n_e_nodes,T), name='x_n')
+    parameters = {}
+    for parameter in (forecast.demand.ep, forecast.demand.eq, forecast.demand.h, forecast.demand.c, forecast.renew,\
+        pelec_cost, qelec_cost, gas_rate, turbine_init, boiler_init, chiller_init, e_storage0, h_storage0, c_storage0, x_n):
+        parameters[parameter.name()] = parameter
+
     #balance equations
     #electric nodal balance
     def electric_p_balance(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_turb = turbine_by_node[m]
         i_grid = grid_by_node[m]
         i_chiller = chiller_by_node[m]
@@ -776,7 +711,7 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
     # reactive power nodal balance
     def electric_q_balance(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_turb = turbine_by_node[m]
         i_grid = grid_by_node[m]
         i_chiller = chiller_by_node[m]
@@ -805,7 +740,7 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
     #heat nodal balance
     def heat_balance(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].district_heat.connections]
+        n = topology.district_heat.neighbors[m]
         i_turb = turbine_by_node[m]
         i_boiler = boiler_by_node[m]
         i_hs = h_storage_by_node[m]
@@ -825,7 +760,7 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
     # cooling power nodal balance
     def cool_balance(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].district_cooling.connections]
+        n = topology.district_cooling.neighbors[m]
         i_chiller = chiller_by_node[m]
         #i_abs = abs_by_node[m]
         i_cs = c_storage_by_node[m]
@@ -853,11 +788,10 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
         # find lines out
         m_lines = e_lines_by_node[m]
         # find lines back in
-        node_ns = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        node_ns = topology.electrical.neighbors[m]
         n_lines = []
         for n in node_ns:
-            this_line = [i for i in range(len(e_lines_by_node[n])) if network[m].name == network[n].electrical.connections[i]]
-            n_lines.append(e_lines_by_node[n][this_line[0]])
+            n_lines.append(topology.electrical.line_index[(n, m)])
         # set those lines equal for y_mn
         return y_mn[m_lines[RANGE],t] == y_mn[n_lines[RANGE],t]
 
@@ -866,11 +800,10 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
         # find lines out
         m_lines = e_lines_by_node[m]
         # find lines back in
-        node_ns = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        node_ns = topology.electrical.neighbors[m]
         n_lines = []
         for n in node_ns:
-            this_line = [i for i in range(len(e_lines_by_node[n])) if network[m].name == network[n].electrical.connections[i]]
-            n_lines.append(e_lines_by_node[n][this_line[0]])
+            n_lines.append(topology.electrical.line_index[(n, m)])
         # set those lines equal to the negative of each other for z_mn
         return z_mn[m_lines[RANGE],t] == -z_mn[n_lines[RANGE],t]
 
@@ -902,14 +835,14 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
     # line current limits
     def current_limit(index):
         t, m = index
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_lines = e_lines_by_node[m]
         return (G[m,m]**2 + B[m,n[RANGE]]**2)*(x_m[m,t] + x_m[n[RANGE],t] - 2*y_mn[i_lines[RANGE],t])<= current_limit_value**2
 
     # equality to assure that x,y,z variable subsitution holds: xmxn = ymn^2 + zmn^2
     def electric_interrelation(index):
         t, m = index #m is the node
-        n = [i for i in range(n_nodes) if network[i].name in network[m].electrical.connections]
+        n = topology.electrical.neighbors[m]
         i_lines = e_lines_by_node[m]
         #return cvxpy.power(x_m[n[RANGE],t] + x_m[m,t],2) - cvxpy.power(x_m[n[RANGE],t], 2) - cvxpy.power(x_m[m,t], 2) >= cvxpy.power(y_mn[i_lines[RANGE],t], 2) + cvxpy.power(z_mn[i_lines[RANGE], t], 2) 
         #return x_m[n[RANGE],t]*x_m[m,t] == y_mn[i_lines[RANGE],t]**2 + z_mn[i_lines[RANGE],t]**2
@@ -924,7 +857,7 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
     def line_heat(index):
         t, m = index #m is the node
         m_line = h_lines_by_node[m]
-        n = [i for i in range(n_nodes) if network[i].name in network[m].district_heat.connections]
+        n = topology.district_heat.neighbors[m]
         n_line = []
         for i in n:
             i_n = network[i].district_heat.connections.index(network[m].name)
@@ -937,7 +870,7 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
     def line_cooling(index):
         t, m = index #m is the node
         m_line = c_lines_by_node[m]#index of line from m to n
-        n = [i for i in range(n_nodes) if network[i].name in network[m].district_cooling.connections]
+        n = topology.district_cooling.neighbors[m]
         n_line = []
         for i in n:
             i_n = network[i].district_cooling.connections.index(network[m].name)
@@ -1361,39 +1294,6 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
     index_c_lines = range(n_c_lines), range(T)
     c_mn = VariableGroup("c_mn", indexes = index_c_lines, lower_bound_func = constant_zero)
 
-    #define utility costs
-    pelec_cost = [find_utility_pricing(date_stamp) for date_stamp in date_range]
-    qelec_cost = np.multiply(pelec_cost,5)
-    pselback_rate = np.multiply(pelec_cost,0)
-    qselback_rate = np.multiply(qelec_cost, 0)
-    gas_rate = [find_gas_pricing(date_stamp) for date_stamp in date_range]
-    #diesel_rate = [find_diesel_pricing(date_stamp) for date_stamp in date_range]
-
-    #forecast generation and demand
-    forecast = TestData()
-    forecast.demand.h = np.zeros((len(network),T))
-    forecast.demand.c = np.zeros((len(network),T))
-    setattr(forecast.demand, 'ep', np.zeros((len(network), T)))
-    setattr(forecast.demand, 'eq', np.zeros((len(network), T)))
-    setattr(forecast, 'renew', np.zeros((len(network),T)))
-    i = 0
-    for node in network:
-        #if not node.electrical.load == []:
-        ep_demand = [find_demand(date_stamp, 'e', n=node.electrical.load) for date_stamp in date_range]
-        forecast.demand.ep[i,:] = ep_demand #np.multiply(ep_demand, 1/n_nodes)
-        forecast.demand.eq[i,:] = np.multiply(ep_demand, 0.05)#assume high power factor for now
-        if not node.district_heat.load == None:
-            h = [find_demand(date_stamp, 'h', n =node.district_heat.load) for date_stamp in date_range]
-            #h = [load[0] for load in h]
-            forecast.demand.h[i,:] = np.multiply(h, 1)
-        if not node.district_cooling.load == None:
-            c = [find_demand(date_stamp, 'c', n=node.district_cooling.load) for date_stamp in date_range]
-            #c = [load[0] for load in c]
-            forecast.demand.c[i,:] = np.multiply(c,1)
-        forecast.renew[i,:] = np.array([find_solar_forecast(date_stamp, n=i) for date_stamp in date_range])
-        i +=1
-
-
     toc = time.time()-tic
     print('Variables '+str(toc))
 
@@ -1432,7 +1332,7 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
         # for var in boiler_start[i, RANGE]:
         #     objective_components.append(var * boiler_para[i].start_cost)
 
-    stored_water_rate = np.mean(gas_rate)/(0.5*6.5) # the gas rate times approx gen efficiency times chiller COP
+    stored_water_rate = cvxpy.sum(gas_rate)/T/(0.5*6.5) # the gas rate times approx gen efficiency times chiller COP
     for i in range(n_c_storage):
         objective_components.append((c_storage_state[i,0]-c_storage_state[i,T-1])*stored_water_rate)
 
@@ -1590,327 +1490,121 @@ def run_horizon(timestep, v_iters, x_n, pid_error_last):
 
     print('problem parameters loaded')
 
-
-    ######## SOLVE FINAL PROBLEM
     objective = cvxpy.Minimize(cvxpy.sum(objective_components))
     constraints_list = [x[0] for x in constraints]
     prob = cvxpy.Problem(objective, constraints_list)
-    print('problem created, solving problem')
-
-    tic = time.time()
-    # if v_iters>1:
-    #     result = prob.solve(solver='GUROBI',verbose=True, NumericFocus=1, IterationLimit=500)#  
-    result = prob.solve(solver='GUROBI', NumericFocus=3)#, verbose=True)#NumericFocus=1, IterationLimit=10,  #solver = 'ECOS_BB')#verbose = True, , NumericFocus=3 warmstart = True, 
+    if not prob.is_dcp(dpp=True):
+        print('problem is not DPP, it will be recompiled for every solve')
+    return prob, parameters
+
+# values of a variable group at the first hour of the horizon, one per component
+# (the largest of its piecewise sections), 0 if it was not solved
+def first_hour(name):
+    value = variable_groups[name].array()
+    if value is None:
+        return np.zeros(len(variable_groups[name][RANGE, 0]))
+    value = value[:, 0]
+    return np.nanmax(value, axis=-1) if value.ndim > 1 else value
+
+def run_horizon(timestep, x_n):
+    # INPUTS:
+    # timestep: the timestamp for the timesteps in the horizon
+    # x_n: starting guess of the voltage values
+    #
+    # OUTPUTS:
+    # x_n: the last iteration's values for voltage at nodes
+    #
+    global horizon_prob, horizon_parameters, result_store
+    if horizon_prob is None or not parameterized:
+        horizon_prob, horizon_parameters = build_horizon()
+    prob = horizon_prob
+
+    # update the parameters for this horizon, x_n is updated by the voltage iteration
+    forecast, pelec_cost, qelec_cost, gas_rate = forecast_horizon(date_range)
+    values = {'ep_demand': forecast.demand.ep, 'eq_demand': forecast.demand.eq, 'h_demand': forecast.demand.h,\
+        'c_demand': forecast.demand.c, 'renew': forecast.renew, 'pelec_cost': pelec_cost, 'qelec_cost': qelec_cost,\
+        'gas_rate': gas_rate, 'turbine_init': turbine_init, 'boiler_init': boiler_init, 'chiller_init': chiller_init,\
+        'e_storage0': e_storage0, 'h_storage0': h_storage0, 'c_storage0': c_storage0}
+    for name, value in values.items():
+        horizon_parameters[name].value = np.array(value, dtype=float)
 
+    ######## SOLVE FINAL PROBLEM
+    # every voltage iteration solves the same compiled problem with new x_n values, returns
+    # the solved x_m values or None if there is no solution
+    def solve_voltages():
+        result, solve_stats = solver_config.solve(prob, warm_start=warm_start)
+        print('optimal cost: '+ str(result))
+        print('solved by '+solve_stats['solver']+', status '+str(solve_stats['status']))
+        if solve_stats['status'] not in cvxpy.settings.SOLUTION_PRESENT:
+            return None
+        return variable_groups['x_m'].array()
 
+    print('problem created, solving problem')
+    tic = time.time()
+    x_n = voltage_iteration.run(horizon_parameters['x_n'], solve_voltages, x_n)
     toc = time.time()-tic
-    print('optimal cost: '+ str(result))
     print('time step: ' + str(timestep))
-    #if result != float('inf'):
-    #    sort_solution(prob, var_name_list,T, forecast, timestep)#print(prob._solution)
     print('problem solved in '+str(toc)+'seconds')
 
-    # find error in voltage convergence
-    #voltage_error = [x_m[i,t].value[0] - x_n[i,t] for i,t in product(range(n_nodes), range(T))]
-    voltage_error = np.zeros((n_e_nodes, T))
-    pid_error = np.zeros((n_e_nodes, T))
-    # if v_iters == 1:
-    #     k = 0
-    # else:
-    #     k = 0.3
-
-    for m in range(n_e_nodes):
-        for t in range(T):
-            # calculate error
-            voltage_error[m,t] = x_m[m,t].value[0] - x_n[m,t]
-            # save for next iteration
-            # it is used as an upper limit, so try to prevent infeasibilities
-            #x_n[m,t] = np.sqrt(x_m[m,t].value[0]*x_n[m,t]) +0.001
-            #pid_error[m,t] = voltage_error[m,t]#(np.sqrt(x_m[m,t].value[0]*x_n[m,t])-x_n[m,t])#
-
-            # if the sign of the error changes, then you have overstepped, reduce step size
-            # if (voltage_error[m,t] < 0 and pid_error_last[m,t] > 0) or  (voltage_error[m,t] > 0 and pid_error_last[m,t] < 0):
-            #     pid_error[m,t] = -2/3*copy(pid_error_last[m,t])
-            #     #voltage_error[m,t] = copy(pid_error_last[m,t])#0
-            # else:
-            # if voltage_error[m,t]<0:
-            #     k = -.8
-            # else:
-            #     k = .8
-            x_n[m,t] = x_n[m,t] + voltage_error[m,t]#*(1-0.01/3)
-            # pid_error[m,t] = k*((voltage_error[m,t])**2)#+k/2*np.abs(voltage_error[m,t])#pid_error_last[m,t]*.25
-
-            # #x_n = x_n_previous + difference*gain
-            # xni = x_n[m,t] + pid_error[m,t]#voltage_error[m,t]*k #+ (pid_error_last[m,t]-pid_error[m,t])*0.1
-            # xni = min(xni, (1.0 + voltage_deviation)**2)
-            # xni = max(xni, (1.0 - voltage_deviation)**2)
-            # x_n[m,t] = xni
-            #x_n[m,t] = x_n[m,t] + pid_error[m,t]*0.75 + (pid_error_last[m,t]-pid_error[m,t])*0.2
-            #0.85 becomes unstable at iteration 138
-            #x_n[m,t] = np.sqrt(x_m[m,t].value[0]*x_n[m,t])
-            #x_n[m,t] = x_n[m,t] + (np.sqrt(x_m[m,t].value[0]*x_n[m,t])-x_n[m,t])*0.5
-            
-
-    #if values have converged, save values
-    if np.all(abs(voltage_error)<= 0.005) or v_iters>=19:
-        pid_error = np.zeros((n_e_nodes, T))
-        if v_iters >=19:
-            print('no convergence after 20 iterations, start clean for next timestep')
-            x_n = np.ones((n_e_nodes,T))
-        else:
-            print('voltage value convergence after '+ str(v_iters) + ' iterations')
-        v_iters = 0
+    #save the values of the last iteration, converged or not
+    if voltage_iteration.converged:
+        print('voltage value convergence after '+ str(len(voltage_iteration.history)) + ' iterations')
+    else:
+        print('Error: voltage iteration limit exceeded, continuing with best approximation for timestep '+str(timestep))
+        # start clean for next timestep
+        x_n = np.ones((n_e_nodes,T))
+    if output_store is not None:
         print('parsing and saving solution')
         tic = time.time()
         ######## SORT PROBLEM SOLUTION
-        #create a csv of the results
-        # make the first row, the name list
-        filename = 'command_output_wsu.csv'
-        field_names = []
-        if timestep==0:
-            open_method = 'w'
-            # for i in range(len(var_name_list)):
-            #     var_name = var_name_list[i]
-            #     split_name = var_name.split('_')
-            #     var_name = var_name.split(split_name[-2])[0][:-1]
-            #     j = int(split_name[-2])
-            #     t = int(split_name[-1])
-
-            # with open(filename, 'w', encoding='utf-8') as logfile:
-
-        
-        else:
-            open_method = 'a'
-        
-        with open(filename, open_method) as logfile:
-            values = {}
-            for i in range(len(var_name_list)):
-                var_name = var_name_list[i]
-                split_name = var_name.split('_')
-                var_name = var_name.split(split_name[-2])[0][:-1]
-                j = int(split_name[-2])
-                t = int(split_name[-1])
-                field_name = var_name+'_'+str(j)
-                # get numeric value
-                var_val = eval(var_name)[j,t]
-                if var_val.attributes['boolean']:
-                    var_val = var_val.value
-                elif var_val.value == None:
-                    var_val = 0
-                else:
-                    var_val = var_val.value[0]
-                # add to entry
-                if field_name in values:
-                    values[field_name].append(var_val)
-                else:
-                    field_names.append(field_name)
-                    values[field_name] = [var_val]
-            field_names.append('solar')
-            field_names.append('ep_demand')
-            field_names.append('eq_demand')
-            field_names.append('h_demand')
-            field_names.append('c_demand')
-            values['solar'] = sum(forecast.renew)
-            values['ep_demand'] = sum(forecast.demand.ep)
-            values['eq_demand'] = sum(forecast.demand.eq)
-            values['h_demand'] = sum(forecast.demand.h)
-            values['c_demand'] = sum(forecast.demand.c)
-            
-            logger = csv.DictWriter(logfile, fieldnames = field_names, lineterminator = '\n')
-            if timestep==0:
-                logger.writeheader()
-            # else:
-            #     logger = csv.writer(logfile)
-            for t in range(T):
-                values_by_row = {}
-                for key, value in values.items():
-                    values_by_row[key] = value[t]
-                #if timestep==0:
-                logger.writerow(values_by_row)
-                #else:
-                    
-            
-
-
-        # for i in range(len(var_name_list)):
-        #     var_name = var_name_list[i]
-        #     # make the first row, the name list
-        #     if timestep == 0:
-        #         with open(output_filename, 'a') as outfile:
-        #             outfile.write(var_name)
-        #     split_name = var_name.split('_')
-        #     var_name = var_name.split(split_name[-2])[0][:-1]
-        #     j = int(split_name[-2])
-        #     t = int(split_name[-1])
-        #     # if it's a new timestep, make a new line
-        #     if :
-        #         # add the date 
-        #         with open(output_filename, 'a') as outfile:
-        #             outfile.wrtie(val)
-        #         val = []
-
-        #     var_val = eval(var_name[j,t])
-        #     if var_val.attributes['boolean']:
-        #         var_val = var_val.value
-        #     elif var_val.value == None:
-        #         var_val = 0
-        #     else:
-        #         var_val = var_val.value[0]
-        #     val.append(var_val)
-        # # also append the demand values
-        # val.append(sum(forecast.renew[:,t]))
-        # val.append(sum(forecast.demand.ep[:,t]))
-
-
-        # create xlsx of results
-        # if result != float('inf'):
-        #     output_filename = 'command_output_wsu.xlsx'
-        #     if timestep == 0:
-        #         book = xlsxwriter.Workbook(output_filename)
-        #         sheet1 = book.add_worksheet("Dispatch")
-        #         n_col=-1
-        #     else:
-        #         book = openpyxl.load_workbook(output_filename)
-        #         sheet1 = book.get_sheet_by_name("Dispatch")
-        #         n_col=0
-        #     #temp_vars = prob.solution.primal_vars
-        #     j = 0
-        #     t = 0
-        #     start_row = timestep*T+1 #the row to start on
-        #     for i in range(len(var_name_list)):
-        #         var_name = var_name_list[i]
-        #         split_name = var_name.split('_')
-        #         var_name = var_name.split(split_name[-2])[0][:-1]
-        #         j = int(split_name[-2])
-        #         t = int(split_name[-1])
-        #         #if you got to a new variable add a new heading, column
-        #         if t == 0:
-        #             n_col = n_col+1 
-        #             if timestep == 0:
-        #                 sheet1.write(t,n_col, var_name+'_'+str(j))
-        #         n_row = t+start_row
-        #         #write the value in the sheet
-        #         var = eval(var_name)[j,t]
-        #         if var.attributes['boolean']:
-        #             val = var.value
-        #         elif var.value == None:
-        #             val = 0
-        #         else:
-        #             val = var.value[0]
-        #         if timestep==0:
-        #             sheet1.write(n_row,n_col, val)
-        #         else:
-        #             _ = sheet1.cell(column=n_col, row=n_row, value=val)
-        #     # put renewable production and demand at the end of the sheet
-        #     if t==0 and timestep==0:
-        #         sheet1.write(0,n_col+1, 'renewable_gen')
-        #         sheet1.write(0,n_col+2, 'demand_ep')
-        #         sheet1.write(0,n_col+3, 'demand_eq')
-        #         sheet1.write(0,n_col+4, 'demand_h')
-        #         sheet1.write(0,n_col+5, 'demand_c')
-        #         sheet1.write(0,n_col+6, 'datestamp')
-        #         sheet1.write(n_row,n_col+6, date_range[0].strftime("%m%d%Y, %H:%M:%S"))
-        #     elif t==0:
-        #         _ = sheet1.cell(column=n_col+6, row=n_row, value = date_range[0].strftime("%m%d%Y, %H:%M:%S"))
-
-        #     if timestep==0:
-        #         for t in range(T):
-        #             sheet1.write(t+start_row, n_col+1, sum(forecast.renew[:,t]))
-        #             sheet1.write(t+start_row, n_col+2, sum(forecast.demand.ep[:,t]))
-        #             sheet1.write(t+start_row, n_col+3, sum(forecast.demand.eq[:,t]))
-        #             sheet1.write(t+start_row, n_col+4, sum(forecast.demand.h[:,t]))
-        #             sheet1.write(t+start_row, n_col+5, sum(forecast.demand.c[:,t]))
-        #         book.close()
-        #     else:
-        #         for t in range(T):
-        #             _ = sheet1.cell(column=n_col+1, row=start_row+t, value=sum(forecast.renew[:,t]))
-        #             _ = sheet1.cell(column=n_col+2, row=start_row+t, value=sum(forecast.demand.ep[:,t]))
-        #             _ = sheet1.cell(column=n_col+3, row=start_row+t, value=sum(forecast.demand.eq[:,t]))
-        #             _ = sheet1.cell(column=n_col+4, row=start_row+t, value=sum(forecast.demand.h[:,t]))
-        #             _ = sheet1.cell(column=n_col+5, row=start_row+t, value=sum(forecast.demand.c[:,t]))
-        #         _ = sheet1.cell(column=n_col+6, row=start_row, value = date_range[0].strftime("%m%d%Y, %H:%M:%S"))
-        #         book.save(output_filename)
+        # append the hours of the horizon to the columnar result store, whose columns are
+        # made from the variable groups on the first timestep
+        if result_store is None:
+            columns, layout = group_columns(variable_groups)
+            result_store = ResultStore(output_store, columns + ['solar', 'ep_demand', 'eq_demand', 'h_demand', 'c_demand'],
+                                       layout, capacity=timesteps*T, new=True)
+        solution = dict((name, group.array()) for name, group in variable_groups.items())
+        result_store.append_solution(date_range, solution, extra={'solar': sum(forecast.renew), 'ep_demand': sum(forecast.demand.ep),
+            'eq_demand': sum(forecast.demand.eq), 'h_demand': sum(forecast.demand.h), 'c_demand': sum(forecast.demand.c)})
         toc = time.time()-tic
         print('time for parsing '+ str(toc))
 
-    del prob
-    return v_iters, x_n, pid_error
+    if not parameterized:
+        horizon_prob = None
+    return x_n
 
 
 for t in range(timesteps):
-    v_iters = 1
-    pid_error = np.zeros((n_e_nodes, T))
-    # allow up to ten iterations before just acceptig the last iteration as close enough
-    while v_iters>0 and v_iters<20:
-        constraints = []
-        var_name_list = []
-        # if you are on a subsequent timestep, try the voltages from the last timestep before starting over
-        # at the maximum voltage deviation. This helps reduce iterations, but may cause an overshoot in later timesteps
-        if v_iters == 1 and t>0:
-            # try:
-            v_iters, x_n, pid_error = run_horizon(t, v_iters, x_n, pid_error)
-            # if the voltages from last timestep don't work, start from the maximum voltage deviation
-            # except:
-            #     x_n = np.ones((n_e_nodes,T))*(1+voltage_deviation)**2
-            #     v_iters, x_n, pid_error = run_horizon(t, v_iters, x_n, pid_error)
-        else: 
-            v_iters, x_n, pid_error = run_horizon(t, v_iters, x_n, pid_error)
-        # increment the iteration
-        if v_iters>0:
-            v_iters = v_iters+1
-    
-    if v_iters==20:
-        error_string = 'Error: voltage iteration limit exceeded, continuing with best approximation for timestep '+str(t)
-        print(error_string)
-
-    # update x_n for next timestep
-    for n in range(n_e_nodes):
-        x_n_end = x_n[n][0]
-        x_n[n][:-1] = x_n[n][1:]
-        x_n[n][-1] = x_n_end
-        #x_n[n][-1] = 1.0
+    # on a subsequent timestep the iteration starts from the voltages of the last timestep
+    # instead of the maximum voltage deviation. This helps reduce iterations
+    x_n = run_horizon(t, x_n)
+
+    # update x_n for next timestep, the first hour moves to the end
+    x_n = np.roll(x_n, -1, axis=1)
+
+    # update initial conditions in memory from the first hour of this timestep's solution,
+    # read before the warm start below shifts the variable groups
+    dispatch_state.update(output=dict((kind, first_hour(name)) for kind, name in OUTPUT_GROUP.items() if name in variable_groups),
+                          status=dict((kind, first_hour(name) > 0.5) for kind, name in STATUS_GROUP.items() if name in variable_groups),
+                          storage=dict((kind, first_hour(kind + '_state')) for kind in STORAGE if kind + '_state' in variable_groups))
+    turbine_init = dispatch_state.output['turbine']
+    boiler_init = dispatch_state.output['boiler']
+    chiller_init = dispatch_state.output['chiller']
+    e_storage0 = dispatch_state.storage['e_storage']
+    h_storage0 = dispatch_state.storage['h_storage']
+    c_storage0 = dispatch_state.storage['c_storage']
+
+    # hours 1..T-1 of this solution are the start point for hours 0..T-2 of the next
+    # timestep, the last hour is repeated. The solver cache is cleared so Gurobi is
+    # started from the shifted values and not from its own unshifted solution
+    if warm_start and parameterized:
+        for group in variable_groups.values():
+            group.shift(1)
+        horizon_prob._solver_cache.clear()
 
     # update dates
     start_date = start_date + datetime.timedelta(hours=1)
     date_range = [start_date+datetime.timedelta(hours=i) for i in range(T)]
-    #update initial conditions
-    # read previous horizon's entry
-    n_row = t*T+1
-    # get the header indexing on the first iteration
-    if t == 0:
-        with open('command_output_wsu.csv', 'r') as filename:
-            logger = csv.reader(filename)
-            headers = next(logger, None)
-        t_init_i = headers.index('turbine_xp_0')
-        b_init_i = headers.index('boiler_x_0')
-        c_init_i = headers.index('chiller_x_0')
-        cws_init_i = headers.index('c_storage_state_0')
-
-    with open('command_output_wsu.csv', 'r') as filename:
-        logger = csv.reader(filename)
-        # skip all previous rows until you get to the initial condition row
-        for i in range(n_row):
-            next(logger)
-        row = next(logger)
-        turbine_init[0] = float(row[t_init_i])
-        turbine_init[1] = float(row[t_init_i+1])
-        turbine_init[2] = float(row[t_init_i+2])
-        turbine_init[3] = float(row[t_init_i+3])
-        boiler_init[0] = float(row[b_init_i])
-        boiler_init[1] = float(row[b_init_i+1])
-        boiler_init[2] = float(row[b_init_i+2])
-        boiler_init[3] = float(row[b_init_i+3])
-        boiler_init[4] = float(row[b_init_i+4])
-        chiller_init[0] = float(row[c_init_i])
-        chiller_init[1] = float(row[c_init_i+1])
-        chiller_init[2] = float(row[c_init_i+2])
-        chiller_init[3] = float(row[c_init_i+3])
-        chiller_init[4] = float(row[c_init_i+4])
-        chiller_init[5] = float(row[c_init_i+5])
-        chiller_init[6] = float(row[c_init_i+6])
-        chiller_init[7] = float(row[c_init_i+7])
-        chiller_init[8] = float(row[c_init_i+8])
-        c_storage0[0] = float(row[cws_init_i])
 
     # sheet1 = pd.read_excel('command_output_wsu.xlsx', sheet_name='Dispatch')
     # turbine_init[0] = sheet1['turbine_xp_0'][n_row]
@@ -0,0 +1,250 @@
+'''
+Builds whole constraint families as single matrix constraints.
+ConstraintFamily: one cvxpy constraint covering every index of a family,
+    with the legacy per-index names kept so duals can be mapped back.
+The builders below take MatrixVariableGroups and return ConstraintFamilies
+that cover all components and all hours at once.
+'''
+
+import itertools
+
+import numpy as np
+import scipy.sparse as sp
+import cvxpy
+
+from dispatch.variable_group import MatrixVariableGroup
+
+
+class ConstraintFamily(object):
+    '''A family of constraints stored as one cvxpy constraint.
+
+    The elements of the constraint follow the itertools.product order of
+    indexes (C order for a (components x hours) matrix). If offsets is set,
+    index number p owns the elements offsets[p]:offsets[p+1], like the
+    piecewise sections of a MatrixVariableGroup.
+
+    ATTRIBUTES:
+    name
+    indexes
+    constraint
+    offsets
+    '''
+
+    def __init__(self, name, indexes, constraint, offsets=None):
+        self.name = name
+        self.indexes = [list(axis) for axis in indexes]
+        self.constraint = constraint
+        self.offsets = offsets
+
+    #index tuples in the order of the constraint elements
+    def labels(self):
+        return list(itertools.product(*self.indexes))
+
+    #names the per-index constraints built by add_constraint would have had
+    def names(self):
+        name_base = self.name + "_{}"*len(self.indexes)
+        return [name_base.format(*index) for index in self.labels()]
+
+    #internal function to split a value of the constraint by index
+    def split(self, value):
+        if value is None:
+            return None
+        value = np.ravel(value, order='C')
+        if self.offsets is None:
+            return dict(zip(self.names(), value))
+        return dict((name, value[int(self.offsets[p]):int(self.offsets[p+1])]) for p, name in enumerate(self.names()))
+
+    def dual_values(self):
+        return self.split(self.constraint.dual_value)
+
+    def violations(self):
+        return self.split(self.constraint.violation())
+
+    #names of the indexes violated by more than tol
+    def violated(self, tol=1e-6):
+        violations = self.violations()
+        if violations is None:
+            return []
+        return [name for name, value in violations.items() if np.max(value, initial=0) > tol]
+
+
+#value of each component (a scalar or one value per piece) repeated for
+#every flat element of the group
+def expand(group, values):
+    n_rest = int(np.prod(group.shape[1:]))
+    blocks = []
+    for i, value in enumerate(values):
+        per_piece = np.broadcast_to(np.ravel(np.asarray(value, dtype=float)), (int(group.pieces[i].flat[0]),))
+        blocks.append(np.tile(per_piece, n_rest))
+    if len(blocks) == 0:
+        return np.zeros(0)
+    return np.concatenate(blocks)
+
+#sparse matrix that sums the piecewise sections of each index
+def piece_sum(group):
+    n_items = int(np.prod(group.shape))
+    n_pieces = group.pieces.ravel()
+    rows = np.repeat(np.arange(n_items), n_pieces)
+    cols = np.arange(int(group.offsets[-1]))
+    return sp.csr_matrix((np.ones(len(cols)), (rows, cols)), shape=(n_items, len(cols)))
+
+# piecewise families, one block of elements per (component, hour)
+def piece_lower_bound(name, x_group, s_group, lb):
+    c = cvxpy.multiply(expand(s_group, lb), s_group.variable) <= x_group.variable
+    return ConstraintFamily(name, x_group.indexes, c, x_group.offsets)
+
+def piece_upper_bound(name, x_group, s_group, ub):
+    c = cvxpy.multiply(expand(s_group, ub), s_group.variable) >= x_group.variable
+    return ConstraintFamily(name, x_group.indexes, c, x_group.offsets)
+
+#ub^2*s >= xp^2 + xq^2 for every piece
+def piece_apparent_upper_bound(name, xp_group, xq_group, s_group, ub):
+    ub2 = np.power(expand(s_group, ub), 2)
+    c = cvxpy.multiply(ub2, s_group.variable) >= cvxpy.square(xp_group.variable) + cvxpy.square(xq_group.variable)
+    return ConstraintFamily(name, xp_group.indexes, c, xp_group.offsets)
+
+#bounds with one value (or one value per piece) for each component
+def lower_bound(name, group, lb):
+    c = expand(group, lb) <= group.variable
+    return ConstraintFamily(name, group.indexes, c, group.offsets)
+
+def upper_bound(name, group, ub):
+    c = group.variable <= expand(group, ub)
+    return ConstraintFamily(name, group.indexes, c, group.offsets)
+
+# one element per (component, hour)
+def generate(name, x_group, x_k_group):
+    c = x_group.variable == piece_sum(x_k_group) @ x_k_group.variable
+    return ConstraintFamily(name, x_group.indexes, c)
+
+def status(name, s_group):
+    c = 1 >= piece_sum(s_group) @ s_group.variable
+    return ConstraintFamily(name, s_group.indexes, c)
+
+#ramp limits on the difference over the hour axis, starting at the second
+#hour. hours is the ramp time from each step to the next (ramp_hours)
+def ramp_up(name, group, ramp_rate, hours=1):
+    x = group.matrix()
+    rate = np.reshape(np.asarray(ramp_rate, dtype=float), (-1, 1))*np.reshape(hours, (1, -1))
+    c = x[:, :-1] + rate >= x[:, 1:]
+    return ConstraintFamily(name, (group.indexes[0], group.indexes[1][1:]), c)
+
+def ramp_down(name, group, ramp_rate, hours=1):
+    x = group.matrix()
+    rate = np.reshape(np.asarray(ramp_rate, dtype=float), (-1, 1))*np.reshape(hours, (1, -1))
+    c = x[:, :-1] - rate <= x[:, 1:]
+    return ConstraintFamily(name, (group.indexes[0], group.indexes[1][1:]), c)
+
+#ramp limits between the initial output and the first hour, hours is the
+#length of the first step
+def ramp_first_up(name, group, ramp_rate, init, hours=1):
+    x = group.matrix()
+    c = x[:, 0] <= init + np.asarray(ramp_rate, dtype=float)*hours
+    return ConstraintFamily(name, (group.indexes[0],), c)
+
+def ramp_first_down(name, group, ramp_rate, init, hours=1):
+    x = group.matrix()
+    c = init - np.asarray(ramp_rate, dtype=float)*hours <= x[:, 0]
+    return ConstraintFamily(name, (group.indexes[0],), c)
+
+#coefficients of one component as a (1 x pieces) row
+def as_row(values):
+    return np.reshape(np.asarray(values, dtype=float), (1, -1))
+
+#(hours x pieces) block of one component of a piecewise group
+def unit_pieces(group, i):
+    T = group.shape[1]
+    n_pieces = int(group.pieces[i, 0])
+    start = int(group.offsets[i*T])
+    return cvxpy.reshape(group.variable[start:start + T*n_pieces], (T, n_pieces), order='C')
+
+#per piece: sum of norm(b*x) + f*x over parts, + c*s - y <= 0
+#parts is a list of (x_group, b, f) with one b and f array per component
+def piece_consume(name, y_group, s_group, c, parts):
+    n_units, T = s_group.shape
+    blocks = []
+    for i in range(n_units):
+        expr = cvxpy.multiply(as_row(c[i]), unit_pieces(s_group, i))
+        for x_group, b, f in parts:
+            x = unit_pieces(x_group, i)
+            expr = expr + cvxpy.reshape(cvxpy.norm(cvxpy.multiply(as_row(b[i]), x), 2, axis=1), (T, 1), order='C')\
+             + cvxpy.multiply(as_row(f[i]), x)
+        if y_group is not None:
+            expr = expr - cvxpy.reshape(y_group.matrix()[i, :], (T, 1), order='C')
+        blocks.append(cvxpy.vec(expr, order='C'))
+    if len(blocks) == 0:
+        return ConstraintFamily(name, s_group.indexes, cvxpy.Constant(np.zeros(0)) <= 0, s_group.offsets)
+    return ConstraintFamily(name, s_group.indexes, cvxpy.hstack(blocks) <= 0, s_group.offsets)
+
+#flow on each line is the negative of the flow on the line running back
+def line_reverse(name, line_group, reverse):
+    lines = [l for l in range(len(reverse)) if l < reverse[l]]
+    back = [int(reverse[l]) for l in lines]
+    flows = line_group.matrix()
+    if len(lines) == 0:
+        c = cvxpy.Constant(np.zeros((0, line_group.shape[1]))) == 0
+    else:
+        c = flows[lines, :] == -flows[back, :]
+    return ConstraintFamily(name, (lines, line_group.indexes[1]), c)
+
+#lines of the electric network that end at a node
+def _node_lines(line_to):
+    return [l for l in range(len(line_to)) if line_to[l] >= 0]
+
+#current limit on each line: k*(x_m + x_n - 2*y_mn) <= limit^2
+def line_current(name, x_group, y_group, line_from, line_to, coefficients, limit):
+    lines = _node_lines(line_to)
+    x, y = x_group.matrix(), y_group.matrix()
+    if len(lines) == 0:
+        c = cvxpy.Constant(np.zeros((0, y_group.shape[1]))) <= 0
+    else:
+        k = np.reshape(np.asarray(coefficients, dtype=float)[lines], (-1, 1))
+        c = cvxpy.multiply(k, x[line_from[lines], :] + x[line_to[lines], :] - 2*y[lines, :]) <= limit**2
+    return ConstraintFamily(name, (lines, y_group.indexes[1]), c)
+
+#conic relaxation of y_mn^2 + z_mn^2 = x_m*x_n:
+#norm(2*y_mn, 2*z_mn, x_m - x_n) <= x_m + x_n
+def line_voltage_cone(name, x_group, y_group, z_group, line_from, line_to):
+    lines = _node_lines(line_to)
+    T = y_group.shape[1]
+    if len(lines) == 0:
+        return ConstraintFamily(name, ([], range(T)), cvxpy.Constant(np.zeros(0)) <= 0)
+    x, y, z = x_group.matrix(), y_group.matrix(), z_group.matrix()
+    x_from, x_to = x[line_from[lines], :], x[line_to[lines], :]
+    stacked = cvxpy.vstack([cvxpy.vec(2*y[lines, :], order='C'), cvxpy.vec(2*z[lines, :], order='C'), cvxpy.vec(x_from - x_to, order='C')])
+    c = cvxpy.norm(stacked, 2, axis=0) <= cvxpy.vec(x_from + x_to, order='C')
+    return ConstraintFamily(name, (lines, y_group.indexes[1]), c)
+
+#state of charge in the first hour from the initial state, charging and
+#discharging power is held for the hours of the first step
+def storage_init(name, state, ch, disch, eta_ch, eta_disch, state0, hours=1):
+    eta_ch = np.asarray(eta_ch, dtype=float)*hours
+    eta_disch = np.asarray(eta_disch, dtype=float)/hours
+    s, c, d = state.matrix(), ch.matrix(), disch.matrix()
+    constraint = s[:, 0] == state0 + cvxpy.multiply(eta_ch, c[:, 0]) - cvxpy.multiply(1/eta_disch, d[:, 0])
+    return ConstraintFamily(name, (state.indexes[0],), constraint)
+
+#state of charge in every later hour from the hour before, hours is the
+#length of every later step
+def storage_state(name, state, ch, disch, eta_ch, eta_disch, hours=1):
+    hours = np.reshape(hours, (1, -1))
+    eta_ch = np.reshape(np.asarray(eta_ch, dtype=float), (-1, 1))*hours
+    eta_disch = np.reshape(np.asarray(eta_disch, dtype=float), (-1, 1))/hours
+    s, c, d = state.matrix(), ch.matrix(), disch.matrix()
+    constraint = s[:, 1:] == s[:, :-1] + cvxpy.multiply(eta_ch, c[:, 1:]) - cvxpy.multiply(1/eta_disch, d[:, 1:])
+    return ConstraintFamily(name, (state.indexes[0], state.indexes[1][1:]), constraint)
+
+#(nodes x hours) sum over the components at each node of a group or of a
+#(components x hours) expression
+def node_sum(component_incidence, values):
+    if component_incidence.shape[1] == 0:
+        #cvxpy cannot evaluate products with empty variables
+        return np.zeros((component_incidence.shape[0], values.shape[1]))
+    if isinstance(values, MatrixVariableGroup):
+        values = values.matrix()
+    return component_incidence @ values
+
+#(nodes x hours) balance == 0, named by (hour, node) like the per-index balances
+def nodal_balance(name, balance, hours):
+    c = balance.T == 0
+    return ConstraintFamily(name, (hours, range(balance.shape[0])), c)
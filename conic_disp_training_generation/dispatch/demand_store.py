@@ -0,0 +1,115 @@
+'''
+Columnar on-disk store of the demand and weather data of a TestData.
+write_demand_store: writes every demand and weather series of a TestData
+    as a float memmap of its own, the timestamps as a datetime64 memmap and
+    the shapes and lengths of the series as JSON metadata.
+DemandStore: opens a store read-only. test_data() returns a TestData whose
+    series are the memmaps themselves, so opening a store takes the same
+    time for any number of years and a horizon only reads the pages of the
+    hours it uses.
+load_test_data: TestData from a store directory or from a TestData pickle.
+
+run from conic_disp_training_generation to convert a pickle:
+    python -m dispatch.demand_store pickle_file directory
+'''
+
+import os
+import sys
+import json
+import pickle
+
+import numpy as np
+
+from class_definition.test_data import TestData, Demand, Weather
+
+
+DEMAND_SERIES = ('e', 'h', 'c')
+WEATHER_SERIES = ('t_db', 'irrad_dire_norm')
+
+
+#(rows x hours) array of a demand series. A list of per-node arrays of
+#different lengths is padded with NaN after the shorter ones
+def series_rows(values):
+    if isinstance(values, np.ndarray):
+        return values.astype(float), None
+    rows = [np.asarray(row, dtype=float).ravel() for row in values]
+    lengths = [len(row) for row in rows]
+    array = np.full((len(rows), max(lengths)), np.nan)
+    for i, row in enumerate(rows):
+        array[i, :len(row)] = row
+    return array, lengths
+
+#write the non-empty series of test_data into directory
+def write_demand_store(directory, test_data):
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    series = {}
+    arrays = [('demand.' + name, series_rows(getattr(test_data.demand, name, []))) for name in DEMAND_SERIES
+              if len(getattr(test_data.demand, name, [])) > 0]
+    arrays += [('weather.' + name, (np.asarray(getattr(test_data.weather, name), dtype=float).ravel(), None)) for name in WEATHER_SERIES
+               if len(getattr(test_data.weather, name, [])) > 0]
+    for name, (values, lengths) in arrays:
+        file_name = name.replace('.', '_') + '.f64'
+        memmap = np.memmap(os.path.join(directory, file_name), dtype=np.float64, mode='w+', shape=values.shape)
+        memmap[:] = values
+        memmap.flush()
+        series[name] = {'file': file_name, 'shape': list(values.shape), 'lengths': lengths}
+    timestamp = np.array(test_data.timestamp, dtype='datetime64[us]')
+    memmap = np.memmap(os.path.join(directory, 'timestamp.i8'), dtype='datetime64[us]', mode='w+', shape=timestamp.shape)
+    memmap[:] = timestamp
+    memmap.flush()
+    metadata = {'series': series, 'timestamp': {'file': 'timestamp.i8', 'length': len(timestamp)},
+                'start': str(timestamp[0]) if len(timestamp) > 0 else None}
+    with open(os.path.join(directory, 'metadata.json'), 'w') as file_object:
+        json.dump(metadata, file_object, indent=1)
+    return DemandStore(directory)
+
+
+class DemandStore(object):
+    '''Read-only memmaps of the series of a demand store.
+
+    Demand series are (rows x hours) arrays, indexed like the arrays of a
+    pickled TestData as demand.e[n, f_ind] or demand.e[n][f_ind]. Rows that
+    were shorter than the longest row of their series are NaN after their
+    length. Weather series are 1D.
+
+    ATTRIBUTES:
+    directory
+    metadata
+    timestamp   datetime64[us] memmap of the timestamps
+    series      series name ('demand.e', 'weather.t_db', ...) -> memmap
+    '''
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'metadata.json')) as file_object:
+            self.metadata = json.load(file_object)
+        timestamp = self.metadata['timestamp']
+        self.timestamp = self.open(timestamp['file'], 'datetime64[us]', (timestamp['length'],))
+        self.series = dict((name, self.open(entry['file'], np.float64, tuple(entry['shape'])))
+                           for name, entry in self.metadata['series'].items())
+
+    def open(self, file_name, dtype, shape):
+        if 0 in shape:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.directory, file_name), dtype=dtype, mode='r', shape=shape)
+
+    #TestData of the memmaps, series that are not in the store keep the
+    #empty defaults of TestData
+    def test_data(self):
+        demand = Demand(**dict((name.split('.')[1], values) for name, values in self.series.items() if name.startswith('demand.')))
+        weather = Weather(**dict((name.split('.')[1], values) for name, values in self.series.items() if name.startswith('weather.')))
+        return TestData(timestamp=self.timestamp, demand=demand, weather=weather)
+
+
+#a directory is opened as a DemandStore, anything else is unpickled
+def load_test_data(path):
+    if os.path.isdir(path):
+        return DemandStore(path).test_data()
+    with open(path, 'rb') as file_object:
+        return pickle.load(file_object)
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'rb') as file_object:
+        write_demand_store(sys.argv[2], pickle.load(file_object))
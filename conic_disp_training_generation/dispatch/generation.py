@@ -0,0 +1,132 @@
+'''
+Parallel generation of a year of dispatch labels for the neural networks.
+split_hours: start dates and lengths of the chunks a period is split into.
+generate_chunk: receding horizon over one chunk, after a short lead-in
+    that sets the initial conditions of the first hour of the chunk.
+generate: runs the chunks in a concurrent.futures process pool and merges
+    the dispatch of the first hour of every horizon in date order.
+Every worker process loads the plant and builds the model once, from the
+ProblemCache if a cache directory is given, and reuses it for its chunks.
+
+run from conic_disp_training_generation:
+    python -m dispatch.generation [start_date] [hours] [workers]
+'''
+
+import os
+import sys
+import pickle
+import datetime
+import concurrent.futures
+
+import numpy as np
+
+from class_definition.plant_struct import Plant, Network, Optimoptions
+from class_definition.test_data import TestData
+from dispatch.model import DispatchModel
+from dispatch.problem_cache import ProblemCache
+from dispatch.solver_config import SolverConfig
+from dispatch.demand_store import load_test_data
+
+
+#model of the worker process, built by init_worker
+_model = None
+
+
+#start date and number of hours of each chunk of the period
+def split_hours(start_date, hours, chunk_hours):
+    return [(start_date + datetime.timedelta(hours=h), min(chunk_hours, hours - h)) for h in range(0, hours, chunk_hours)]
+
+#loads the plant and demand data and builds the model of a worker process.
+#demand_file is a TestData pickle or a dispatch.demand_store directory.
+#solver is tried first by the solver chain of the model, which otherwise
+#keeps the SolverConfig defaults
+def init_worker(plant_file, demand_file, T=24, cache_dir=None, solver=None, heat_loss=None, cool_loss=None, model_options=None):
+    global _model
+    model_options = dict(model_options or {})
+    if solver is not None and 'solver_config' not in model_options:
+        model_options['solver_config'] = SolverConfig(solver=solver)
+    test_data = load_test_data(demand_file)
+    if cache_dir is not None:
+        _model = ProblemCache(cache_dir).load_or_build(plant_file, test_data, T=T, heat_loss=heat_loss, cool_loss=cool_loss,
+                                                       **model_options)
+        return
+    with open(plant_file, 'rb') as file_object:
+        plant = pickle.load(file_object)
+    _model = DispatchModel(T=T, **model_options)
+    _model.load_plant(plant, test_data, heat_loss=heat_loss, cool_loss=cool_loss)
+    _model.build()
+
+#dispatch of the first hour of a solution for every group without piecewise
+#sections, NaN if the horizon was not solved
+def first_hour(model, solution):
+    labels = {}
+    for name, group in model.groups.items():
+        if np.any(group.pieces != 1):
+            continue
+        if solution[name] is None:
+            labels[name] = np.full(group.shape[0], np.nan)
+        else:
+            labels[name] = np.asarray(solution[name])[:, 0]
+    return labels
+
+#receding horizon over the hours of one chunk. The lead-in hours before the
+#chunk are solved from the default initial state and only hand their first
+#hour on, so chunks do not depend on each other. There is no lead-in before
+#the first hour of the demand data.
+def generate_chunk(start_date, hours, lead_in=24, model=None, **kwargs):
+    model = _model if model is None else model
+    lead_start = start_date - datetime.timedelta(hours=lead_in)
+    if lead_start not in model.time_index:
+        lead_start = start_date
+    n_lead = int((start_date - lead_start).total_seconds()//3600)
+    chunk = {'timestamp': [], 'objective': []}
+    columns = {}
+    for date, result, solution in model.receding_horizon(lead_start, n_lead + hours, **kwargs):
+        if date < start_date:
+            continue
+        chunk['timestamp'].append(date)
+        chunk['objective'].append(np.nan if result is None else result)
+        for name, value in first_hour(model, solution).items():
+            columns.setdefault(name, []).append(value)
+    #(components x hours) per group
+    for name, values in columns.items():
+        chunk[name] = np.stack(values, axis=1)
+    return chunk
+
+#chunks in date order joined into one set of labels
+def merge_chunks(chunks):
+    labels = {'timestamp': [], 'objective': []}
+    for chunk in chunks:
+        labels['timestamp'].extend(chunk['timestamp'])
+        labels['objective'].extend(chunk['objective'])
+    labels['timestamp'] = np.array(labels['timestamp'], dtype='datetime64[s]')
+    labels['objective'] = np.array(labels['objective'], dtype=float)
+    for name in chunks[0] if len(chunks) > 0 else []:
+        if name not in ('timestamp', 'objective'):
+            labels[name] = np.concatenate([chunk[name] for chunk in chunks], axis=1)
+    return labels
+
+#labels for the hours from start_date, solved in chunks of chunk_hours by a
+#pool of worker processes (all cores if workers is None). solver is tried
+#first by the solver chain, solve_options are passed to every solve
+def generate(plant_file, demand_file, start_date, hours=8760, chunk_hours=168, lead_in=24, workers=None, T=24,
+             cache_dir=None, solver=None, heat_loss=None, cool_loss=None, model_options=None, solve_options=None):
+    solve_options = dict(solve_options or {})
+    chunks = split_hours(start_date, hours, chunk_hours)
+    initargs = (plant_file, demand_file, T, cache_dir, solver, heat_loss, cool_loss, model_options)
+    #the model is built and cached once here, and the workers load it
+    if cache_dir is not None:
+        init_worker(*initargs)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as pool:
+        futures = [pool.submit(generate_chunk, chunk_start, chunk_length, lead_in, **solve_options) for chunk_start, chunk_length in chunks]
+        #results are merged in chunk order, not in the order they finish
+        return merge_chunks([future.result() for future in futures])
+
+
+if __name__ == '__main__':
+    start = datetime.datetime.strptime(sys.argv[1], '%Y-%m-%d') if len(sys.argv) > 1 else datetime.datetime(2009, 1, 1)
+    n_hours = int(sys.argv[2]) if len(sys.argv) > 2 else 8760
+    n_workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    labels = generate(os.path.join('library', 'wsu_campus.pickle'), os.path.join('library', 'data', 'wsu_campus_demand_2009_2012'),
+                      start, hours=n_hours, workers=n_workers, cache_dir=os.path.join('library', 'problem_cache'))
+    np.savez_compressed('dispatch_labels_{}.npz'.format(start.strftime('%Y%m%d')), **labels)
@@ -0,0 +1,448 @@
+'''
+Gurobi backend of the dispatch model built with the matrix API.
+GurobiDispatchModel: the DispatchModel of dispatch.model with every
+    variable group created by one addMVar call and every constraint family
+    by one matrix constraint, instead of one addVar per scalar and piece and
+    one addConstr per index as in gurobi_conic_opt.py.
+Plant loading, forecasts and initial conditions are shared with the cvxpy
+path; the forecast is written to the objective coefficients and the right
+hand sides of the balance, ramp and storage constraints.
+'''
+
+import time
+
+import numpy as np
+import scipy.sparse as sp
+import gurobipy as gp
+from gurobipy import GRB
+
+from dispatch.model import DispatchModel
+from dispatch.variable_group import shift_hours, piece_array
+from dispatch.timing import timed
+from dispatch.time_steps import ramp_hours
+
+
+#(nodes x hours) sum over the components at each node of a
+#(components x hours) variable or expression
+def node_sum(component_incidence, values):
+    if component_incidence.shape[1] == 0:
+        return 0
+    return component_incidence @ values
+
+
+class GurobiDispatchModel(DispatchModel):
+    '''DispatchModel solved by Gurobi, built with addMVar and matrix constraints.
+
+    The consumption curves keep the conic form of the cvxpy model: the norm
+    over the pieces is an auxiliary variable r with sum((b*x)^2) <= r^2,
+    which Gurobi recognizes as a second order cone. Storage and voltage
+    limits are variable bounds.
+
+    ATTRIBUTES:
+    env
+    model       gurobipy Model
+    vars        group name -> (components x T) MVar
+    pieces      group name -> one (T x pieces) MVar per component
+    mconstrs    constraint family name -> MConstr or MQConstr
+    '''
+
+    def __init__(self, env=None, **kwargs):
+        DispatchModel.__init__(self, **kwargs)
+        self.env = env
+        self.model = None
+
+    ######## BUILD
+    @timed('build')
+    def build(self):
+        self.model = gp.Model("campus_disp", env=self.env)
+        self.vars = {}
+        self.pieces = {}
+        self.mconstrs = {}
+        self.build_variables()
+        self.build_constraints()
+        self.build_objective()
+        self.model.update()
+        self.set_initial_conditions()
+        return self.model
+
+    def add_mvar(self, name, n, lb=0.0, ub=GRB.INFINITY):
+        var = self.model.addMVar((n, self.T), lb=lb, ub=ub, name=name)
+        self.vars[name] = var
+        return var
+
+    def add_pieces(self, name, pieces, vtype=GRB.CONTINUOUS, lb=-GRB.INFINITY):
+        self.pieces[name] = [self.model.addMVar((self.T, k), lb=lb, vtype=vtype, name="{}_{}".format(name, i)) for i, k in enumerate(pieces)]
+        return self.pieces[name]
+
+    def add_constr(self, name, constr):
+        self.mconstrs[name] = self.model.addConstr(constr, name=name)
+        self.timer.lap(name)
+        return self.mconstrs[name]
+
+    #(components x 1) column of one value per component, for the storage bounds
+    def column(self, values):
+        return np.reshape(np.asarray(values, dtype=float), (-1, 1))
+
+    @timed('variables')
+    def build_variables(self):
+        add = self.add_mvar
+        free = -GRB.INFINITY
+        # electric grid
+        for name in ("ep_elecfromgrid", "eq_elecfromgrid", "ep_electogrid", "eq_electogrid"):
+            add(name, self.n_grid)
+
+        #dumping allowance
+        if self.options['allow_dumping']:
+            if self.n_boilers>0:
+                add("heat_unserve", self.n_nodes)
+                add("heat_dump", self.n_nodes)
+            if self.n_chillers>0:
+                add("cool_unserve", self.n_nodes)
+                add("cool_dump", self.n_nodes)
+
+        #generators with their piecewise parts and unit commitment
+        for name in ("turbine_y", "turbine_xp", "turbine_xq"):
+            add(name, self.n_turbines)
+        self.add_pieces("turbine_xp_k", self.turbine_pieces)
+        self.add_pieces("turbine_xq_k", self.turbine_pieces)
+        self.add_pieces("turbine_s_k", self.turbine_pieces, vtype=GRB.BINARY, lb=0)
+        for name in ("dieselgen_y", "dieselgen_xp", "dieselgen_xq"):
+            add(name, self.n_dieselgen)
+        self.add_pieces("dieselgen_xp_k", self.diesel_pieces)
+        self.add_pieces("dieselgen_xq_k", self.diesel_pieces)
+        self.add_pieces("dieselgen_s_k", self.diesel_pieces, vtype=GRB.BINARY, lb=0)
+        for name in ("boiler_y", "boiler_x"):
+            add(name, self.n_boilers)
+        self.add_pieces("boiler_x_k", self.boiler_pieces)
+        self.add_pieces("boiler_s_k", self.boiler_pieces, vtype=GRB.BINARY, lb=0)
+        for name in ("chiller_x", "chiller_yp", "chiller_yq"):
+            add(name, self.n_chillers)
+        self.add_pieces("chiller_x_k", self.chiller_pieces)
+        self.add_pieces("chiller_s_k", self.chiller_pieces, vtype=GRB.BINARY, lb=0)
+
+        #storage, charging power is limited by the peak discharge rate and
+        #the state of charge by the depth of discharge and the size
+        for kind in ('e_storage', 'h_storage', 'c_storage'):
+            para = getattr(self, kind + '_para')
+            n = len(para)
+            peak = self.column([s.peak_disch*s.size for s in para])
+            add(kind + "_disch", n, ub=peak)
+            add(kind + "_ch", n, ub=peak)
+            add(kind + "_state", n, lb=self.column([s.max_dod for s in para]), ub=self.column([s.size for s in para]))
+
+        #nodal network
+        #x_m = v_m^2, y_mn = v_m*v_n*cos(theta_mn), z_mn = v_m*v_n*sin(theta_mn)
+        if self.options['network_limits']:
+            v_nominal = self.options['v_nominal']
+            add("x_m", self.n_nodes, lb=(v_nominal*.9)**2, ub=(v_nominal*1.1)**2)
+        else:
+            add("x_m", self.n_nodes)
+        add("y_mn", self.topology.electrical.n_lines, lb=free)
+        add("z_mn", self.topology.electrical.n_lines, lb=free)
+        add("h_mn", self.topology.district_heat.n_lines, lb=free)
+        add("c_mn", self.topology.district_cooling.n_lines, lb=free)
+
+    #prices are set per forecast, only unserved demand has a fixed cost
+    @timed('objective')
+    def build_objective(self):
+        for name in ('heat_unserve', 'cool_unserve'):
+            if name in self.vars:
+                self.vars[name].Obj = self.options['bigM']*np.tile(self.dt, (self.vars[name].shape[0], 1))
+        self.model.ModelSense = GRB.MINIMIZE
+
+    @timed('constraints')
+    def build_constraints(self):
+        v = self.vars
+        pc = self.pieces
+        self.timer.mark()
+
+        # turbine constraints
+        turbine = self.turbine_para
+        self.add_consume("turbine_y_consume", v['turbine_y'], pc['turbine_s_k'],
+            [np.add(gen.fundata["cp"], gen.fundata["cq"]) for gen in turbine],
+            [(pc['turbine_xp_k'], [gen.fundata["bp"] for gen in turbine], [gen.fundata["fp"] for gen in turbine]),
+             (pc['turbine_xq_k'], [gen.fundata["bq"] for gen in turbine], [gen.fundata["fq"] for gen in turbine])])
+        self.add_generate("turbine_xp_generate", v['turbine_xp'], pc['turbine_xp_k'])
+        self.add_generate("turbine_xq_generate", v['turbine_xq'], pc['turbine_xq_k'])
+        self.add_piece_bounds("turbine_xp_k", pc['turbine_xp_k'], pc['turbine_s_k'], turbine, pc['turbine_xq_k'])
+        self.add_status("turbine_x_status", pc['turbine_s_k'])
+        self.add_ramps("turbine", v['turbine_xp'], turbine)
+
+        # diesel constraints
+        diesel = self.diesel_para
+        self.add_consume("dieselgen_y_consume", v['dieselgen_y'], pc['dieselgen_s_k'],
+            [-np.add(gen.fundata["cp"], gen.fundata["cq"]) for gen in diesel],
+            [(pc['dieselgen_xp_k'], [gen.fundata["bp"] for gen in diesel], [gen.fundata["fp"] for gen in diesel]),
+             (pc['dieselgen_xq_k'], [gen.fundata["bq"] for gen in diesel], [gen.fundata["fq"] for gen in diesel])])
+        self.add_generate("dieselgen_xp_generator", v['dieselgen_xp'], pc['dieselgen_xp_k'])
+        self.add_generate("dieselgen_xq_generator", v['dieselgen_xq'], pc['dieselgen_xq_k'])
+        self.add_piece_bounds("dieselgen_xp_k", pc['dieselgen_xp_k'], pc['dieselgen_s_k'], diesel, pc['dieselgen_xq_k'])
+        self.add_status("dieselgen_x_status", pc['dieselgen_s_k'])
+        self.add_ramps("dieselgen", v['dieselgen_xp'], diesel)
+
+        # boiler constraints
+        boiler = self.boiler_para
+        self.add_consume("boiler_y_consume", None, pc['boiler_s_k'], [gen.fundata["d"] for gen in boiler],
+            [(pc['boiler_x_k'], [gen.fundata["b"] for gen in boiler], [gen.fundata["f"] for gen in boiler])])
+        self.add_generate("boiler_x_generate", v['boiler_x'], pc['boiler_x_k'])
+        self.add_piece_bounds("boiler_x_k", pc['boiler_x_k'], pc['boiler_s_k'], boiler)
+        self.add_status("boiler_x_status", pc['boiler_s_k'])
+        self.add_ramps("boiler", v['boiler_x'], boiler)
+
+        # chiller constraints
+        chiller = self.chiller_para
+        self.add_consume("chiller_yp_consume", v['chiller_yp'], pc['chiller_s_k'], [gen.fundata["cp"] for gen in chiller],
+            [(pc['chiller_x_k'], [gen.fundata["bp"] for gen in chiller], [gen.fundata["fp"] for gen in chiller])])
+        self.add_consume("chiller_yq_consume", v['chiller_yq'], pc['chiller_s_k'], [gen.fundata["cq"] for gen in chiller],
+            [(pc['chiller_x_k'], [gen.fundata["bq"] for gen in chiller], [gen.fundata["fq"] for gen in chiller])])
+        self.add_generate("chiller_x_generate", v['chiller_x'], pc['chiller_x_k'])
+        self.add_piece_bounds("chiller_x_k", pc['chiller_x_k'], pc['chiller_s_k'], chiller)
+        self.add_status("chiller_x_status", pc['chiller_s_k'])
+        self.add_ramps("chiller", v['chiller_x'], chiller)
+
+        # storage constraints
+        self.add_storage("e_storage", [s.eta_ch for s in self.e_storage_para], [s.eta_disch for s in self.e_storage_para])
+        self.add_storage("h_storage", [s.eta_ch for s in self.h_storage_para], [s.eta_disch for s in self.h_storage_para])
+        self.add_storage("c_storage", [s.charge_eff for s in self.c_storage_para], [s.disch_eff for s in self.c_storage_para])
+
+        # supply and demand at every node, the forecast is the right hand side
+        zero = np.zeros((self.n_nodes, self.T))
+        self.add_constr("electric_p_balance", self.electric_p_balance() == zero)
+        self.add_constr("electric_q_balance", self.electric_q_balance() == zero)
+        self.add_constr("cool_balance", self.cool_balance() == zero)
+        self.add_constr("heat_balance", self.heat_balance() == zero)
+
+        # line current limits and the conic relaxation of the line voltage products
+        if self.options['network_limits']:
+            self.add_network_limits()
+
+        # flow leaving one node on a line arrives at the other node
+        self.add_line_reverse("line_heat", v['h_mn'], self.topology.district_heat.reverse)
+        self.add_line_reverse("line_cooling", v['c_mn'], self.topology.district_cooling.reverse)
+
+    #per hour: c*s + sum over parts of (r + f*x) - y <= 0 with sum((b*x)^2) <= r^2
+    def add_consume(self, name, y, s_k, c, parts):
+        linear = []
+        cones = []
+        for i, s in enumerate(s_k):
+            expr = s @ np.asarray(c[i], dtype=float).reshape(-1)
+            for p, (x_k, b, f) in enumerate(parts):
+                x = x_k[i]
+                r = self.model.addMVar(self.T, lb=0, name="{}_r{}_{}".format(name, p, i))
+                b2 = np.power(np.asarray(b[i], dtype=float).reshape(-1), 2)
+                cones.append(self.model.addConstr((x*x) @ b2 <= r*r, name="{}_cone{}_{}".format(name, p, i)))
+                expr = expr + r + x @ np.asarray(f[i], dtype=float).reshape(-1)
+            if y is not None:
+                expr = expr - y[i, :]
+            linear.append(self.model.addConstr(expr <= 0, name="{}_{}".format(name, i)))
+        self.mconstrs[name] = linear
+        self.mconstrs[name + "_cone"] = cones
+        self.timer.lap(name)
+
+    def add_generate(self, name, x, x_k):
+        self.mconstrs[name] = [self.model.addConstr(x[i, :] == x_k[i].sum(axis=1), name="{}_{}".format(name, i)) for i in range(len(x_k))]
+        self.timer.lap(name)
+
+    #lb*s <= x and x <= ub*s, or ub^2*s >= xp^2 + xq^2 when the reactive pieces are given
+    def add_piece_bounds(self, name, x_k, s_k, para, xq_k=None):
+        lower = []
+        upper = []
+        for i, (x, s) in enumerate(zip(x_k, s_k)):
+            lb = np.asarray(para[i].lb, dtype=float).reshape(-1)
+            ub = np.asarray(para[i].ub, dtype=float).reshape(-1)
+            lower.append(self.model.addConstr(s*lb <= x, name="{}_lower_{}".format(name, i)))
+            if xq_k is None:
+                upper.append(self.model.addConstr(x <= s*ub, name="{}_upper_{}".format(name, i)))
+            else:
+                upper.append(self.model.addConstr(x*x + xq_k[i]*xq_k[i] <= s*np.power(ub, 2), name="{}_upper_{}".format(name, i)))
+        self.mconstrs[name + "_lower"] = lower
+        self.mconstrs[name + "_upper"] = upper
+        self.timer.lap(name + "_bounds")
+
+    def add_status(self, name, s_k):
+        self.mconstrs[name] = [self.model.addConstr(s.sum(axis=1) <= 1, name="{}_{}".format(name, i)) for i, s in enumerate(s_k)]
+        self.timer.lap(name)
+
+    #the first hour ramp limits take the initial output as right hand side,
+    #the limit between steps is the rate times the ramp_hours between them
+    def add_ramps(self, name, x, para):
+        ramp_rate = np.array([gen.ramp_rate for gen in para], dtype=float)
+        rate = ramp_rate.reshape(-1, 1)*ramp_hours(self.dt).reshape(1, -1)
+        self.add_constr(name + "_ramp1_up", x[:, 0] <= ramp_rate)
+        self.add_constr(name + "_ramp1_down", x[:, 0] >= -ramp_rate)
+        self.add_constr(name + "_ramp_up", x[:, 1:] - x[:, :-1] <= rate)
+        self.add_constr(name + "_ramp_down", x[:, :-1] - x[:, 1:] <= rate)
+
+    #the first hour takes the initial state as right hand side, charging and
+    #discharging power is held for the hours of each step
+    def add_storage(self, kind, eta_ch, eta_disch):
+        state, ch, disch = self.vars[kind + "_state"], self.vars[kind + "_ch"], self.vars[kind + "_disch"]
+        eta_ch = sp.diags(np.asarray(eta_ch, dtype=float))
+        inv_disch = sp.diags(1/np.asarray(eta_disch, dtype=float))
+        n = state.shape[0]
+        dt = self.dt
+        self.add_constr(kind + "_init", state[:, 0] - dt[0]*(eta_ch @ ch[:, 0]) + dt[0]*(inv_disch @ disch[:, 0]) == np.zeros(n))
+        self.add_constr(kind + "_state_constraint", state[:, 1:] - state[:, :-1] - (eta_ch @ ch[:, 1:])*dt[1:]
+                        + (inv_disch @ disch[:, 1:])*dt[1:] == np.zeros((n, self.T-1)))
+
+    #(nodes x hours) left hand sides of the nodal balances, the forecast
+    #terms are moved to the right hand side in update_forecast
+    def electric_p_balance(self):
+        v = self.vars
+        at = self.at_node
+        #sum of power at node = Gmmxm + sum(Gmnymn+Bmnymn)
+        return (node_sum(at['turbine'], v['turbine_xp'])\
+         + node_sum(at['grid'], v['ep_elecfromgrid'] - v['ep_electogrid'])\
+         - node_sum(at['chiller'], v['chiller_yp'])\
+         + node_sum(at['e_storage'], v['e_storage_disch'] - v['e_storage_ch'])\
+         + node_sum(at['diesel'], v['dieselgen_xp']))/self.options['pu_e']\
+         - sp.diags(np.diag(self.G)) @ v['x_m']\
+         - self.G_lines @ v['y_mn'] - self.B_lines @ v['z_mn']
+
+    def electric_q_balance(self):
+        v = self.vars
+        at = self.at_node
+        # sum of reactive power at node = -Bmmxm + sum(Gmnzmn - Bmnymn)
+        return (node_sum(at['turbine'], v['turbine_xq'])\
+         + node_sum(at['grid'], v['eq_elecfromgrid'] - v['eq_electogrid'])\
+         - node_sum(at['chiller'], v['chiller_yq'])\
+         + node_sum(at['diesel'], v['dieselgen_xq']))/self.options['pu_e']\
+         - self.G_lines @ v['z_mn'] + self.B_lines @ v['y_mn']\
+         + sp.diags(np.diag(self.B)) @ v['x_m']
+
+    def heat_balance(self):
+        v = self.vars
+        at = self.at_node
+        f_heat = sp.diags(np.array([gen.fundata["f_heat"] for gen in self.turbine_para], dtype=float))
+        balance = node_sum(at['boiler'], v['boiler_x'])\
+         + node_sum(at['turbine'], f_heat @ v['turbine_xp'])\
+         + node_sum(at['h_storage'], v['h_storage_disch'] - v['h_storage_ch'])\
+         - self.heat_line_loss @ v['h_mn']
+        if 'heat_dump' in v:
+            balance = balance - v['heat_dump'] + v['heat_unserve']
+        return balance
+
+    def cool_balance(self):
+        v = self.vars
+        at = self.at_node
+        balance = node_sum(at['chiller'], v['chiller_x'])\
+         + node_sum(at['c_storage'], v['c_storage_disch'] - v['c_storage_ch'])\
+         - self.cool_line_loss @ v['c_mn']
+        if 'cool_dump' in v:
+            balance = balance - v['cool_dump'] + v['cool_unserve']
+        return balance
+
+    #k*(x_m + x_n - 2*y_mn) <= limit^2 and y_mn^2 + z_mn^2 <= x_m*x_n on
+    #every line that ends at a node
+    def add_network_limits(self):
+        v = self.vars
+        electrical = self.topology.electrical
+        lines = np.array([l for l in range(electrical.n_lines) if electrical.line_to[l] >= 0], dtype=int)
+        if len(lines) == 0:
+            return
+        x_from = v['x_m'][electrical.line_from[lines], :]
+        x_to = v['x_m'][electrical.line_to[lines], :]
+        y = v['y_mn'][lines, :]
+        z = v['z_mn'][lines, :]
+        k = np.diag(self.G)[electrical.line_from[lines]]**2 + self.B[electrical.line_from[lines], electrical.line_to[lines]]**2
+        limit = self.options['current_limit_value']**2*np.ones((len(lines), self.T))
+        self.add_constr("current_limit", sp.diags(k) @ (x_from + x_to - 2*y) <= limit)
+        self.add_constr("voltage_cone", y*y + z*z <= x_from*x_to)
+
+    def add_line_reverse(self, name, flows, reverse):
+        lines = [l for l in range(len(reverse)) if l < reverse[l]]
+        if len(lines) == 0:
+            return
+        back = [int(reverse[l]) for l in lines]
+        self.add_constr(name, flows[lines, :] + flows[back, :] == np.zeros((len(lines), self.T)))
+
+    ######## FORECAST AND INITIAL CONDITIONS
+    def set_initial_conditions(self, **kwargs):
+        initial = self.initial_conditions(**kwargs)
+        c = self.mconstrs
+        for kind, para in (('turbine', self.turbine_para), ('dieselgen', self.diesel_para), ('boiler', self.boiler_para), ('chiller', self.chiller_para)):
+            ramp_rate = np.array([gen.ramp_rate for gen in para], dtype=float)
+            c[kind + "_ramp1_up"].RHS = initial[kind + "_init"] + ramp_rate*self.dt[0]
+            c[kind + "_ramp1_down"].RHS = initial[kind + "_init"] - ramp_rate*self.dt[0]
+        for kind in ('e_storage', 'h_storage', 'c_storage'):
+            c[kind + "_init"].RHS = initial[kind + "0"]
+        self.initial = initial
+
+    @timed('update_forecast')
+    def update_forecast(self, start_date):
+        if self.model is None:
+            raise RuntimeError("build must be called before update_forecast")
+        self.date_range, forecast = self.forecast(start_date)
+        v = self.vars
+        c = self.mconstrs
+        #utility and fuel prices times the step length, the sellback rates
+        #of the Tariff are negative costs
+        for name, price in (('ep_elecfromgrid', forecast['pelec_cost']), ('eq_elecfromgrid', forecast['qelec_cost']),
+                            ('ep_electogrid', forecast['pselback_rate']), ('eq_electogrid', forecast['qselback_rate']),
+                            ('turbine_y', forecast['gas_rate']), ('dieselgen_y', forecast['diesel_rate']), ('boiler_y', forecast['gas_rate'])):
+            v[name].Obj = np.tile(price*self.dt, (v[name].shape[0], 1))
+        #demands and renewable generation
+        c_heat = np.array([gen.fundata["c_heat"] for gen in self.turbine_para], dtype=float)
+        c['electric_p_balance'].RHS = (forecast['ep_demand'] - forecast['renew'])/self.options['pu_e']
+        c['electric_q_balance'].RHS = forecast['eq_demand']/self.options['pu_e']
+        c['heat_balance'].RHS = forecast['h_demand'] - np.reshape(self.at_node['turbine'] @ c_heat, (-1, 1))
+        c['cool_balance'].RHS = forecast['c_demand']
+        return forecast
+
+    ######## SOLVE AND EXTRACT
+    #limits, gap and threads of solver_config and its GUROBI options apply,
+    #keyword arguments are further Gurobi parameters. There is no fallback
+    @timed('solve')
+    def solve(self, **kwargs):
+        #start values set by warm_start are always used as the MIP start
+        kwargs.pop('warm_start', None)
+        kwargs.pop('solver', None)
+        kwargs.setdefault('OutputFlag', int(self.solver_config.verbose))
+        params = self.solver_config.options('GUROBI')
+        params.update(kwargs)
+        for name, value in params.items():
+            self.model.setParam(name, value)
+        tic = time.perf_counter()
+        self.model.optimize()
+        self.timer.add(self.timer.full_name('solver'), self.model.Runtime)
+        self.solve_stats = {'solver': 'GUROBI', 'status': self.model.Status, 'wall_time': time.perf_counter() - tic,
+                            'objective': self.model.ObjVal if self.model.SolCount > 0 else None, 'solve_time': self.model.Runtime,
+                            'num_iters': self.model.IterCount, 'mip_gap': self.model.MIPGap if self.model.IsMIP and self.model.SolCount > 0 else None}
+        if self.model.SolCount == 0:
+            return None
+        return self.model.ObjVal
+
+    #RelaxRoundPolish works on the cvxpy problem, which this model does not build
+    def solve_heuristic(self, **kwargs):
+        raise NotImplementedError("GurobiDispatchModel has no heuristic solve, use solve or DispatchModel.solve_heuristic.")
+
+    #checked before the first horizon rather than when the generator reaches it
+    def receding_horizon(self, start_date, steps, warm_start=True, state=None, heuristic=False, **kwargs):
+        if heuristic:
+            raise NotImplementedError("GurobiDispatchModel has no heuristic solve, use receding_horizon without heuristic.")
+        return DispatchModel.receding_horizon(self, start_date, steps, warm_start=warm_start, state=state, **kwargs)
+
+    #MIP start of the next horizon from the last solution moved hours earlier,
+    #unit commitment binaries included. Has to be called before the forecast
+    #or the initial conditions change, which discards the solution
+    def warm_start(self, hours=1):
+        if self.model.SolCount == 0:
+            return
+        for var in self.vars.values():
+            var.Start = shift_hours(var.X, hours, axis=1)
+        for parts in self.pieces.values():
+            for part in parts:
+                part.Start = shift_hours(part.X, hours, axis=0)
+
+    #same layout as DispatchModel.extract: (components x T) for groups
+    #without piecewise sections and (components x T x pieces) otherwise
+    @timed('extract')
+    def extract(self):
+        if self.model.SolCount == 0:
+            return dict((name, None) for name in list(self.vars) + list(self.pieces))
+        solution = dict((name, var.X) for name, var in self.vars.items())
+        for name, parts in self.pieces.items():
+            values = [part.X for part in parts]
+            solution[name] = piece_array(np.concatenate([v.ravel() for v in values]) if len(values) > 0 else np.zeros(0),
+                                         np.repeat([v.shape[1] for v in values], self.T), (len(values), self.T))
+        return solution
@@ -0,0 +1,153 @@
+'''
+Relax, round and polish heuristic for the unit commitment of a DispatchModel.
+RelaxRoundPolish: solves the continuous relaxation of the piecewise segment
+    binaries, rounds them to at most one segment per unit and hour, and
+    solves the convex problem left with the binaries fixed. The relaxation
+    is a lower bound, so the gap of the polished dispatch to it bounds its
+    distance from the optimum of the mixed integer problem.
+round_segments: segment of each unit and hour from the relaxed outputs and
+    states, the segment whose output range holds the relaxed output.
+relax_problem: copy of a problem with some variables replaced.
+Both derived problems share the variables and Parameters of the model, so
+update_forecast and set_initial_conditions apply to them unchanged and
+each is compiled only once.
+'''
+
+import time
+
+import numpy as np
+import cvxpy
+import cvxpy.settings as s
+
+from dispatch.constraint_family import expand
+
+
+#binary group -> group of the outputs it switches and the component list
+#holding the output range (lb, ub) of each segment
+SEGMENTS = {'turbine_s_k': ('turbine_xp_k', 'turbine_para'), 'dieselgen_s_k': ('dieselgen_xp_k', 'diesel_para'),
+            'boiler_s_k': ('boiler_x_k', 'boiler_para'), 'chiller_s_k': ('chiller_x_k', 'chiller_para')}
+
+
+#objective and constraints of prob with every variable in replacements
+#(variable -> expression) replaced
+def relax_problem(prob, replacements, constraints=()):
+    id_objects = dict((id(var), new) for var, new in replacements.items())
+    objective = prob.objective.tree_copy(id_objects)
+    return cvxpy.Problem(objective, [c.tree_copy(id_objects) for c in prob.constraints] + list(constraints))
+
+#flat 0/1 states of a piecewise binary group. A unit is on in an hour if its
+#relaxed states add up to threshold, and then runs in the segment whose
+#[lb, ub] range holds its relaxed output, or is closest to it, so the
+#relaxed outputs, which meet the ramp limits and balances, stay feasible
+def round_segments(group, states, outputs, lb, ub, threshold=0.5):
+    n_items = group.pieces.size
+    item = np.repeat(np.arange(n_items), group.pieces.ravel())
+    on = np.bincount(item, np.nan_to_num(states), minlength=n_items) >= threshold
+    total = np.bincount(item, np.nan_to_num(outputs), minlength=n_items)[item]
+    distance = np.maximum(lb - total, 0) + np.maximum(total - ub, 0)
+    #the first element of each item after sorting by item, then distance
+    order = np.lexsort((distance, item))
+    first = order[np.concatenate(([True], item[order][1:] != item[order][:-1]))]
+    rounded = np.zeros(len(item))
+    rounded[first[on]] = 1
+    return rounded
+
+
+class RelaxRoundPolish(object):
+    '''Low latency solve of a DispatchModel without branch and bound.
+
+    The relaxation replaces the segment binaries by variables in [0, 1],
+    the polish step by Parameters holding the rounded states. If the
+    polished problem has no solution the rounding is repeated with each
+    of the fallback thresholds, committing fewer units (left to the grid
+    and the unserved demand slack) or more, and then, if mip_fallback is
+    set, the mixed integer problem is solved.
+
+    ATTRIBUTES:
+    model
+    threshold
+    fallback        thresholds tried after threshold
+    mip_fallback
+    binaries        binary group name -> relaxed variable
+    fixed           binary group name -> Parameter of the rounded states
+    relaxed_prob
+    polish_prob
+    stats           statistics of the last solve
+    '''
+
+    def __init__(self, model, threshold=0.5, fallback=(0.9, 0.1), mip_fallback=True):
+        self.model = model
+        self.threshold = threshold
+        self.fallback = tuple(fallback)
+        self.mip_fallback = mip_fallback
+        self.stats = None
+        groups = dict((name, group) for name, group in model.groups.items() if group.variable.attributes['boolean'])
+        self.binaries = dict((name, cvxpy.Variable(group.variable.size, name=name + '_relaxed', nonneg=True)) for name, group in groups.items())
+        self.fixed = dict((name, cvxpy.Parameter(group.variable.size, name=name + '_fixed', nonneg=True)) for name, group in groups.items())
+        self.relaxed_prob = relax_problem(model.prob, dict((groups[name].variable, var) for name, var in self.binaries.items()),
+                                          [var <= 1 for var in self.binaries.values()])
+        self.polish_prob = relax_problem(model.prob, dict((groups[name].variable, param) for name, param in self.fixed.items()))
+
+    #rounded states of every binary group from the relaxed solution
+    def round(self, threshold):
+        m = self.model
+        for name, param in self.fixed.items():
+            group = m.groups[name]
+            if name in SEGMENTS:
+                output_name, para_name = SEGMENTS[name]
+                para = getattr(m, para_name)
+                lb, ub = expand(group, [gen.lb for gen in para]), expand(group, [gen.ub for gen in para])
+                param.value = round_segments(group, self.binaries[name].value, m.groups[output_name].variable.value, lb, ub, threshold)
+            else:
+                param.value = (self.binaries[name].value >= threshold).astype(float)
+
+    #a relaxed or polished problem that no solver of the chain solves is a
+    #failed step of the heuristic, not an error
+    def try_solve(self, prob, **kwargs):
+        try:
+            return self.model.solver_config.solve(prob, **kwargs)
+        except cvxpy.error.SolverError as exception:
+            return None, {'solver': None, 'status': 'error', 'error': str(exception)}
+
+    #relax, round and polish. Returns the objective of the polished dispatch
+    #and leaves its solution, with the rounded binaries, in the groups of the
+    #model. The steps share the time limit of the solver config, or the time
+    #until deadline, and mip_fallback overrides the attribute for this
+    #solve. Keyword arguments go to every solve
+    def solve(self, deadline=None, mip_fallback=None, **kwargs):
+        m = self.model
+        tic = time.perf_counter()
+        kwargs['deadline'] = m.solver_config.deadline() if deadline is None else deadline
+        mip_fallback = self.mip_fallback if mip_fallback is None else mip_fallback
+        with m.timer.phase('relax'):
+            bound, relaxed_stats = self.try_solve(self.relaxed_prob, **kwargs)
+        stats = {'heuristic': 'relax_round_polish', 'bound': bound, 'relaxed': relaxed_stats, 'polish': []}
+        result = None
+        if relaxed_stats['status'] in s.SOLUTION_PRESENT:
+            for threshold in (self.threshold,) + self.fallback:
+                with m.timer.phase('round'):
+                    self.round(threshold)
+                with m.timer.phase('polish'):
+                    result, polish_stats = self.try_solve(self.polish_prob, **kwargs)
+                polish_stats['threshold'] = threshold
+                stats['polish'].append(polish_stats)
+                if polish_stats['status'] in s.SOLUTION_PRESENT:
+                    for name, param in self.fixed.items():
+                        m.groups[name].variable.value = param.value
+                    stats.update(solver=polish_stats['solver'], status=polish_stats['status'], method='polish')
+                    break
+                result = None
+        if result is None and mip_fallback:
+            result, mip_stats = m.solver_config.solve(m.prob, **kwargs)
+            stats.update(solver=mip_stats['solver'], status=mip_stats['status'], method='mip', mip=mip_stats)
+        elif result is None:
+            stats.update(solver=None, status=relaxed_stats['status'] if len(stats['polish']) == 0 else stats['polish'][-1]['status'], method=None)
+        stats['objective'] = result
+        #relative distance above the relaxation bound
+        if result is not None and bound is not None and np.isfinite(bound):
+            stats['gap'] = (result - bound)/max(abs(result), 1e-9)
+        else:
+            stats['gap'] = None
+        stats['wall_time'] = time.perf_counter() - tic
+        self.stats = stats
+        return result
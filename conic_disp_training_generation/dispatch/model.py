@@ -0,0 +1,805 @@
+'''
+Conic unit commitment and dispatch model of a campus network, as
+exemplified by the Washington State University microgrid.
+DispatchModel: builds the problem once and solves it for any forecast,
+    in separate phases:
+    load_plant: sort the generators by type and fit their efficiency curves
+    build: create the variables, forecast parameters, objective and constraints
+    update_forecast: set demands and prices for a horizon start date
+    solve: send the problem to the solver
+    extract: read the solution of every variable group as arrays
+    frame: flat DataFrame view of a solution for export
+    solve_heuristic: relax, round and polish the unit commitment instead
+        of solving the mixed integer problem
+    receding_horizon: solve the horizons of consecutive hours, each one
+        warm started from the shifted solution of the one before
+The steps of a horizon are one hour long unless dt gives their lengths
+(dispatch.time_steps), e.g. hourly for the first hours and coarser later.
+A long-running worker imports the class once and keeps the built model in
+memory, changing only the forecast between solves.
+'''
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import cvxpy
+
+from class_definition.component import (ElectricChiller, AbsorptionChiller, CombinedHeatPower, ElectricGenerator, Heater)
+from class_definition.component import (ElectricStorage, ThermalStorage, Utility, Renewable)
+from function.setup.piecewise_fit import piecewise_quadratic, piecewise_linear
+from dispatch.variable_group import MatrixVariableGroup, constant_zero
+from dispatch.topology import NetworkTopology
+from dispatch import constraint_family as family
+from dispatch.timing import PhaseTimer, timed
+from dispatch.solver_config import SolverConfig
+from dispatch.state import initial_state
+from dispatch.time_steps import step_starts, step_mean, ramp_hours
+from dispatch.heuristic import RelaxRoundPolish
+
+
+# convert_quadratic is a function which takes a quadratic from the
+# form (hx^2 + fx + c) to the format (bx + c)^2 + ex + d
+def convert_quadratic(gen_para):
+    for gt in gen_para:
+        if len(gt.fundata) == 3:
+            h = gt.fundata["h"]
+            f = gt.fundata["f"]
+            c = gt.fundata["c"]
+            h[h<0] = 0
+            b = np.sqrt(h)
+            ci = np.divide(f,2*b)
+            e = np.zeros((len(f),))
+            e[np.isinf(ci)] = f[np.isinf(ci)]
+            ci[np.isinf(ci)] = 0
+            d = c - sum(np.power(ci,2))
+            gt.fundata["b"] = b
+            gt.fundata["ci"] = ci
+            gt.fundata["d"] = d
+            gt.fundata["e"] = e
+        else:
+            hp = gt.fundata["hp"]
+            hq = gt.fundata["hq"]
+            fp = gt.fundata["fp"]
+            fq = gt.fundata["fq"]
+            cp = gt.fundata["cp"]
+            cq = gt.fundata["cq"]
+            #filter out rounding errors to make sure curvature is positive
+            hp[hp<0] = 0
+            hq[hq<0] = 0
+            #convert to (bx + c)^2 + ex + d
+            bp = np.sqrt(hp)
+            bq = np.sqrt(hq)
+            cip = np.divide(fp,2*bp)
+            ciq = np.divide(fp,2*bq)
+            ep = np.zeros((len(fp),))
+            eq = np.zeros((len(fq),))
+            ep[np.isinf(cip)] = fp[np.isinf(cip)]
+            eq[np.isinf(ciq)] = fq[np.isinf(ciq)]
+            cip[np.isinf(cip)] = 0
+            ciq[np.isinf(ciq)] = 0
+            gt.fundata["bp"] = bp
+            gt.fundata["cip"] = cip
+            gt.fundata["dp"] = cp - sum(np.power(cip,2))
+            gt.fundata["bq"] = bq
+            gt.fundata["ciq"] = ciq
+            gt.fundata["dq"] = cq - sum(np.power(ciq,2))
+            gt.fundata["ep"] = ep
+            gt.fundata["eq"] = eq
+    return gen_para
+
+#one fit coefficient of every component in the list
+def fundata(para, key):
+    return [gen.fundata[key] for gen in para]
+
+#piecewise quadratic fit of the electric input or output of a component,
+#with reactive power terms
+def fit_electric(gen, output, resolution=2):
+    fit_terms, x_min, x_max = piecewise_quadratic(gen.output.capacity, output, resolution=resolution, max_cap=gen.size)
+    setattr(gen, 'fundata', {"fp": fit_terms[1], "hp": fit_terms[2], "cp": fit_terms[0], "fq": 0.2*fit_terms[1], "hq": 0.2*fit_terms[2], "cq": 0.5*fit_terms[0]})
+    setattr(gen, 'ub', x_max)
+    setattr(gen, 'lb', x_min)
+    return len(x_max)
+
+
+class DispatchModel(object):
+    '''Conic dispatch model that is built once and re-solved per forecast.
+
+    Demands, renewable generation, prices and initial conditions are
+    cvxpy Parameters, so update_forecast and set_initial_conditions only
+    change parameter values and the problem keeps its structure.
+    network_limits adds voltage and line current limits and the conic
+    relaxation of the line voltage products, without them the line flow
+    variables are free. resolution sets the number of piecewise sections
+    of the efficiency fits. solver_config is the SolverConfig that solve
+    uses, Gurobi with the installed open source solvers as fallbacks by
+    default. dt is the length in whole hours of each of the T steps, all
+    one hour if None; outputs and demands are means over a step, ramp
+    limits, storage and costs scale with its length.
+
+    ATTRIBUTES:
+    T
+    dt          hours of each step
+    options
+    plant
+    network
+    test_data
+    topology
+    groups
+    parameters
+    families
+    constraints
+    prob
+    problem_data    compiled conic data of prob, set by compile
+    timer           PhaseTimer of every phase, with one lap per constraint family
+    solver_config
+    solve_stats     statistics of the last solve
+    heuristic       RelaxRoundPolish of solve_heuristic, made on its first call
+    date_range
+    '''
+
+    def __init__(self, T=24, allow_dumping=True, bigM=1e4, pu_e=1000, pu_h=20000, pu_c=20000, v_nominal=1.0, current_limit_value=1.2, a_hru=0.8, network_limits=True, resolution=2, timer=None, solver_config=None, dt=None):
+        self.dt = np.ones(T) if dt is None else np.asarray(dt, dtype=float)
+        if np.any(self.dt != np.round(self.dt)) or np.any(self.dt < 1):
+            raise ValueError("time steps must be whole hours, the demand data is hourly")
+        self.T = len(self.dt)
+        self.options = {'allow_dumping': allow_dumping, 'bigM': bigM, 'pu_e': pu_e, 'pu_h': pu_h, 'pu_c': pu_c,
+                        'v_nominal': v_nominal, 'current_limit_value': current_limit_value, 'a_hru': a_hru,
+                        'network_limits': network_limits, 'resolution': resolution, 'dt': self.dt.tolist()}
+        self.timer = PhaseTimer() if timer is None else timer
+        self.solver_config = SolverConfig() if solver_config is None else solver_config
+        self.solve_stats = None
+        self.heuristic = None
+        self.plant = None
+        self.prob = None
+        self.problem_data = None
+        self.date_range = None
+
+    ######## LOAD PLANT
+    #sort components into their own lists, fit their efficiency curves and
+    #index the network. heat_loss and cool_loss are (nodes x nodes) tables of
+    #nonnegative line coefficients, the default sends every line out of its
+    #node unchanged
+    @timed('load_plant')
+    def load_plant(self, plant, test_data, heat_loss=None, cool_loss=None):
+        self.plant = plant
+        self.gen = plant.generator
+        self.network = plant.network
+        self.optimoptions = plant.optimoptions
+        resolution = self.options['resolution']
+
+        self.turbine_para = []
+        self.diesel_para = []
+        self.boiler_para = []
+        self.chiller_para = []
+        self.abs_para = []
+        self.e_storage_para = []
+        self.h_storage_para = []
+        self.c_storage_para = []
+        self.grid_para = []
+        self.renew_para = []
+        self.fuel_para = []
+        self.turbine_pieces = []
+        self.diesel_pieces = []
+        self.boiler_pieces = []
+        self.chiller_pieces = []
+
+        for gen in self.gen:
+            if isinstance(gen, ElectricChiller):
+                self.chiller_para.append(gen)
+                self.chiller_pieces.append(fit_electric(gen, gen.output.cooling, resolution))
+            elif isinstance(gen, AbsorptionChiller):
+                self.abs_para.append(gen)
+            elif isinstance(gen, Heater):
+                fit_terms, x_min, x_max = piecewise_quadratic(gen.output.capacity, gen.output.heat, resolution=resolution, max_cap=gen.size)
+                setattr(gen, 'fundata', {"h": fit_terms[2], "f": fit_terms[1], "c": fit_terms[0]})
+                setattr(gen, 'ub', x_max)
+                setattr(gen, 'lb', x_min)
+                self.boiler_para.append(gen)
+                self.boiler_pieces.append(len(x_max))
+            elif isinstance(gen, CombinedHeatPower) or isinstance(gen, ElectricGenerator):
+                n_pieces = fit_electric(gen, gen.output.electricity, resolution)
+                if isinstance(gen, CombinedHeatPower):
+                    #heat recovered as a linear function of electric output
+                    fit_terms,_,_ = piecewise_linear(gen.output.capacity, gen.output.heat, resolution=1, max_cap=gen.size)
+                    gen.fundata["f_heat"] = fit_terms[0]
+                    gen.fundata["c_heat"] = fit_terms[1]
+                else:
+                    gen.fundata["f_heat"] = 0
+                    gen.fundata["c_heat"] = 0
+                if gen.source == 'diesel':
+                    self.diesel_para.append(gen)
+                    self.diesel_pieces.append(n_pieces)
+                else:
+                    self.turbine_para.append(gen)
+                    self.turbine_pieces.append(n_pieces)
+            elif isinstance(gen, ElectricStorage):
+                self.e_storage_para.append(gen)
+            elif isinstance(gen, ThermalStorage) and gen.source == 'heat':
+                self.h_storage_para.append(gen)
+            elif isinstance(gen, ThermalStorage) and gen.source == 'cooling':
+                self.c_storage_para.append(gen)
+            elif isinstance(gen, Utility) and gen.source == 'electricity':
+                self.grid_para.append(gen)
+            elif isinstance(gen, Utility):
+                self.fuel_para.append(gen)
+            elif isinstance(gen, Renewable):
+                self.renew_para.append(gen)
+        if len(self.abs_para) > 0:
+            raise ValueError("Absorption chillers have no fitted efficiency curve in the conic dispatch model.")
+
+        #convert piecewise quadratic fit curves from format (hx^2 + fx + c) to format (bx + c)^2 + d
+        convert_quadratic(self.turbine_para)
+        convert_quadratic(self.diesel_para)
+        convert_quadratic(self.chiller_para)
+        convert_quadratic(self.boiler_para)
+
+        self.n_turbines = len(self.turbine_para)
+        self.n_dieselgen = len(self.diesel_para)
+        self.n_boilers = len(self.boiler_para)
+        self.n_chillers = len(self.chiller_para)
+        self.n_grid = len(self.grid_para)
+        self.n_e_storage = len(self.e_storage_para)
+        self.n_h_storage = len(self.h_storage_para)
+        self.n_c_storage = len(self.c_storage_para)
+        self.n_nodes = len(self.network)
+
+        #network topology and (nodes x components) maps of each component type
+        self.topology = NetworkTopology(self.network)
+        self.at_node = {}
+        for kind in ('turbine', 'diesel', 'boiler', 'chiller', 'grid', 'e_storage', 'h_storage', 'c_storage', 'renew'):
+            self.at_node[kind] = self.topology.component_incidence(getattr(self, kind + '_para'))
+
+        #admittance of the electric network and its lines
+        n_nodes = self.n_nodes
+        G = np.ones((n_nodes, n_nodes))*(-4)
+        B = np.ones((n_nodes, n_nodes))*(-6)
+        #the diagonal balances the admittance of the lines leaving each node
+        for node in self.topology.electrical.nodes:
+            neighbors = self.topology.electrical.neighbors[node]
+            G[node, node] = -sum(G[node, neighbors])
+            B[node, node] = -sum(B[node, neighbors])
+        self.G = G
+        self.B = B
+        electrical = self.topology.electrical
+        self.G_lines = electrical.loss_matrix(G[electrical.line_from, np.maximum(electrical.line_to, 0)] * (electrical.line_to >= 0))
+        self.B_lines = electrical.loss_matrix(B[electrical.line_from, np.maximum(electrical.line_to, 0)] * (electrical.line_to >= 0))
+
+        #(nodes x lines) loss matrices of the thermal networks. Every line is
+        #paired with the line running back, so a negative coefficient would
+        #count the flow of a pair twice and create heat or cooling
+        for table in (heat_loss, cool_loss):
+            if table is not None and np.any(np.asarray(table) < 0):
+                raise ValueError("Line coefficients of the thermal networks cannot be negative.")
+        heat = self.topology.district_heat
+        cool = self.topology.district_cooling
+        self.heat_line_loss = heat.outgoing() if heat_loss is None else heat.loss_matrix(heat.line_coefficients(heat_loss))
+        self.cool_line_loss = cool.outgoing() if cool_loss is None else cool.loss_matrix(cool.line_coefficients(cool_loss))
+
+        #fuel utility of each source, the first one listed if there are more
+        self.fuel = {}
+        for fuel in self.fuel_para:
+            self.fuel.setdefault(fuel.source, fuel)
+        self.set_test_data(test_data)
+
+    #demand and weather data the forecasts are read from, with the
+    #datetime64 TimeIndex of their timestamps
+    def set_test_data(self, test_data):
+        self.test_data = test_data
+        self.time_index = test_data.time_index()
+        self.irradiance = np.asarray(test_data.weather.irrad_dire_norm, dtype=float)
+
+    #the demand data are left out of pickles of the model, and so are the
+    #solver instances cvxpy keeps for warm starts, which can not be pickled
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['test_data'] = None
+        state['time_index'] = None
+        state['irradiance'] = None
+        state['heuristic'] = None
+        if self.prob is not None:
+            self.prob._solver_cache = {}
+        return state
+
+    ######## BUILD
+    def add_family(self, constraint_family):
+        self.timer.lap(constraint_family.name)
+        self.constraints.append((constraint_family.constraint, constraint_family.name))
+        self.families[constraint_family.name] = constraint_family
+
+    def add_group(self, name, indexes, **kwargs):
+        group = MatrixVariableGroup(name, indexes=indexes, **kwargs)
+        self.groups[name] = group
+        return group
+
+    def add_parameter(self, name, shape, nonneg=False):
+        param = cvxpy.Parameter(shape, name=name, nonneg=nonneg)
+        param.value = np.zeros(shape)
+        self.parameters[name] = param
+        return param
+
+    @timed('build')
+    def build(self):
+        if self.plant is None:
+            raise RuntimeError("load_plant must be called before build")
+        self.groups = {}
+        self.parameters = {}
+        self.families = {}
+        self.constraints = []
+        self.build_variables()
+        self.build_parameters()
+        objective = self.build_objective()
+        self.build_constraints()
+        self.prob = cvxpy.Problem(cvxpy.Minimize(objective), [c for c, _ in self.constraints])
+        self.heuristic = None
+        return self.prob
+
+    @timed('variables')
+    def build_variables(self):
+        T = self.T
+        hours = range(T)
+        add = self.add_group
+        # electric grid
+        index_grid = range(self.n_grid), hours
+        add("ep_elecfromgrid", index_grid, lower_bound_func=constant_zero) #real power from grid
+        add("eq_elecfromgrid", index_grid, lower_bound_func=constant_zero) #reactive power from grid
+        add("ep_electogrid", index_grid, lower_bound_func=constant_zero) #real power to the grid
+        add("eq_electogrid", index_grid, lower_bound_func=constant_zero) #reactive power to the grid
+
+        #dumping allowance
+        index_nodes = range(self.n_nodes), hours
+        if self.options['allow_dumping']:
+            if self.n_boilers>0:
+                add("heat_unserve", index_nodes, lower_bound_func=constant_zero)
+                add("heat_dump", index_nodes, lower_bound_func=constant_zero)
+            if self.n_chillers>0:
+                add("cool_unserve", index_nodes, lower_bound_func=constant_zero)
+                add("cool_dump", index_nodes, lower_bound_func=constant_zero)
+
+        #turbines: # fuel cells are considered turbines
+        index_turbines = range(self.n_turbines), hours
+        add("turbine_y", index_turbines, lower_bound_func=constant_zero) #  fuel use
+        add("turbine_xp", index_turbines, lower_bound_func=constant_zero) #  real power output
+        add("turbine_xq", index_turbines, lower_bound_func=constant_zero) #  reactive power output
+        add("turbine_xp_k", index_turbines, pieces=self.turbine_pieces) #  power outputs from all piecewise parts
+        add("turbine_xq_k", index_turbines, pieces=self.turbine_pieces) #  power outputs from all piecewise parts
+        add("turbine_s_k", index_turbines, is_binary_var=True, pieces=self.turbine_pieces) #  states from all pieceswise parts
+
+        #diesel generators:
+        index_dieselgen = range(self.n_dieselgen), hours
+        add("dieselgen_y", index_dieselgen, lower_bound_func=constant_zero) #fuel use
+        add("dieselgen_xp", index_dieselgen, lower_bound_func=constant_zero) # real power output
+        add("dieselgen_xq", index_dieselgen, lower_bound_func=constant_zero) # reactive power output
+        add("dieselgen_xp_k", index_dieselgen, pieces=self.diesel_pieces) # power outputs from all piecewise parts
+        add("dieselgen_xq_k", index_dieselgen, pieces=self.diesel_pieces) # power outputs from all piecewise parts
+        add("dieselgen_s_k", index_dieselgen, is_binary_var=True, pieces=self.diesel_pieces) # states from all piecewise parts
+
+        #boilers:
+        index_boilers = range(self.n_boilers), hours
+        add("boiler_y", index_boilers, lower_bound_func=constant_zero) #  fuel use from boiler
+        add("boiler_x", index_boilers, lower_bound_func=constant_zero) #  heat output from boiler
+        add("boiler_x_k", index_boilers, pieces=self.boiler_pieces) #  heat output from each portion of the piecewise fit
+        add("boiler_s_k", index_boilers, is_binary_var=True, pieces=self.boiler_pieces) #  unit commitment for each portion of the piecewise efficiency fit
+
+        #chillers
+        index_chiller = range(self.n_chillers), hours
+        add("chiller_x", index_chiller, lower_bound_func=constant_zero) #  cooling power output
+        add("chiller_yp", index_chiller, lower_bound_func=constant_zero) #  real electric power demand
+        add("chiller_yq", index_chiller, lower_bound_func=constant_zero) #  reactive electric power demand
+        add("chiller_x_k", index_chiller, pieces=self.chiller_pieces) #  cooling output from all piecewise parts
+        add("chiller_s_k", index_chiller, is_binary_var=True, pieces=self.chiller_pieces) #  unit commitment for piecewise sections
+
+        #storage
+        for kind in ('e_storage', 'h_storage', 'c_storage'):
+            index_storage = range(getattr(self, 'n_' + kind)), hours
+            add(kind + "_disch", index_storage, lower_bound_func=constant_zero)
+            add(kind + "_ch", index_storage, lower_bound_func=constant_zero)
+            add(kind + "_state", index_storage)
+
+        #nodal network
+        #voltage is split into x, y, z
+        #x_m = v_m^2 and is therefore positive
+        #y_mn = v_m*v_n*cos(theta_mn)
+        #z_mn = v_m*v_n*sin(theta_mn)
+        add("x_m", index_nodes, lower_bound_func=constant_zero)
+        add("y_mn", (range(self.topology.electrical.n_lines), hours))
+        add("z_mn", (range(self.topology.electrical.n_lines), hours))
+        add("h_mn", (range(self.topology.district_heat.n_lines), hours))
+        add("c_mn", (range(self.topology.district_cooling.n_lines), hours))
+
+    @timed('parameters')
+    def build_parameters(self):
+        T = self.T
+        n_nodes = self.n_nodes
+        add = self.add_parameter
+        #forecast generation and demand
+        add('ep_demand', (n_nodes, T))
+        add('eq_demand', (n_nodes, T))
+        add('h_demand', (n_nodes, T))
+        add('c_demand', (n_nodes, T))
+        add('renew', (n_nodes, T))
+        #utility costs
+        add('pelec_cost', (T,))
+        add('qelec_cost', (T,))
+        add('pselback_rate', (T,))
+        add('qselback_rate', (T,))
+        add('gas_rate', (T,))
+        add('diesel_rate', (T,))
+        #initial conditions
+        add('turbine_init', (self.n_turbines,))
+        add('dieselgen_init', (self.n_dieselgen,))
+        add('boiler_init', (self.n_boilers,))
+        add('chiller_init', (self.n_chillers,))
+        add('e_storage0', (self.n_e_storage,))
+        add('h_storage0', (self.n_h_storage,))
+        add('c_storage0', (self.n_c_storage,))
+        #default is to start storage at 50%
+        self.set_initial_conditions()
+
+    @timed('objective')
+    def build_objective(self):
+        g = self.groups
+        p = self.parameters
+        #the sellback rates of the Tariff are negative costs
+        #the cost of a step is its price times its length
+        pelec_cost = cvxpy.multiply(self.dt, p['pelec_cost'])
+        qelec_cost = cvxpy.multiply(self.dt, p['qelec_cost'])
+        gas_rate = cvxpy.multiply(self.dt, p['gas_rate'])
+        objective = cvxpy.sum(g['ep_elecfromgrid'].matrix() @ pelec_cost)\
+         + cvxpy.sum(g['eq_elecfromgrid'].matrix() @ qelec_cost)\
+         + cvxpy.sum(g['ep_electogrid'].matrix() @ cvxpy.multiply(self.dt, p['pselback_rate']))\
+         + cvxpy.sum(g['eq_electogrid'].matrix() @ cvxpy.multiply(self.dt, p['qselback_rate']))\
+         + cvxpy.sum(g['turbine_y'].matrix() @ gas_rate)\
+         + cvxpy.sum(g['dieselgen_y'].matrix() @ cvxpy.multiply(self.dt, p['diesel_rate']))\
+         + cvxpy.sum(g['boiler_y'].matrix() @ gas_rate)
+        #only penalize unserved demand
+        for name in ('heat_unserve', 'cool_unserve'):
+            if name in g:
+                objective = objective + self.options['bigM']*cvxpy.sum(g[name].matrix() @ self.dt)
+        return objective
+
+    @timed('constraints')
+    def build_constraints(self):
+        g = self.groups
+        p = self.parameters
+        self.timer.mark()
+
+        # turbine constraints
+        #this constraint is stated as (bp*x + cip)^2 - ep*x - d - y <= 0
+        # the cost of y will drive it to be equal to (bp*x + cip)^2 - ep*x -d
+        turbine = self.turbine_para
+        self.add_family(family.piece_consume("turbine_y_consume", g['turbine_y'], g['turbine_s_k'],
+            [np.add(cp, cq) for cp, cq in zip(fundata(turbine, "cp"), fundata(turbine, "cq"))],
+            [(g['turbine_xp_k'], fundata(turbine, "bp"), fundata(turbine, "fp")), (g['turbine_xq_k'], fundata(turbine, "bq"), fundata(turbine, "fq"))]))
+        self.add_family(family.generate("turbine_xp_generate", g['turbine_xp'], g['turbine_xp_k']))
+        self.add_family(family.generate("turbine_xq_generate", g['turbine_xq'], g['turbine_xq_k']))
+        self.add_family(family.piece_lower_bound("turbine_xp_k_lower", g['turbine_xp_k'], g['turbine_s_k'], [gen.lb for gen in turbine]))
+        self.add_family(family.piece_apparent_upper_bound("turbine_xp_k_upper", g['turbine_xp_k'], g['turbine_xq_k'], g['turbine_s_k'], [gen.ub for gen in turbine]))
+        self.add_family(family.status("turbine_x_status", g['turbine_s_k']))
+        self.add_ramps("turbine", g['turbine_xp'], turbine, p['turbine_init'])
+
+        # diesel constraints
+        diesel = self.diesel_para
+        self.add_family(family.piece_consume("dieselgen_y_consume", g['dieselgen_y'], g['dieselgen_s_k'],
+            [-np.add(cp, cq) for cp, cq in zip(fundata(diesel, "cp"), fundata(diesel, "cq"))],
+            [(g['dieselgen_xp_k'], fundata(diesel, "bp"), fundata(diesel, "fp")), (g['dieselgen_xq_k'], fundata(diesel, "bq"), fundata(diesel, "fq"))]))
+        self.add_family(family.generate("dieselgen_xp_generator", g['dieselgen_xp'], g['dieselgen_xp_k']))
+        self.add_family(family.generate("dieselgen_xq_generator", g['dieselgen_xq'], g['dieselgen_xq_k']))
+        self.add_family(family.piece_lower_bound("dieselgen_xp_k_lower", g['dieselgen_xp_k'], g['dieselgen_s_k'], [gen.lb for gen in diesel]))
+        self.add_family(family.piece_apparent_upper_bound("dieselgen_xp_k_upper", g['dieselgen_xp_k'], g['dieselgen_xq_k'], g['dieselgen_s_k'], [gen.ub for gen in diesel]))
+        self.add_family(family.status("dieselgen_x_status", g['dieselgen_s_k']))
+        self.add_ramps("dieselgen", g['dieselgen_xp'], diesel, p['dieselgen_init'])
+
+        # boiler constraints
+        boiler = self.boiler_para
+        self.add_family(family.piece_consume("boiler_y_consume", None, g['boiler_s_k'], fundata(boiler, "d"),
+            [(g['boiler_x_k'], fundata(boiler, "b"), fundata(boiler, "f"))]))
+        self.add_family(family.generate("boiler_x_generate", g['boiler_x'], g['boiler_x_k']))
+        self.add_family(family.piece_lower_bound("boiler_x_k_lower", g['boiler_x_k'], g['boiler_s_k'], [gen.lb for gen in boiler]))
+        self.add_family(family.piece_upper_bound("boiler_x_k_upper", g['boiler_x_k'], g['boiler_s_k'], [gen.ub for gen in boiler]))
+        self.add_family(family.status("boiler_x_status", g['boiler_s_k']))
+        self.add_ramps("boiler", g['boiler_x'], boiler, p['boiler_init'])
+
+        # chiller constraints
+        chiller = self.chiller_para
+        self.add_family(family.piece_consume("chiller_yp_consume", g['chiller_yp'], g['chiller_s_k'], fundata(chiller, "cp"),
+            [(g['chiller_x_k'], fundata(chiller, "bp"), fundata(chiller, "fp"))]))
+        self.add_family(family.piece_consume("chiller_yq_consume", g['chiller_yq'], g['chiller_s_k'], fundata(chiller, "cq"),
+            [(g['chiller_x_k'], fundata(chiller, "bq"), fundata(chiller, "fq"))]))
+        self.add_family(family.generate("chiller_x_generate", g['chiller_x'], g['chiller_x_k']))
+        self.add_family(family.piece_lower_bound("chiller_x_k_lower", g['chiller_x_k'], g['chiller_s_k'], [gen.lb for gen in chiller]))
+        self.add_family(family.piece_upper_bound("chiller_x_k_upper", g['chiller_x_k'], g['chiller_s_k'], [gen.ub for gen in chiller]))
+        self.add_family(family.status("chiller_x_status", g['chiller_s_k']))
+        self.add_ramps("chiller", g['chiller_x'], chiller, p['chiller_init'])
+
+        # storage constraints
+        self.add_storage("e_storage", [s.eta_ch for s in self.e_storage_para], [s.eta_disch for s in self.e_storage_para])
+        self.add_storage("h_storage", [s.eta_ch for s in self.h_storage_para], [s.eta_disch for s in self.h_storage_para])
+        self.add_storage("c_storage", [s.charge_eff for s in self.c_storage_para], [s.disch_eff for s in self.c_storage_para])
+
+        # supply and demand at every node
+        self.add_family(family.nodal_balance("electric_p_balance", self.electric_p_balance(), range(self.T)))
+        self.add_family(family.nodal_balance("electric_q_balance", self.electric_q_balance(), range(self.T)))
+        self.add_family(family.nodal_balance("cool_balance", self.cool_balance(), range(self.T)))
+        self.add_family(family.nodal_balance("heat_balance", self.heat_balance(), range(self.T)))
+
+        # voltage and line current limits of the electric network
+        if self.options['network_limits']:
+            self.add_network_limits()
+
+        # flow leaving one node on a line arrives at the other node
+        self.add_family(family.line_reverse("line_heat", g['h_mn'], self.topology.district_heat.reverse))
+        self.add_family(family.line_reverse("line_cooling", g['c_mn'], self.topology.district_cooling.reverse))
+
+    def add_ramps(self, name, group, para, init):
+        ramp_rate = [gen.ramp_rate for gen in para]
+        hours = ramp_hours(self.dt)
+        self.add_family(family.ramp_first_up(name + "_ramp1_up", group, ramp_rate, init, self.dt[0]))
+        self.add_family(family.ramp_first_down(name + "_ramp1_down", group, ramp_rate, init, self.dt[0]))
+        self.add_family(family.ramp_up(name + "_ramp_up", group, ramp_rate, hours))
+        self.add_family(family.ramp_down(name + "_ramp_down", group, ramp_rate, hours))
+
+    def add_storage(self, kind, eta_ch, eta_disch):
+        state, ch, disch = self.groups[kind + "_state"], self.groups[kind + "_ch"], self.groups[kind + "_disch"]
+        para = getattr(self, kind + "_para")
+        #charging power is limited by the peak discharge rate and the state
+        #of charge by the depth of discharge and the size
+        self.add_family(family.upper_bound(kind + "_disch_upper", disch, [s.peak_disch*s.size for s in para]))
+        self.add_family(family.upper_bound(kind + "_ch_upper", ch, [s.peak_disch*s.size for s in para]))
+        self.add_family(family.lower_bound(kind + "_state_lower", state, [s.max_dod for s in para]))
+        self.add_family(family.upper_bound(kind + "_state_upper", state, [s.size for s in para]))
+        self.add_family(family.storage_init(kind + "_init", state, ch, disch, eta_ch, eta_disch, self.parameters[kind + "0"], self.dt[0]))
+        self.add_family(family.storage_state(kind + "_state_constraint", state, ch, disch, eta_ch, eta_disch, self.dt[1:]))
+
+    def add_network_limits(self):
+        g = self.groups
+        electrical = self.topology.electrical
+        v_nominal = self.options['v_nominal']
+        self.add_family(family.lower_bound("voltage_limit_lower", g['x_m'], [(v_nominal*.9)**2]*self.n_nodes))
+        self.add_family(family.upper_bound("voltage_limit_upper", g['x_m'], [(v_nominal*1.1)**2]*self.n_nodes))
+        coefficients = np.diag(self.G)[electrical.line_from]**2 + self.B[electrical.line_from, np.maximum(electrical.line_to, 0)]**2
+        self.add_family(family.line_current("current_limit", g['x_m'], g['y_mn'], electrical.line_from, electrical.line_to,
+            coefficients, self.options['current_limit_value']))
+        self.add_family(family.line_voltage_cone("voltage_cone", g['x_m'], g['y_mn'], g['z_mn'], electrical.line_from, electrical.line_to))
+
+    #(nodes x hours) expressions of each nodal balance, == 0
+    def electric_p_balance(self):
+        g = self.groups
+        p = self.parameters
+        at = self.at_node
+        #sum of power at node = Gmmxm + sum(Gmnymn+Bmnymn)
+        return (family.node_sum(at['turbine'], g['turbine_xp'])\
+         + family.node_sum(at['grid'], g['ep_elecfromgrid'].matrix() - g['ep_electogrid'].matrix())\
+         - family.node_sum(at['chiller'], g['chiller_yp'])\
+         + family.node_sum(at['e_storage'], g['e_storage_disch'].matrix() - g['e_storage_ch'].matrix())\
+         + family.node_sum(at['diesel'], g['dieselgen_xp'])\
+         - p['ep_demand']\
+         + p['renew'])/self.options['pu_e']\
+         - cvxpy.multiply(np.reshape(np.diag(self.G), (-1,1)), g['x_m'].matrix())\
+         - self.G_lines @ g['y_mn'].matrix() - self.B_lines @ g['z_mn'].matrix()
+
+    def electric_q_balance(self):
+        g = self.groups
+        p = self.parameters
+        at = self.at_node
+        # sum of reactive power at node = -Bmmxm + sum(Gmnzmn - Bmnymn)
+        # energy storage is assumed to store real power only, so not included here
+        return (family.node_sum(at['turbine'], g['turbine_xq'])\
+         + family.node_sum(at['grid'], g['eq_elecfromgrid'].matrix() - g['eq_electogrid'].matrix())\
+         - family.node_sum(at['chiller'], g['chiller_yq'])\
+         + family.node_sum(at['diesel'], g['dieselgen_xq'])\
+         - p['eq_demand'])/self.options['pu_e']\
+         - self.G_lines @ g['z_mn'].matrix() + self.B_lines @ g['y_mn'].matrix()\
+         + cvxpy.multiply(np.reshape(np.diag(self.B), (-1,1)), g['x_m'].matrix())
+
+    def heat_balance(self):
+        g = self.groups
+        at = self.at_node
+        f_heat = np.reshape(np.array([gen.fundata["f_heat"] for gen in self.turbine_para], dtype=float), (-1,1))
+        c_heat = np.reshape(np.array([gen.fundata["c_heat"] for gen in self.turbine_para], dtype=float), (-1,1))
+        #sum of heat produced-heat used at this node = heat in/out of this node
+        balance = family.node_sum(at['boiler'], g['boiler_x'])\
+         + family.node_sum(at['turbine'], cvxpy.multiply(f_heat, g['turbine_xp'].matrix()) + c_heat)\
+         + family.node_sum(at['h_storage'], g['h_storage_disch'].matrix() - g['h_storage_ch'].matrix())\
+         - self.parameters['h_demand']\
+         - self.heat_line_loss @ g['h_mn'].matrix()
+        if 'heat_dump' in g:
+            balance = balance - g['heat_dump'].matrix() + g['heat_unserve'].matrix()
+        return balance
+
+    def cool_balance(self):
+        g = self.groups
+        at = self.at_node
+        balance = family.node_sum(at['chiller'], g['chiller_x'])\
+         + family.node_sum(at['c_storage'], g['c_storage_disch'].matrix() - g['c_storage_ch'].matrix())\
+         - self.parameters['c_demand']\
+         - self.cool_line_loss @ g['c_mn'].matrix()
+        if 'cool_dump' in g:
+            balance = balance - g['cool_dump'].matrix() + g['cool_unserve'].matrix()
+        return balance
+
+    ######## FORECAST AND INITIAL CONDITIONS
+    #initial output of every unit (default off) and initial storage state
+    #(default is to start storage at 50%)
+    def initial_conditions(self, turbine=None, dieselgen=None, boiler=None, chiller=None, e_storage=None, h_storage=None, c_storage=None):
+        initial = {}
+        for name, value, n in (('turbine_init', turbine, self.n_turbines), ('dieselgen_init', dieselgen, self.n_dieselgen),
+                               ('boiler_init', boiler, self.n_boilers), ('chiller_init', chiller, self.n_chillers)):
+            initial[name] = np.zeros(n) if value is None else np.asarray(value, dtype=float).reshape(n)
+        for kind, value in (('e_storage', e_storage), ('h_storage', h_storage), ('c_storage', c_storage)):
+            if value is None:
+                value = [0.5*s.size for s in getattr(self, kind + '_para')]
+            initial[kind + '0'] = np.asarray(value, dtype=float).reshape(getattr(self, 'n_' + kind))
+        return initial
+
+    def set_initial_conditions(self, **kwargs):
+        for name, value in self.initial_conditions(**kwargs).items():
+            self.parameters[name].value = value
+
+    #electric utility pricing function, the price of one hour from the
+    #compiled Tariff of the first grid connection
+    def find_utility_pricing(self, date_stamp):
+        return self.grid_para[0].tariff().prices(date_stamp, 1)[0]
+
+    #fuel pricing function of the utility of a source, 'ng' or 'diesel'
+    def find_fuel_pricing(self, date_stamp, source='ng'):
+        return self.fuel[source].rate_for([date_stamp])[0]
+
+    #forecast demands, renewable generation and prices for the T steps from
+    #start_date, the mean of the hours of each step. The hours are found in
+    #the test data in one lookup, a slice of it on a regular grid
+    def forecast(self, start_date):
+        hours = int(np.sum(self.dt))
+        hour_range = [start_date + datetime.timedelta(hours=i) for i in range(hours)]
+        f_ind = self.time_index.horizon(start_date, hours)
+        demand = self.test_data.demand
+        forecast = {}
+        for name in ('ep_demand', 'eq_demand', 'h_demand', 'c_demand', 'renew'):
+            forecast[name] = np.zeros((self.n_nodes, hours))
+        irrad = self.irradiance[f_ind]
+        renew_size = self.at_node['renew'] @ np.array([r.size_m2*r.gen_frac for r in self.renew_para], dtype=float)
+        for i, node in enumerate(self.network):
+            if not node.electrical.load == []:
+                forecast['ep_demand'][i,:] = demand.e[0, f_ind]
+                forecast['eq_demand'][i,:] = demand.e[0, f_ind]*0.1 #assume high power factor for now
+            if not node.district_heat.load == []:
+                forecast['h_demand'][i,:] = demand.h[node.district_heat.load, f_ind]
+            if not node.district_cooling.load == []:
+                forecast['c_demand'][i,:] = demand.c[node.district_cooling.load, f_ind]
+            forecast['renew'][i,:] = irrad*renew_size[i]
+        forecast.update(self.grid_para[0].tariff().horizon(start_date, hours))
+        forecast['gas_rate'] = self.fuel['ng'].rate_for(hour_range)
+        if 'diesel' in self.fuel:
+            forecast['diesel_rate'] = self.fuel['diesel'].rate_for(hour_range)
+        else:
+            forecast['diesel_rate'] = np.zeros(hours)
+        return step_starts(start_date, self.dt), dict((name, step_mean(value, self.dt)) for name, value in forecast.items())
+
+    @timed('update_forecast')
+    def update_forecast(self, start_date):
+        if self.prob is None:
+            raise RuntimeError("build must be called before update_forecast")
+        self.date_range, forecast = self.forecast(start_date)
+        for name, value in forecast.items():
+            self.parameters[name].value = value
+        return forecast
+
+    ######## SOLVE AND EXTRACT
+    #canonicalize the problem for a solver once, later solves with the same
+    #solver only apply the new parameter values to the compiled data
+    @timed('compile')
+    def compile(self, solver):
+        if self.prob is None:
+            raise RuntimeError("build must be called before compile")
+        self.problem_data, _, _ = self.prob.get_problem_data(solver)
+        return self.problem_data
+
+    #solves with the solver chain of solver_config, solver= uses that solver
+    #alone. Other keyword arguments are passed to the solver. If no solver of
+    #the chain takes the mixed integer problem, the unit commitment is
+    #relaxed, rounded and polished in the time the chain left, unless the
+    #config has no heuristic_fallback
+    @timed('solve')
+    def solve(self, **kwargs):
+        deadline = kwargs.pop('deadline', None)
+        deadline = self.solver_config.deadline() if deadline is None else deadline
+        try:
+            result, self.solve_stats = self.solver_config.solve(self.prob, deadline=deadline, **kwargs)
+        except cvxpy.error.SolverError as exception:
+            if not self.solver_config.heuristic_fallback or kwargs.get('solver') is not None or not self.prob.is_mixed_integer():
+                raise
+            return self.fallback_heuristic(exception, deadline, **kwargs)
+        #split into the cvxpy compile and the time reported by the solver
+        self.timer.add(self.timer.full_name('compile'), self.prob.compilation_time or 0)
+        if self.prob.solver_stats is not None and self.prob.solver_stats.solve_time is not None:
+            self.timer.add(self.timer.full_name('solver'), self.prob.solver_stats.solve_time)
+        return result
+
+    #fast path for real-time operation: the continuous relaxation is solved,
+    #the segment binaries are rounded and the convex problem left is solved.
+    #solve_stats holds the gap to the relaxation bound. Keyword arguments
+    #are passed to the solver
+    @timed('solve')
+    def solve_heuristic(self, **kwargs):
+        if self.heuristic is None:
+            self.heuristic = RelaxRoundPolish(self)
+        result = self.heuristic.solve(**kwargs)
+        self.solve_stats = self.heuristic.stats
+        return result
+
+    #relax, round and polish after the solver chain failed with error on the
+    #mixed integer problem. solve_stats keeps the error of the chain
+    def fallback_heuristic(self, error, deadline, **kwargs):
+        if self.heuristic is None:
+            self.heuristic = RelaxRoundPolish(self)
+        result = self.heuristic.solve(deadline=deadline, mip_fallback=False, **kwargs)
+        self.solve_stats = dict(self.heuristic.stats, mip={'solver': None, 'status': 'error', 'error': str(error)})
+        return result
+
+    #start point for the next horizon: the last solution moved hours earlier,
+    #unit commitment binaries included. Solvers that take a start point (a
+    #MIP start for Gurobi) read it when solve is called with warm_start=True
+    def warm_start(self, hours=1):
+        for group in self.groups.values():
+            group.shift(hours)
+        #cvxpy would otherwise start Gurobi from the unshifted solution of
+        #the model it cached
+        self.prob._solver_cache.clear()
+
+    #solve steps horizons, each starting one hour (the first step) after the
+    #one before, and yield the start date, objective and solution of each.
+    #The first hour of a solution is kept in state (a DispatchState, by
+    #default the units off and storage half full) and sets the initial
+    #conditions of the next horizon, which is warm started from the rest of
+    #the solution. heuristic uses solve_heuristic for every horizon
+    def receding_horizon(self, start_date, steps, warm_start=True, state=None, heuristic=False, **kwargs):
+        state = initial_state(self) if state is None else state
+        for step in range(steps):
+            if step > 0 and warm_start:
+                self.warm_start()
+            self.set_initial_conditions(**state.initial_conditions())
+            self.update_forecast(start_date + datetime.timedelta(hours=step*float(self.dt[0])))
+            if heuristic:
+                result = self.solve_heuristic(warm_start=warm_start, **kwargs)
+            else:
+                result = self.solve(warm_start=warm_start, **kwargs)
+            solution = self.extract()
+            state.update_from_solution(solution)
+            yield self.date_range[0], result, solution
+
+    #timing record of the phases since the last record, for the current horizon
+    def timing_record(self, **fields):
+        start_date = None if self.date_range is None else self.date_range[0]
+        return self.timer.record(T=self.T, start_date=start_date, solve=self.solve_stats, **fields)
+
+    #solution of every variable group in one pass, (components x T) for
+    #groups without piecewise sections and (components x T x pieces)
+    #otherwise, None for groups that were not solved
+    @timed('extract')
+    def extract(self):
+        return dict((name, group.array()) for name, group in self.groups.items())
+
+    #flat view of a solution (the last one by default) for export, one row
+    #per hour of the horizon
+    def frame(self, solution=None):
+        solution = self.extract() if solution is None else solution
+        return solution_frame(solution, self.date_range)
+
+
+#one column per component, named like the legacy variables (turbine_xp_0),
+#and per piecewise section of a component (turbine_s_k_0_1). Sections a
+#component does not have are left out
+def solution_frame(solution, index=None):
+    columns = {}
+    for name, value in solution.items():
+        if value is None:
+            continue
+        value = np.asarray(value)
+        for j in range(value.shape[0]):
+            if value.ndim == 2:
+                columns["{}_{}".format(name, j)] = value[j]
+                continue
+            for k in range(value.shape[2]):
+                if not np.all(np.isnan(value[j, :, k])):
+                    columns["{}_{}_{}".format(name, j, k)] = value[j, :, k]
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(index, name='timestamp') if index is not None else None)
@@ -0,0 +1,100 @@
+'''
+On-disk cache of built and compiled dispatch models.
+cache_key: hash of the plant pickle, the horizon length, the model options and
+    the solver the model is compiled for.
+ProblemCache: pickles a DispatchModel after load_plant, build and compile,
+    so a cold start of a dispatch worker skips the piecewise fitting and the
+    cvxpy canonicalization. The cached model keeps the compiled conic data
+    (A, b, c, cone dimensions and the parameter to data mapping) in
+    problem_data and in the cvxpy problem cache, so the first solve only
+    applies the forecast parameters.
+'''
+
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+
+import cvxpy
+import numpy as np
+
+from dispatch.model import DispatchModel
+
+
+#bump when the model formulation changes so older cache files are not used
+CACHE_VERSION = 4
+
+
+def file_digest(file_name):
+    digest = hashlib.sha256()
+    with open(file_name, 'rb') as file_object:
+        for block in iter(lambda: file_object.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+#hash of the plant pickle, T, the model options, the solver and the line loss tables
+def cache_key(plant_file, T, options, solver, heat_loss=None, cool_loss=None):
+    digest = hashlib.sha256()
+    digest.update(file_digest(plant_file).encode())
+    digest.update(json.dumps({'version': CACHE_VERSION, 'T': T, 'options': options, 'solver': solver}, sort_keys=True).encode())
+    for table in (heat_loss, cool_loss):
+        if table is not None:
+            digest.update(np.ascontiguousarray(table, dtype=float).tobytes())
+        digest.update(b'|')
+    return digest.hexdigest()
+
+
+class ProblemCache(object):
+    '''Directory of pickled, compiled DispatchModels, one file per key.
+
+    ATTRIBUTES:
+    directory
+    '''
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.pickle')
+
+    #cached model with its demand data attached, None if the key is not cached
+    def load(self, key, test_data):
+        if not os.path.isfile(self.path(key)):
+            return None
+        with open(self.path(key), 'rb') as file_object:
+            model = pickle.load(file_object)
+        model.set_test_data(test_data)
+        return model
+
+    #written to a temporary file of its own first, so a worker never reads a
+    #partial file and workers storing the same key do not collide
+    def store(self, key, model):
+        handle, temp_file = tempfile.mkstemp(suffix='.tmp', prefix=key, dir=self.directory)
+        with os.fdopen(handle, 'wb') as file_object:
+            pickle.dump(model, file_object, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, self.path(key))
+
+    #cached model for the plant pickle, or a newly built and compiled one
+    #that is stored for the next cold start. The model is compiled for the
+    #first installed solver of its solver chain, the one its first solve
+    #tries, unless solver names another
+    def load_or_build(self, plant_file, test_data, T=24, solver=None, heat_loss=None, cool_loss=None, **kwargs):
+        model = DispatchModel(T=T, **kwargs)
+        chain = model.solver_config.chain(solver)
+        if len(chain) == 0:
+            raise cvxpy.error.SolverError("None of the solvers of the chain is installed.")
+        solver = chain[0]
+        key = cache_key(plant_file, T, model.options, solver, heat_loss, cool_loss)
+        cached = self.load(key, test_data)
+        if cached is not None:
+            return cached
+        with open(plant_file, 'rb') as file_object:
+            plant = pickle.load(file_object)
+        model.load_plant(plant, test_data, heat_loss=heat_loss, cool_loss=cool_loss)
+        model.build()
+        model.compile(solver)
+        self.store(key, model)
+        return model
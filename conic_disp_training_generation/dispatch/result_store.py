@@ -0,0 +1,169 @@
+'''
+Columnar store of dispatch results.
+ResultStore: preallocated, append-only NumPy memmaps in a directory, with
+    one row per stored hour and one contiguous column per variable,
+    indexed by timestamp and column name. Appending a horizon writes T
+    values into each column, and a column for a year is read straight
+    from its memmap without parsing text.
+group_columns: schema of the store from the variable groups of a model,
+    one column per component and piecewise section.
+'''
+
+import os
+import json
+
+import numpy as np
+
+from dispatch.variable_group import RANGE
+
+
+#pieces of every component of a group (MatrixVariableGroup or VariableGroup)
+def group_pieces(group):
+    return [int(np.size(var)) for var in group[RANGE, 0]]
+
+#column names and layout (group name -> pieces of each component) of the
+#groups, a component with piecewise sections has one column per section
+def group_columns(groups):
+    columns = []
+    layout = {}
+    for name, group in groups.items():
+        pieces = group_pieces(group)
+        layout[name] = pieces
+        for j, k in enumerate(pieces):
+            if k == 1:
+                columns.append("{}_{}".format(name, j))
+            else:
+                columns.extend("{}_{}_{}".format(name, j, i) for i in range(k))
+    return columns, layout
+
+#(columns x T) block of a group from its solution array, (components x T)
+#or (components x T x pieces) padded after the pieces of each component
+def group_block(value, pieces, T):
+    if len(pieces) == 0:
+        return np.zeros((0, T))
+    if value is None:
+        return np.full((sum(pieces), T), np.nan)
+    value = np.asarray(value, dtype=float)
+    if value.ndim == 2:
+        return value
+    mask = np.arange(value.shape[2])[None, :] < np.asarray(pieces)[:, None]
+    return value.transpose(0, 2, 1)[mask]
+
+
+class ResultStore(object):
+    '''Append-only columnar store of dispatch results in a directory.
+
+    values is a (columns x capacity) float memmap, so every column is
+    contiguous, and timestamp and horizon are datetime64 memmaps of the
+    hour of each row and the start of the horizon it was solved in. The
+    capacity is preallocated and doubled when it runs out. Opening an
+    existing directory continues appending to it, unless new is set.
+
+    ATTRIBUTES:
+    directory
+    columns
+    layout      group name -> pieces of each component
+    capacity
+    values
+    timestamp
+    horizon
+    '''
+
+    def __init__(self, directory, columns=None, layout=None, capacity=8760, new=False):
+        self.directory = directory
+        if os.path.isfile(self.path('schema.json')) and not new:
+            with open(self.path('schema.json')) as file_object:
+                schema = json.load(file_object)
+            self.columns = schema['columns']
+            self.layout = schema['layout']
+            self.capacity = schema['capacity']
+            self.open('r+')
+        else:
+            if columns is None:
+                raise ValueError("columns are needed to create a new store in {}".format(directory))
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            self.columns = list(columns)
+            self.layout = layout or {}
+            self.capacity = capacity
+            self.write_schema()
+            self.open('w+')
+            self.values[:] = np.nan
+            self._rows[0] = 0
+        self.index = dict((name, i) for i, name in enumerate(self.columns))
+
+    def path(self, file_name):
+        return os.path.join(self.directory, file_name)
+
+    def write_schema(self):
+        with open(self.path('schema.json'), 'w') as file_object:
+            json.dump({'columns': self.columns, 'layout': self.layout, 'capacity': self.capacity}, file_object)
+
+    def open(self, mode):
+        self.values = np.memmap(self.path('values.f64'), dtype=np.float64, mode=mode, shape=(len(self.columns), self.capacity))
+        self.timestamp = np.memmap(self.path('timestamp.i8'), dtype='datetime64[s]', mode=mode, shape=(self.capacity,))
+        self.horizon = np.memmap(self.path('horizon.i8'), dtype='datetime64[s]', mode=mode, shape=(self.capacity,))
+        #number of rows written, kept in the store so it is current without a flush
+        self._rows = np.memmap(self.path('rows.i8'), dtype=np.int64, mode=mode, shape=(1,))
+
+    @property
+    def rows(self):
+        return int(self._rows[0])
+
+    #copies the memmaps into files of the new capacity
+    def grow(self, capacity):
+        rows = self.rows
+        values, timestamp, horizon = np.array(self.values[:, :rows]), np.array(self.timestamp[:rows]), np.array(self.horizon[:rows])
+        self.flush()
+        self.capacity = capacity
+        self.write_schema()
+        self.open('w+')
+        self.values[:] = np.nan
+        self.values[:, :rows] = values
+        self.timestamp[:rows] = timestamp
+        self.horizon[:rows] = horizon
+        self._rows[0] = rows
+
+    #append the hours of one horizon. values is a (columns x hours) array or
+    #a dictionary of column -> hours, columns that are left out stay NaN
+    def append(self, timestamps, values, horizon=None):
+        n = len(timestamps)
+        rows = self.rows
+        if rows + n > self.capacity:
+            self.grow(max(2*self.capacity, rows + n))
+        if isinstance(values, dict):
+            for name, value in values.items():
+                self.values[self.index[name], rows:rows + n] = value
+        else:
+            self.values[:, rows:rows + n] = values
+        self.timestamp[rows:rows + n] = np.array(timestamps, dtype='datetime64[s]')
+        self.horizon[rows:rows + n] = np.datetime64(timestamps[0] if horizon is None else horizon, 's')
+        self._rows[0] = rows + n
+
+    #append a horizon from the solution arrays of the groups in layout, as
+    #returned by DispatchModel.extract. The columns of the store start with
+    #the group_columns of layout, extra holds the other columns by name
+    def append_solution(self, timestamps, solution, extra=None):
+        T = len(timestamps)
+        blocks = [group_block(solution.get(name), pieces, T) for name, pieces in self.layout.items()]
+        block = np.concatenate(blocks) if len(blocks) > 0 else np.zeros((0, T))
+        n_extra = len(self.columns) - block.shape[0]
+        values = np.concatenate((block, np.full((n_extra, T), np.nan)))
+        for name, value in (extra or {}).items():
+            values[self.index[name]] = value
+        self.append(timestamps, values)
+
+    #values of a column for every stored row, or only for the first hour of
+    #each horizon, which is the dispatch that was carried out
+    def column(self, name, first_hour=False):
+        values = self.values[self.index[name], :self.rows]
+        if first_hour:
+            return values[self.first_hours()]
+        return values
+
+    def first_hours(self):
+        return self.timestamp[:self.rows] == self.horizon[:self.rows]
+
+    def flush(self):
+        for array in (self.values, self.timestamp, self.horizon, self._rows):
+            array.flush()
@@ -0,0 +1,153 @@
+'''
+Solver settings of the dispatch model.
+SolverConfig: solver choice, wall-clock limit, MIP gap and thread count,
+    translated to the options of each solver, and an ordered fallback chain
+    of solvers that is tried in turn. Solvers that are not installed are
+    skipped, so the same settings run with or without commercial licenses.
+    The time limit is one wall-clock budget for the whole chain, each
+    solver gets what the solvers before it left.
+Every solve leaves a statistics dictionary with the solver that answered,
+its status, objective and times, and the attempts that came before it.
+'''
+
+import time
+
+import cvxpy
+import cvxpy.settings as s
+
+
+#fallback chain: commercial solvers first, then the open source ones. HiGHS
+#and Clarabel do not take second order cone or mixed integer problems
+#respectively, cvxpy refuses them and the next solver is tried
+DEFAULT_FALLBACK = ('MOSEK', 'SCIP', 'HIGHS', 'ECOS_BB', 'CLARABEL')
+
+#statuses that are an answer about the problem, not a failure of the solver
+FINAL_STATUS = (s.INFEASIBLE, s.UNBOUNDED)
+
+
+class SolverConfig(object):
+    '''Solver choice, limits and fallback chain of a dispatch model.
+
+    time_limit is in seconds of wall clock for the whole chain and mip_gap
+    is relative; both and threads are left to the solver defaults if None.
+    solver_options holds extra options by solver name, e.g.
+    {'GUROBI': {'NumericFocus': 3}}. Without a mixed integer second order
+    cone solver (Gurobi, Mosek or SCIP with a license for the size of the
+    problem) no solver of the chain takes the dispatch problem, and with
+    heuristic_fallback DispatchModel.solve then relaxes, rounds and
+    polishes the unit commitment with the open source conic solvers.
+
+    ATTRIBUTES:
+    solver
+    fallback
+    time_limit
+    mip_gap
+    threads
+    solver_options
+    verbose
+    heuristic_fallback
+    '''
+
+    def __init__(self, solver='GUROBI', fallback=DEFAULT_FALLBACK, time_limit=None, mip_gap=None, threads=None, solver_options=None, verbose=False,
+                 heuristic_fallback=True):
+        self.solver = solver
+        self.fallback = tuple(fallback)
+        self.time_limit = time_limit
+        self.mip_gap = mip_gap
+        self.threads = threads
+        self.solver_options = solver_options or {}
+        self.verbose = verbose
+        self.heuristic_fallback = heuristic_fallback
+
+    #installed solvers in the order they are tried, a solver named in the
+    #call is used alone
+    def chain(self, solver=None):
+        if solver is not None:
+            return [solver]
+        installed = cvxpy.installed_solvers()
+        chain = []
+        for name in (self.solver,) + self.fallback:
+            if name in installed and name not in chain:
+                chain.append(name)
+        return chain
+
+    #perf_counter time by which a solve started now has used up time_limit,
+    #None without a limit
+    def deadline(self):
+        return None if self.time_limit is None else time.perf_counter() + self.time_limit
+
+    #limits, gap and threads in the option names of one solver. time_limit
+    #replaces the limit of the config, e.g. with the rest of a budget
+    def options(self, solver, time_limit=None):
+        limit, gap, threads = self.time_limit if time_limit is None else time_limit, self.mip_gap, self.threads
+        if solver == 'GUROBI':
+            options = {'TimeLimit': limit, 'MIPGap': gap, 'Threads': threads}
+        elif solver == 'MOSEK':
+            options = {'mosek_params': dict((k, v) for k, v in (('MSK_DPAR_OPTIMIZER_MAX_TIME', limit),
+                ('MSK_DPAR_MIO_TOL_REL_GAP', gap), ('MSK_IPAR_NUM_THREADS', threads)) if v is not None)}
+        elif solver == 'SCIP':
+            options = {'scip_params': dict((k, v) for k, v in (('limits/time', limit), ('limits/gap', gap),
+                ('parallel/maxnthreads', threads)) if v is not None)}
+        elif solver == 'CPLEX':
+            options = {'cplex_params': dict((k, v) for k, v in (('timelimit', limit), ('mip.tolerances.mipgap', gap),
+                ('threads', threads)) if v is not None)}
+        elif solver == 'HIGHS':
+            options = {'time_limit': limit, 'mip_rel_gap': gap, 'threads': threads}
+        elif solver == 'CLARABEL':
+            options = {'time_limit': limit, 'max_threads': threads}
+        elif solver == 'SCS':
+            options = {'time_limit_secs': limit}
+        else:
+            options = {}
+        options = dict((k, v) for k, v in options.items() if v is not None and v != {})
+        options.update(self.solver_options.get(solver, {}))
+        return options
+
+    #solve prob with the first solver of the chain that finds a solution or
+    #proves the problem infeasible or unbounded. Returns the objective value
+    #and the statistics of the solve. Keyword arguments go to every solver,
+    #and solver= skips the chain. Every solver is limited to the time left
+    #until deadline (a perf_counter time, time_limit from now by default)
+    #and no solver is started after it
+    def solve(self, prob, solver=None, deadline=None, **kwargs):
+        kwargs.setdefault('verbose', self.verbose)
+        deadline = self.deadline() if deadline is None else deadline
+        attempts = []
+        result = None
+        error = None
+        for name in self.chain(solver):
+            tic = time.perf_counter()
+            if deadline is not None and deadline <= tic:
+                break
+            options = self.options(name, None if deadline is None else deadline - tic)
+            options.update(kwargs)
+            try:
+                result = prob.solve(solver=name, **options)
+            except (cvxpy.error.SolverError, ValueError) as exception:
+                error = exception
+                attempts.append({'solver': name, 'status': 'error', 'error': str(exception), 'wall_time': time.perf_counter() - tic})
+                continue
+            attempts.append({'solver': name, 'status': prob.status, 'wall_time': time.perf_counter() - tic})
+            if prob.status in s.SOLUTION_PRESENT or prob.status in FINAL_STATUS:
+                break
+        if len(attempts) == 0 and deadline is not None and deadline <= time.perf_counter():
+            raise cvxpy.error.SolverError("The time limit was used up before a solver was started.")
+        if len(attempts) == 0:
+            raise cvxpy.error.SolverError("None of the solvers {} is installed.".format((self.solver,) + self.fallback))
+        if attempts[-1]['status'] == 'error':
+            raise cvxpy.error.SolverError("Every solver of the chain failed, the last error was: {}".format(error))
+        return result, solve_stats(prob, attempts)
+
+
+#statistics of the last attempt of a solve, with the attempts before it
+def solve_stats(prob, attempts):
+    stats = dict(attempts[-1])
+    stats['objective'] = prob.value
+    solver_stats = prob.solver_stats
+    if solver_stats is not None:
+        stats['solve_time'] = solver_stats.solve_time
+        stats['setup_time'] = solver_stats.setup_time
+        stats['num_iters'] = solver_stats.num_iters
+    stats['compilation_time'] = prob.compilation_time
+    stats['attempts'] = attempts
+    return stats
@@ -0,0 +1,78 @@
+'''
+State handed from one horizon of a receding horizon to the next.
+DispatchState: output and on/off status of every unit and state of charge
+    of every storage, sized from the plant definition and kept in memory,
+    so the next horizon takes its initial conditions from the last solve
+    instead of reading them back from the results written to disk.
+initial_state: DispatchState of the units and storage of a DispatchModel.
+'''
+
+import numpy as np
+
+
+UNITS = ('turbine', 'dieselgen', 'boiler', 'chiller')
+STORAGE = ('e_storage', 'h_storage', 'c_storage')
+#variable group of the output and of the piecewise on/off states of each unit kind
+OUTPUT_GROUP = {'turbine': 'turbine_xp', 'dieselgen': 'dieselgen_xp', 'boiler': 'boiler_x', 'chiller': 'chiller_x'}
+STATUS_GROUP = {'turbine': 'turbine_s_k', 'dieselgen': 'dieselgen_s_k', 'boiler': 'boiler_s_k', 'chiller': 'chiller_s_k'}
+
+
+class DispatchState(object):
+    '''Unit outputs, on/off status and storage states of one hour.
+
+    The arguments are the component lists of each kind (turbine_para,
+    diesel_para, ...). Units start at output_fraction of their size and
+    storage at state_of_charge of its size.
+
+    ATTRIBUTES:
+    output      unit kind -> output of each unit
+    status      unit kind -> True for each unit that is on
+    storage     storage kind -> state of charge of each storage
+    '''
+
+    def __init__(self, turbine=(), dieselgen=(), boiler=(), chiller=(), e_storage=(), h_storage=(), c_storage=(), output_fraction=0.0, state_of_charge=0.5):
+        units = dict(zip(UNITS, (turbine, dieselgen, boiler, chiller)))
+        storage = dict(zip(STORAGE, (e_storage, h_storage, c_storage)))
+        self.output = dict((kind, np.array([output_fraction*gen.size for gen in para], dtype=float)) for kind, para in units.items())
+        self.status = dict((kind, self.output[kind] > 0) for kind in UNITS)
+        self.storage = dict((kind, np.array([state_of_charge*s.size for s in para], dtype=float)) for kind, para in storage.items())
+
+    #new values by kind, kinds that are left out keep their values
+    def update(self, output=None, status=None, storage=None):
+        for values, new_values in ((self.output, output), (self.status, status), (self.storage, storage)):
+            for kind, value in (new_values or {}).items():
+                values[kind] = np.asarray(value).reshape(values[kind].shape).astype(values[kind].dtype)
+
+    #state at one hour of a DispatchModel.extract solution, a unit is on if
+    #any of its piecewise sections is. Unsolved groups are skipped
+    def update_from_solution(self, solution, hour=0):
+        output, status, storage = {}, {}, {}
+        for kind in UNITS:
+            if solution.get(OUTPUT_GROUP[kind]) is not None:
+                output[kind] = np.asarray(solution[OUTPUT_GROUP[kind]])[:, hour]
+            if solution.get(STATUS_GROUP[kind]) is not None:
+                status[kind] = np.any(np.nan_to_num(solution[STATUS_GROUP[kind]][:, hour]) > 0.5, axis=-1)
+        for kind in STORAGE:
+            if solution.get(kind + '_state') is not None:
+                storage[kind] = np.asarray(solution[kind + '_state'])[:, hour]
+        self.update(output, status, storage)
+
+    #keyword arguments of DispatchModel.set_initial_conditions
+    def initial_conditions(self):
+        initial = dict((kind, self.output[kind].copy()) for kind in UNITS)
+        initial.update((kind, self.storage[kind].copy()) for kind in STORAGE)
+        return initial
+
+    def copy(self):
+        state = DispatchState()
+        state.output = dict((kind, value.copy()) for kind, value in self.output.items())
+        state.status = dict((kind, value.copy()) for kind, value in self.status.items())
+        state.storage = dict((kind, value.copy()) for kind, value in self.storage.items())
+        return state
+
+
+#state of the units and storage of a DispatchModel, with its default
+#initial conditions: units off and storage half full
+def initial_state(model, output_fraction=0.0, state_of_charge=0.5):
+    return DispatchState(model.turbine_para, model.diesel_para, model.boiler_para, model.chiller_para,
+                         model.e_storage_para, model.h_storage_para, model.c_storage_para, output_fraction, state_of_charge)
@@ -0,0 +1,62 @@
+'''
+Time steps of a dispatch horizon that need not all be one hour long.
+step_hours: lengths in hours of the steps of a horizon, constant or fine
+    for the first steps and growing after them, as set by the resolution
+    and t_spacing of Optimoptions.
+plant_steps: step_hours from the Optimoptions of a plant.
+step_starts: start date of every step.
+step_mean: (... x hours) hourly values averaged over each step.
+ramp_hours: hours between the middles of consecutive steps, the time a
+    unit has to ramp from the output of one step to the next.
+'''
+
+import datetime
+
+import numpy as np
+
+
+SPACINGS = ('constant', 'linear', 'logarithm', 'manual')
+
+
+#steps covering horizon hours. constant steps are resolution long, linear
+#and logarithm steps are resolution long for fine_steps steps and then grow
+#by resolution or double at every step. manual gives the end of every step
+#in hours from the start. The last step is cut at the horizon
+def step_hours(horizon=24, resolution=1, t_spacing='constant', fine_steps=0, manual=None):
+    if t_spacing not in SPACINGS:
+        raise ValueError("unknown t_spacing {}, use one of {}".format(t_spacing, SPACINGS))
+    if t_spacing == 'manual':
+        steps = np.diff(np.concatenate(([0.0], np.asarray(manual, dtype=float))))
+        if np.any(steps <= 0):
+            raise ValueError("manual step ends must be increasing and after the start")
+        return steps
+    steps = []
+    length = float(resolution)
+    while sum(steps) < horizon:
+        steps.append(min(length, horizon - sum(steps)))
+        if t_spacing == 'linear' and len(steps) >= fine_steps:
+            length = length + resolution
+        elif t_spacing == 'logarithm' and len(steps) >= fine_steps:
+            length = 2*length
+    return np.array(steps, dtype=float)
+
+#steps of the horizon, resolution and t_spacing of a plant's Optimoptions,
+#with threshold_steps fine steps and manual step ends from manual_t0
+def plant_steps(optimoptions):
+    return step_hours(getattr(optimoptions, 'horizon', 24), getattr(optimoptions, 'resolution', 1),
+                      getattr(optimoptions, 't_spacing', 'constant'), getattr(optimoptions, 'threshold_steps', 0),
+                      getattr(optimoptions, 'manual_t0', None))
+
+def step_starts(start_date, dt):
+    offsets = np.concatenate(([0.0], np.cumsum(dt)[:-1]))
+    return [start_date + datetime.timedelta(hours=float(h)) for h in offsets]
+
+#mean over the hours of each step along the last axis, steps are whole hours
+def step_mean(values, dt):
+    starts = np.concatenate(([0], np.cumsum(dt)[:-1])).astype(int)
+    return np.add.reduceat(values, starts, axis=-1)/np.asarray(dt, dtype=float)
+
+#ramp time between steps t-1 and t, for t = 1 .. T-1
+def ramp_hours(dt):
+    dt = np.asarray(dt, dtype=float)
+    return (dt[:-1] + dt[1:])/2
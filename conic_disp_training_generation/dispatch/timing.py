@@ -0,0 +1,125 @@
+'''
+Timing of the phases of building and solving a dispatch model.
+PhaseTimer: wall time, call count and peak memory of named phases, with
+    laps for the constraint families built one after the other, and one
+    machine-readable record per horizon written as a line of JSON.
+'''
+
+import json
+import time
+import functools
+import contextlib
+import tracemalloc
+
+
+class PhaseTimer(object):
+    '''Accumulates wall time, calls and peak memory per phase name.
+
+    Phases nest, "build/constraints/heat_balance" is a lap inside
+    "build/constraints" inside "build". Peak memory is the peak of the
+    memory traced by tracemalloc above the memory in use when the phase
+    started, and is only measured if trace_memory is set.
+
+    ATTRIBUTES:
+    phases          name -> {'time', 'calls', 'peak_memory'}
+    trace_memory
+    '''
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.phases = {}
+        self._stack = []
+        self._mark = None
+
+    def _memory(self):
+        if not self.trace_memory:
+            return 0, 0
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return tracemalloc.get_traced_memory()
+
+    #the peak so far is handed to the enclosing phase before it is reset
+    def _reset_peak(self, peak):
+        if self._stack:
+            self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+
+    def add(self, name, seconds, peak_memory=0, calls=1):
+        phase = self.phases.setdefault(name, {'time': 0.0, 'calls': 0, 'peak_memory': 0})
+        phase['time'] += seconds
+        phase['calls'] += calls
+        phase['peak_memory'] = max(phase['peak_memory'], int(peak_memory))
+
+    #nested phase names are joined with "/"
+    def full_name(self, name):
+        if self._stack:
+            return self._stack[-1]['name'] + "/" + name
+        return name
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        current, peak = self._memory()
+        self._reset_peak(peak)
+        frame = {'name': self.full_name(name), 'start_memory': current, 'peak': current}
+        self._stack.append(frame)
+        tic = time.perf_counter()
+        try:
+            yield frame
+        finally:
+            toc = time.perf_counter() - tic
+            self._stack.pop()
+            _, peak = self._memory()
+            peak = max(peak, frame['peak'])
+            #the peak seen by a nested phase is also a peak of its parent
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            self.add(frame['name'], toc, peak - frame['start_memory'])
+
+    #laps split the current phase into consecutive parts, each lap is timed
+    #from the previous lap or from mark
+    def mark(self):
+        current, peak = self._memory()
+        self._reset_peak(peak)
+        self._mark = (time.perf_counter(), current)
+
+    def lap(self, name):
+        if self._mark is None:
+            self.mark()
+        tic, start_memory = self._mark
+        _, peak = self._memory()
+        self.add(self.full_name(name), time.perf_counter() - tic, peak - start_memory)
+        self.mark()
+
+    #record of the phases since the last reset, with any extra fields
+    #(start date, horizon length, objective) added at the top level
+    def record(self, reset=True, **fields):
+        record = dict(fields)
+        record['phases'] = dict((name, dict(phase)) for name, phase in self.phases.items())
+        if reset:
+            self.phases = {}
+        return record
+
+    #one JSON line per record
+    def write(self, file_name, record):
+        with open(file_name, 'a') as file_object:
+            file_object.write(json.dumps(record, default=str) + '\n')
+
+    #phases sorted by time, to print
+    def report(self, record=None):
+        phases = self.phases if record is None else record['phases']
+        lines = ['{:<60s} {:>10s} {:>6s} {:>12s}'.format('phase', 'time [s]', 'calls', 'peak [kB]')]
+        for name, phase in sorted(phases.items(), key=lambda item: -item[1]['time']):
+            lines.append('{:<60s} {:>10.4f} {:>6d} {:>12.1f}'.format(name, phase['time'], phase['calls'], phase['peak_memory']/1024))
+        return '\n'.join(lines)
+
+
+#method decorator that times every call as a phase of self.timer
+def timed(name):
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.timer.phase(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
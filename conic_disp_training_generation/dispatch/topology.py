@@ -0,0 +1,137 @@
+'''
+Index of the network topology, built once from plant.network.
+CarrierTopology: nodes, lines and incidence matrix of one energy carrier
+    (electrical, district_heat or district_cooling).
+NetworkTopology: node name lookup, equipment-to-node maps and one
+    CarrierTopology per carrier.
+'''
+
+import numpy as np
+import scipy.sparse as sp
+
+
+CARRIERS = ('electrical', 'district_heat', 'district_cooling')
+
+
+class CarrierTopology(object):
+    '''Lines of one carrier. Each node owns one line per entry of its
+    connections list, numbered contiguously in node order, so line l runs
+    from node line_from[l] to node line_to[l].
+
+    ATTRIBUTES:
+    carrier
+    n_nodes
+    nodes            nodes with at least one connection
+    neighbors        connected nodes of each node, in node order
+    lines_by_node    lines leaving each node, in connection order
+    line_from
+    line_to          -1 if the connection is not a node of the network
+    line_index       (from node, to node) -> line
+    reverse          line running the other way, -1 if there is none
+    n_lines
+    '''
+
+    def __init__(self, network, carrier, node_index):
+        self.carrier = carrier
+        self.n_nodes = n_nodes = len(network)
+        connections = [list(getattr(node, carrier).connections) for node in network]
+
+        self.nodes = [m for m in range(n_nodes) if len(connections[m]) > 0]
+        connected = [set(c) for c in connections]
+        self.neighbors = [[i for i in range(n_nodes) if network[i].name in connected[m]] for m in range(n_nodes)]
+
+        self.lines_by_node = []
+        line_from = []
+        line_to = []
+        for m in range(n_nodes):
+            self.lines_by_node.append(list(range(len(line_from), len(line_from) + len(connections[m]))))
+            for name in connections[m]:
+                line_from.append(m)
+                line_to.append(node_index.get(name, -1))
+        self.line_from = np.array(line_from, dtype=int)
+        self.line_to = np.array(line_to, dtype=int)
+        self.n_lines = len(line_from)
+
+        self.line_index = {}
+        for l in range(self.n_lines):
+            self.line_index.setdefault((line_from[l], line_to[l]), l)
+        self.reverse = np.array([self.line_index.get((line_to[l], line_from[l]), -1) for l in range(self.n_lines)], dtype=int)
+
+    #(nodes x lines) matrix, +1 where a line leaves a node and -1 where it arrives
+    def incidence(self):
+        lines = np.arange(self.n_lines)
+        to = self.line_to >= 0
+        rows = np.concatenate((self.line_from, self.line_to[to]))
+        cols = np.concatenate((lines, lines[to]))
+        data = np.concatenate((np.ones(self.n_lines), -np.ones(int(to.sum()))))
+        return sp.csr_matrix((data, (rows, cols)), shape=(self.n_nodes, self.n_lines))
+
+    #(nodes x lines) matrix with +1 where a line leaves a node
+    def outgoing(self):
+        return self.loss_matrix(np.ones(self.n_lines))
+
+    #(nodes x lines) matrix with the coefficient of each line at the node it leaves
+    def loss_matrix(self, coefficients):
+        coefficients = np.asarray(coefficients, dtype=float)
+        return sp.csr_matrix((coefficients, (self.line_from, np.arange(self.n_lines))), shape=(self.n_nodes, self.n_lines))
+
+    #per-line coefficients from a (nodes x nodes) table, the entry of the
+    #node a line leaves and the node it runs to. Lines that end outside the
+    #network get 0
+    def line_coefficients(self, node_table):
+        coefficients = np.zeros(self.n_lines)
+        for l in range(self.n_lines):
+            if self.line_to[l] >= 0:
+                coefficients[l] = node_table[self.line_from[l], self.line_to[l]]
+        return coefficients
+
+
+class NetworkTopology(object):
+    '''Topology of plant.network indexed once for the constraint builders.
+
+    ATTRIBUTES:
+    node_names
+    node_index        node name -> node
+    equipment_nodes   equipment name -> nodes holding it
+    n_nodes
+    electrical
+    district_heat
+    district_cooling
+    '''
+
+    def __init__(self, network):
+        self.node_names = [node.name for node in network]
+        self.node_index = dict((name, i) for i, name in enumerate(self.node_names))
+        self.n_nodes = len(network)
+        self.equipment_nodes = {}
+        for m, node in enumerate(network):
+            for equip in node.equipment:
+                nodes = self.equipment_nodes.setdefault(equip.name, [])
+                if m not in nodes:
+                    nodes.append(m)
+        for carrier in CARRIERS:
+            setattr(self, carrier, CarrierTopology(network, carrier, self.node_index))
+
+    def carrier(self, carrier):
+        return getattr(self, carrier)
+
+    #list of lists of indexes of the components at each node
+    def components_by_node(self, comp_list):
+        comp_by_node = [[] for m in range(self.n_nodes)]
+        for i, comp in enumerate(comp_list):
+            for m in self.equipment_nodes.get(comp.name, []):
+                comp_by_node[m].append(i)
+        return comp_by_node
+
+    #(nodes x components) matrix with a 1 where a component sits at a node
+    def component_incidence(self, comp_list):
+        rows = []
+        cols = []
+        for i, comp in enumerate(comp_list):
+            for m in self.equipment_nodes.get(comp.name, []):
+                rows.append(m)
+                cols.append(i)
+        return sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(self.n_nodes, len(comp_list)))
+
+    def incidence(self, carrier):
+        return self.carrier(carrier).incidence()
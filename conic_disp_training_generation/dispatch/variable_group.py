@@ -0,0 +1,319 @@
+'''
+Defines the variable groups used to build the conic dispatch problem.
+IndexedGroup: lookup of grouped items by key, with one RANGE entry.
+VariableGroup: a group with one cvxpy Variable per (component, hour).
+MatrixVariableGroup: a group of variables indexed by (component, hour)
+    that is backed by a single cvxpy Variable.
+Both groups can shift the values of the last solve to the next horizon of a
+receding horizon, as a warm start, and return them as one array.
+'''
+
+import itertools
+
+import numpy as np
+import cvxpy
+
+
+# variable to indicate that we want all variables that match a pattern
+# one item in the tuple key can be RANGE
+RANGE = -1
+
+
+def constant(x):
+    def _constant(*args, **kwargs):
+        return x
+    return _constant
+
+constant_zero = constant(0)
+
+def binary_var(var_name):
+    return cvxpy.Variable(name=var_name, boolean=True)
+
+#values moved hours earlier along axis, the last entry fills the end
+def shift_hours(values, hours=1, axis=-1):
+    values = np.asarray(values)
+    n = values.shape[axis]
+    return np.take(values, np.minimum(np.arange(n) + hours, n - 1), axis=axis)
+
+#values stored one block per index (in itertools.product order) as an array
+#of the index shape, with a last axis for the pieces of groups that have
+#piecewise sections. Components with fewer pieces than the others are
+#padded with NaN
+def piece_array(values, pieces, shape):
+    pieces = np.asarray(pieces, dtype=int).ravel()
+    n_pieces = int(pieces.max()) if len(pieces) > 0 else 1
+    if n_pieces == 1 and np.all(pieces == 1):
+        return np.reshape(values, shape)
+    offsets = np.concatenate(([0], np.cumsum(pieces)))[:-1]
+    section = np.arange(n_pieces)
+    mask = section[None, :] < pieces[:, None]
+    array = np.full((len(pieces), n_pieces), np.nan)
+    array[mask] = np.asarray(values, dtype=float)[(offsets[:, None] + section[None, :])[mask]]
+    return array.reshape(tuple(shape) + (n_pieces,))
+
+
+class IndexedGroup(object):
+    '''Parent class for groups that store their items in a dictionary.
+
+    Children fill self.variables with one item per index tuple (in
+    itertools.product order) and then call build_index. RANGE lookups
+    are answered from per-axis indexes instead of scanning every key.
+
+    ATTRIBUTES:
+    variables
+    ranges
+    '''
+
+    def build_index(self):
+        #for every axis, map the key without that axis to the items
+        #along it, sorted by the axis value
+        self.ranges = {}
+        n_axes = max([len(k) for k in self.variables.keys()] + [0])
+        for position in range(n_axes):
+            self.ranges[(position, n_axes)] = self.axis_index(position, n_axes)
+
+    def axis_index(self, position, length):
+        index = {}
+        for k in self.variables.keys():
+            rest = k[:position] + k[position+1:length]
+            index.setdefault(rest, []).append(k)
+        for rest, keys in index.items():
+            keys.sort(key=lambda k: k[position])
+            index[rest] = [self.variables[k] for k in keys]
+        return index
+
+    #internal function to find variables associated with your key
+    def match(self, key):
+        position = key.index(RANGE)
+        if (position, len(key)) not in self.ranges:
+            #keys shorter than the group leave the last axes free
+            self.ranges[(position, len(key))] = self.axis_index(position, len(key))
+        rest = key[:position] + key[position+1:]
+        return list(self.ranges[(position, len(key))].get(rest, []))
+
+    #variable function to get the variables associated with the key
+    def __getitem__(self, key):
+        if type(key) != tuple:
+            key = (key,)
+
+        n_range = key.count(RANGE)
+
+        if n_range == 0:
+            return self.variables[key]
+        elif n_range == 1:
+            return self.match(key)
+        else:
+            raise ValueError("Can only get RANGE for one index.")
+
+    #move the values of the last solve hours earlier along the last axis,
+    #which is the hour, so they start the next horizon. Values are projected
+    #on the domain of each variable, binaries are rounded
+    def shift(self, hours=1):
+        n_axes = max([len(k) for k in self.variables.keys()] + [0])
+        if n_axes == 0:
+            return
+        for variables in self.ranges[(n_axes-1, n_axes)].values():
+            values = [var.value for var in variables]
+            if any(value is None for value in values):
+                continue
+            for var, i in zip(variables, shift_hours(np.arange(len(variables)), hours)):
+                var.value = var.project(values[i])
+
+    #solution of the group as an array, see piece_array, None if unsolved
+    def array(self):
+        if len(self.variables) == 0:
+            return None
+        values = [var.value for var in self.variables.values()]
+        if any(value is None for value in values):
+            return None
+        keys = list(self.variables.keys())
+        shape = tuple(len(set(k[i] for k in keys)) for i in range(len(keys[0])))
+        pieces = [int(np.size(value)) for value in values]
+        return piece_array(np.concatenate([np.ravel(value) for value in values]), pieces, shape)
+
+
+#  all network objects create a group of variables associated with that object
+class VariableGroup(IndexedGroup):
+    '''Group with a separate cvxpy Variable for each index.
+
+    ATTRIBUTES:
+    name
+    variables
+    names
+    '''
+
+    def __init__(self, name, indexes=(), is_binary_var=False, lower_bound_func=None, upper_bound_func=None, T=None, pieces=[1]):
+        self.name = name
+        self.variables = {}
+        self.names = []
+
+        name_base = name
+        #if it is a piecewise function, make the variable group be a group of arrays (1,KK)
+        if pieces==[1]:
+            pieces = [1 for i in indexes[0]]
+
+        #create name base string
+        for _ in range(len(indexes)):
+            name_base += "_{}"
+
+        #create variable for each timestep and each component with a corresponding name
+        for index in itertools.product(*indexes):
+            var_name = name_base.format(*index)
+
+            if is_binary_var:
+                var = binary_var(var_name)
+            else:
+                #assign upper and lower bounds for the variable
+                if lower_bound_func is not None:
+                    lower_bound = lower_bound_func(index)
+                else:
+                    lower_bound = None
+
+                if upper_bound_func is not None:
+                    upper_bound = upper_bound_func(index)
+                else:
+                    upper_bound = None
+
+                #the lower bound should always be set if the upper bound is set
+                if lower_bound is None and upper_bound is not None:
+                    raise RuntimeError("Lower bound should not be unset while upper bound is set")
+
+                #create the cp variable
+                if lower_bound_func == constant_zero:
+                    var = cvxpy.Variable(pieces[index[0]], name=var_name, nonneg=True)
+                else:
+                    var = cvxpy.Variable(pieces[index[0]], name=var_name)
+
+            self.variables[index] = var
+            self.names.append(var_name)
+
+        self.build_index()
+
+
+class MatrixVariableGroup(object):
+    '''Group of variables stored in one cvxpy Variable.
+
+    Every index of the group (e.g. component, hour) owns a contiguous
+    block of the variable that is as long as the number of piecewise
+    sections of that component. Items are returned as slices of the
+    single variable, so cvxpy only has to canonicalize one variable per
+    group instead of one per (component, hour).
+
+    ATTRIBUTES:
+    name
+    indexes
+    shape
+    pieces
+    offsets
+    variable
+    '''
+
+    def __init__(self, name, indexes=(), is_binary_var=False, lower_bound_func=None, upper_bound_func=None, T=None, pieces=[1]):
+        self.name = name
+        self.indexes = [list(axis) for axis in indexes]
+        self.shape = tuple(len(axis) for axis in self.indexes)
+        # position of each index value along its axis
+        self.positions = [dict((x, i) for i, x in enumerate(axis)) for axis in self.indexes]
+
+        #if it is a piecewise function, each index holds an array (1,KK)
+        if pieces == [1]:
+            pieces = [1 for i in self.indexes[0]]
+        #binary variables get one state per piecewise section, like the
+        #continuous outputs they switch
+        n_pieces = np.array([pieces[index[0]] for index in itertools.product(*self.indexes)], dtype=int)
+        self.pieces = n_pieces.reshape(self.shape)
+        self.offsets = np.concatenate(([0], np.cumsum(n_pieces)))
+
+        #the lower bound should always be set if the upper bound is set
+        if lower_bound_func is None and upper_bound_func is not None:
+            raise RuntimeError("Lower bound should not be unset while upper bound is set")
+
+        size = int(self.offsets[-1])
+        if is_binary_var:
+            self.variable = cvxpy.Variable(size, name=name, boolean=True)
+        elif lower_bound_func == constant_zero:
+            self.variable = cvxpy.Variable(size, name=name, nonneg=True)
+        else:
+            self.variable = cvxpy.Variable(size, name=name)
+
+    #flat position of a full key
+    def position(self, key):
+        if len(key) != len(self.shape):
+            raise KeyError(key)
+        pos = 0
+        for positions, n, x in zip(self.positions, self.shape, key):
+            pos = pos*n + positions[x]
+        return pos
+
+    #flat positions matching a key with one RANGE entry, sorted along RANGE
+    def match_positions(self, key):
+        position = key.index(RANGE)
+        select = []
+        for i, positions in enumerate(self.positions):
+            if i == position or i >= len(key):
+                select.append(slice(None))
+            else:
+                select.append(positions[key[i]])
+        grid = np.arange(int(np.prod(self.shape))).reshape(self.shape)[tuple(select)]
+        #axes before the RANGE axis that were fixed have been dropped
+        axis = position - sum(1 for s in select[:position] if not isinstance(s, slice))
+        return np.moveaxis(grid, axis, 0).ravel()
+
+    def item(self, pos):
+        return self.variable[int(self.offsets[pos]):int(self.offsets[pos+1])]
+
+    #internal function to find variables associated with your key
+    def match(self, key):
+        return [self.item(pos) for pos in self.match_positions(key)]
+
+    #single expression holding every variable that matches the key
+    def stack(self, key=(RANGE,)):
+        if type(key) != tuple:
+            key = (key,)
+        pos = self.match_positions(key)
+        flat = [np.arange(self.offsets[p], self.offsets[p+1]) for p in pos]
+        if len(flat) == 0:
+            return self.variable[0:0]
+        return self.variable[np.concatenate(flat)]
+
+    #(components x T) view of a group with one piece per index
+    def matrix(self):
+        if np.any(self.pieces != 1):
+            raise ValueError("Only groups without piecewise sections have a matrix view.")
+        return cvxpy.reshape(self.variable, self.shape, order='C')
+
+    #move the values of the last solve hours earlier along the last axis,
+    #which is the hour, so they start the next horizon. Values are projected
+    #on the domain of the variable, binaries are rounded
+    def shift(self, hours=1):
+        value = self.variable.value
+        if value is None:
+            return
+        grid = shift_hours(np.arange(int(np.prod(self.shape))).reshape(self.shape), hours)
+        flat = [np.arange(self.offsets[p], self.offsets[p+1]) for p in grid.ravel()]
+        if len(flat) > 0:
+            self.variable.value = self.variable.project(value[np.concatenate(flat)])
+
+    #solution of the group as an array, see piece_array, None if unsolved
+    def array(self):
+        if self.variable.value is None:
+            return None
+        return piece_array(self.variable.value, self.pieces, self.shape)
+
+    #name the legacy per-index variable would have had
+    def var_name(self, index):
+        return (self.name + "_{}"*len(index)).format(*index)
+
+    #variable function to get the variables associated with the key
+    def __getitem__(self, key):
+        if type(key) != tuple:
+            key = (key,)
+
+        n_range = key.count(RANGE)
+
+        if n_range == 0:
+            return self.item(self.position(key))
+        elif n_range == 1:
+            return self.match(key)
+        else:
+            raise ValueError("Can only get RANGE for one index.")
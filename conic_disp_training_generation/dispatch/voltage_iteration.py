@@ -0,0 +1,145 @@
+'''
+Fixed point iteration of the voltage guesses of the AC network relaxation.
+VoltageIteration: solves a compiled problem repeatedly, changing only the
+    value of its (nodes x T) voltage guess Parameter x_n, until the solved
+    squared voltages x_m agree with the guesses. The next guess is a damped
+    Anderson or secant extrapolation of the previous iterations, computed
+    on the whole nodes x T array at once, instead of the plain update
+    x_n = x_m. Every iteration is recorded with its voltage error.
+'''
+
+import time
+
+import numpy as np
+
+
+METHODS = ('anderson', 'secant', 'plain')
+
+
+class VoltageIteration(object):
+    '''Accelerated fixed point iteration x_n -> x_m(x_n) of the voltage guesses.
+
+    The problem is not rebuilt or recompiled between iterations, only
+    x_n.value is set before each solve. solve() runs the solve and returns
+    the (nodes x T) values of x_m, or None if there is no solution.
+    Guesses are kept within [lower, upper], the squared voltage limits.
+
+    damping is the fraction of the new residual taken in a step (1 is the
+    undamped update). anderson mixes the last memory iterations, secant
+    extrapolates every node and hour from its own last two iterations. A
+    step that makes the largest error grow is replaced by a damped plain
+    step and the history is dropped.
+
+    ATTRIBUTES:
+    method
+    tolerance       largest |x_m - x_n| accepted as converged
+    max_iters
+    damping
+    memory          iterations mixed by anderson
+    lower
+    upper
+    history         one dictionary per iteration of the last run
+    converged
+    '''
+
+    def __init__(self, method='anderson', tolerance=0.005, max_iters=20, damping=0.7, memory=3, lower=None, upper=None, verbose=False):
+        if method not in METHODS:
+            raise ValueError("unknown voltage iteration method {}, use one of {}".format(method, METHODS))
+        self.method = method
+        self.tolerance = tolerance
+        self.max_iters = max_iters
+        self.damping = damping
+        self.memory = memory
+        self.lower = lower
+        self.upper = upper
+        self.verbose = verbose
+        self.history = []
+        self.converged = False
+        self.reset()
+
+    #forget the iterations of the last run
+    def reset(self):
+        self._x = []
+        self._f = []
+
+    def clip(self, x):
+        if self.lower is None and self.upper is None:
+            return x
+        return np.clip(x, self.lower, self.upper)
+
+    #next guess from the last guess x and the solved values g = x_m(x)
+    def update(self, x, g):
+        x = np.asarray(x, dtype=float)
+        f = np.asarray(g, dtype=float) - x
+        step = self.method
+        if len(self._f) > 0 and np.max(np.abs(f)) > np.max(np.abs(self._f[-1])):
+            self.reset()
+            step = 'restart'
+        self._x.append(x.ravel())
+        self._f.append(f.ravel())
+        del self._x[:-(self.memory + 1)], self._f[:-(self.memory + 1)]
+        if len(self._f) == 1 and step != 'restart':
+            step = 'plain'
+        if step in ('plain', 'restart'):
+            x_next = x + self.damping*f
+        elif step == 'secant':
+            x_next = self._secant(x, f)
+        else:
+            x_next = self._anderson(x, f)
+        return self.clip(x_next.reshape(x.shape)), f, step
+
+    #elementwise secant step on the residual, plain step where the last
+    #two residuals of a node and hour are equal
+    def _secant(self, x, f):
+        dx = self._x[-1] - self._x[-2]
+        df = self._f[-1] - self._f[-2]
+        slope = np.divide(dx, df, out=np.zeros_like(df), where=np.abs(df) > 1e-12)
+        delta = np.where(np.abs(df) > 1e-12, -f.ravel()*slope, f.ravel())
+        return x + self.damping*delta.reshape(x.shape)
+
+    #damped Anderson mixing of the last iterations (Walker and Ni, 2011)
+    def _anderson(self, x, f):
+        dx = np.diff(np.array(self._x), axis=0).T
+        df = np.diff(np.array(self._f), axis=0).T
+        gamma = np.linalg.lstsq(df, f.ravel(), rcond=None)[0]
+        x_next = x.ravel() - dx @ gamma + self.damping*(f.ravel() - df @ gamma)
+        return x_next.reshape(x.shape)
+
+    #iterate from x0 until the largest voltage error is within tolerance or
+    #max_iters solves were made. x_n is the cvxpy Parameter of the guesses.
+    #Returns the last guess solved with, whose solution is left in the problem
+    def run(self, x_n, solve, x0):
+        self.reset()
+        self.history = []
+        self.converged = False
+        x = self.clip(np.array(x0, dtype=float))
+        for iteration in range(1, self.max_iters + 1):
+            x_n.value = x
+            tic = time.perf_counter()
+            g = solve()
+            solve_time = time.perf_counter() - tic
+            if g is None:
+                self.history.append({'iteration': iteration, 'status': 'no solution', 'solve_time': solve_time})
+                self.report_iteration()
+                break
+            x_next, f, step = self.update(x, g)
+            error = np.abs(f)
+            self.converged = bool(np.max(error) <= self.tolerance)
+            self.history.append({'iteration': iteration, 'status': 'converged' if self.converged else step,
+                                 'max_error': float(np.max(error)), 'rms_error': float(np.sqrt(np.mean(f**2))),
+                                 'within_tolerance': float(np.mean(error <= self.tolerance)), 'solve_time': solve_time})
+            self.report_iteration()
+            if self.converged:
+                break
+            x = x_next
+        return x
+
+    def report_iteration(self):
+        if not self.verbose:
+            return
+        entry = self.history[-1]
+        if 'max_error' not in entry:
+            print('voltage iteration {:>3d}: {}'.format(entry['iteration'], entry['status']))
+            return
+        print('voltage iteration {:>3d}: max error {:.5f}, rms error {:.5f}, {:.1%} within tolerance, {} ({:.2f} s)'.format(
+            entry['iteration'], entry['max_error'], entry['rms_error'], entry['within_tolerance'], entry['status'], entry['solve_time']))
@@ -0,0 +1,91 @@
+'''
+Cached float arrays of the sheets of the demand and dispatch workbooks.
+sheet_array: (rows x columns) float array of an xlrd sheet, read a column
+    at a time with col_values. Cells that are not numbers, dates or
+    booleans (headers, text and empty cells) are NaN, so sheet[row, col] is
+    the cell_value of a numeric cell.
+read_workbook: arrays of every sheet of a workbook, parsed with xlrd.
+load_workbook: arrays of every sheet of a workbook from its .npz cache
+    file. The workbook is parsed once and the cache is written again when
+    the SHA-256 of the workbook differs from the one it was written from,
+    so later runs load arrays instead of parsing the xlsx.
+
+run from conic_disp_training_generation to convert workbooks ahead of time:
+    python -m dispatch.workbook_cache workbook [workbook ...]
+'''
+
+import os
+import sys
+import hashlib
+import tempfile
+
+import numpy as np
+import xlrd
+
+
+#cell types that have a float cell_value
+NUMERIC_CELLS = (xlrd.XL_CELL_NUMBER, xlrd.XL_CELL_DATE, xlrd.XL_CELL_BOOLEAN)
+
+
+def file_digest(file_name):
+    digest = hashlib.sha256()
+    with open(file_name, 'rb') as file_object:
+        for block in iter(lambda: file_object.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def sheet_array(sheet):
+    array = np.full((sheet.nrows, sheet.ncols), np.nan)
+    for col in range(sheet.ncols):
+        numeric = np.isin(sheet.col_types(col), NUMERIC_CELLS)
+        values = np.array(sheet.col_values(col), dtype=object)
+        array[numeric, col] = values[numeric].astype(float)
+    return array
+
+def read_workbook(file_name):
+    wb = xlrd.open_workbook(file_name)
+    return [sheet_array(wb.sheet_by_index(i)) for i in range(wb.nsheets)]
+
+#cache file of a workbook, next to it unless cache_dir is given
+def cache_file(file_name, cache_dir=None):
+    directory = os.path.dirname(file_name) if cache_dir is None else cache_dir
+    return os.path.join(directory, os.path.basename(file_name) + '.npz')
+
+#sheets of the cache file written from a workbook of digest, None if there
+#is no such file or it was written from another version of the workbook
+def load_cache(path, digest):
+    if not os.path.isfile(path):
+        return None
+    with np.load(path) as cache:
+        if str(cache['digest']) != digest:
+            return None
+        return [cache['sheet_{}'.format(i)] for i in range(int(cache['nsheets']))]
+
+#written to a temporary file first, so a script running at the same time
+#never reads a partial cache
+def store_cache(path, digest, sheets):
+    directory = os.path.dirname(path) or '.'
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    handle, temp_file = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(path), dir=directory)
+    with os.fdopen(handle, 'wb') as file_object:
+        np.savez(file_object, digest=np.array(digest), nsheets=np.array(len(sheets)),
+                 **dict(('sheet_{}'.format(i), sheet) for i, sheet in enumerate(sheets)))
+    os.replace(temp_file, path)
+
+#list of the (rows x columns) arrays of the sheets of a workbook, in the
+#order of xlrd's sheet_by_index
+def load_workbook(file_name, cache_dir=None):
+    path = cache_file(file_name, cache_dir)
+    digest = file_digest(file_name)
+    sheets = load_cache(path, digest)
+    if sheets is None:
+        sheets = read_workbook(file_name)
+        store_cache(path, digest, sheets)
+    return sheets
+
+
+if __name__ == '__main__':
+    for file_name in sys.argv[1:]:
+        sheets = load_workbook(file_name)
+        print('{}: {}'.format(cache_file(file_name), ', '.join('{} x {}'.format(*sheet.shape) for sheet in sheets)))
@@ -1,30 +1,21 @@
 import os
 import pickle
-import xlrd
 #os.chdir('C:/Users/MME-Admin/Documents/Github/EAGERS_py')
 import numpy as np
 from class_definition.test_data import (TestData,Demand,Weather)
 from instance.create_timestamp import create_timestamp
+from dispatch.workbook_cache import load_workbook
 
 def load_demand():
     testdata = TestData()
 
-    wb = xlrd.open_workbook('instance\wsu_campus_2009_2012_irrad_fix.xlsx')
-    dem_sheet = wb.sheet_by_index(0)
-    weather_sheet = wb.sheet_by_index(1)
-    e = []
-    h = []
-    c = []
-
-    tdb = []#dry bulb temp
-    irrad_dire_norm = []#direct normal irradiation
-    for i in range(1,83825):
-        e.append(dem_sheet.cell_value(i,0))
-        h.append(dem_sheet.cell_value(i,1))
-        c.append(dem_sheet.cell_value(i,2))
-
-        tdb.append(weather_sheet.cell_value(i,0))
-        irrad_dire_norm.append(weather_sheet.cell_value(i,1))
+    dem_sheet, weather_sheet = load_workbook('instance\wsu_campus_2009_2012_irrad_fix.xlsx')[:2]
+    e = dem_sheet[1:83825,0]
+    h = dem_sheet[1:83825,1]
+    c = dem_sheet[1:83825,2]
+
+    tdb = weather_sheet[1:83825,0]#dry bulb temp
+    irrad_dire_norm = weather_sheet[1:83825,1]#direct normal irradiation
 
     #heat has way more nans, so remove them
     h = h[:37810]
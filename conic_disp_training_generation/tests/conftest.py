@@ -0,0 +1,10 @@
+'''
+The packages are imported as the scripts import them, with
+conic_disp_training_generation on the path.
+run from conic_disp_training_generation: python -m pytest tests
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,113 @@
+'''
+Constraint families: legacy per-index names and the elements each family
+holds, checked through the violations of given variable values.
+'''
+
+import numpy as np
+
+from dispatch.variable_group import MatrixVariableGroup, constant_zero
+from dispatch import constraint_family as family
+
+
+def group(name, values, **kwargs):
+    values = np.asarray(values, dtype=float)
+    g = MatrixVariableGroup(name, indexes=(range(values.shape[0]), range(values.shape[1])), **kwargs)
+    g.variable.value = values.ravel()
+    return g
+
+
+def test_names_follow_the_legacy_constraints():
+    x = group("x", [[0, 0, 0], [0, 0, 0]])
+    ramp = family.ramp_up("turbine_ramp_up", x, [1, 1])
+    assert ramp.names() == ["turbine_ramp_up_0_1", "turbine_ramp_up_0_2", "turbine_ramp_up_1_1", "turbine_ramp_up_1_2"]
+    balance = family.nodal_balance("heat_balance", x.matrix(), range(3))
+    assert balance.names()[:3] == ["heat_balance_0_0", "heat_balance_0_1", "heat_balance_1_0"]
+
+def test_ramp_limits():
+    x = group("x", [[0, 2, 5, 3], [0, 1, 1, 1]])
+    assert family.ramp_up("up", x, [2, 2]).violated() == ["up_0_2"]
+    assert family.ramp_down("down", x, [1, 1]).violated() == ["down_0_3"]
+    #steps of 1, 2, 4 and 2 hours ramp over 1.5, 3 and 3 hours between them
+    assert family.ramp_up("up", x, [2, 2], [1.5, 3, 3]).violated() == []
+
+def test_generate_and_status_sum_the_pieces():
+    x = group("x", [[3, 4]])
+    x_k = MatrixVariableGroup("x_k", indexes=(range(1), range(2)), pieces=[2])
+    x_k.variable.value = np.array([1, 2, 2, 2.5])
+    assert family.generate("generate", x, x_k).violated() == ["generate_0_1"]
+    s_k = MatrixVariableGroup("s_k", indexes=(range(1), range(2)), is_binary_var=True, pieces=[2])
+    s_k.variable.value = np.array([1, 0, 1, 1])
+    assert family.status("status", s_k).violated() == ["status_0_1"]
+
+def test_piece_bounds():
+    x_k = MatrixVariableGroup("x_k", indexes=(range(1), range(1)), pieces=[2])
+    xq_k = MatrixVariableGroup("xq_k", indexes=(range(1), range(1)), pieces=[2])
+    s_k = MatrixVariableGroup("s_k", indexes=(range(1), range(1)), is_binary_var=True, pieces=[2])
+    x_k.variable.value = np.array([4, 0])
+    xq_k.variable.value = np.array([4, 0])
+    s_k.variable.value = np.array([1, 0])
+    assert family.piece_upper_bound("upper", x_k, s_k, [[5, 5]]).violated() == []
+    #4^2 + 4^2 > 5^2
+    assert family.piece_apparent_upper_bound("apparent", x_k, xq_k, s_k, [[5, 5]]).violated() == ["apparent_0_0"]
+    assert family.piece_lower_bound("lower", x_k, s_k, [[5, 0]]).violated() == ["lower_0_0"]
+
+def test_bounds():
+    x = group("x", [[0, 3], [5, 1]])
+    assert family.upper_bound("upper", x, [2, 5]).violated() == ["upper_0_1"]
+    assert family.lower_bound("lower", x, [0, 2]).violated() == ["lower_1_1"]
+
+def test_storage_balances():
+    state = group("state", [[6, 7, 5]])
+    ch = group("ch", [[1, 1, 0]], lower_bound_func=constant_zero)
+    disch = group("disch", [[0, 0, 2]], lower_bound_func=constant_zero)
+    assert family.storage_init("init", state, ch, disch, [1], [1], np.array([5])).violated() == []
+    assert family.storage_state("state", state, ch, disch, [1], [1]).violated() == []
+    disch.variable.value = np.array([0, 0, 1.])
+    assert family.storage_state("state", state, ch, disch, [1], [1]).violated() == ["state_0_2"]
+    #two hour steps charge and discharge twice as much energy
+    disch.variable.value = np.array([0, 0, 2.])
+    assert family.storage_state("state", state, ch, disch, [1], [1], [2, 2]).violated() == ["state_0_1", "state_0_2"]
+
+def test_line_current_and_voltage_cone():
+    x = group("x_m", [[1], [1], [0]])
+    y = group("y_mn", [[1], [0.5]])
+    z = group("z_mn", [[0], [0]])
+    #line 1 leaves the network and has no limits
+    line_from, line_to = np.array([0, 1]), np.array([1, -1])
+    assert family.line_current("current", x, y, line_from, line_to, [2, 2], 1).violated() == []
+    assert family.line_voltage_cone("cone", x, y, z, line_from, line_to).names() == ["cone_0_0"]
+    assert family.line_voltage_cone("cone", x, y, z, line_from, line_to).violated() == []
+    #y_mn^2 + z_mn^2 above x_m*x_n and a current of 2*(1 + 1 - 2*0)
+    y.variable.value = np.array([1.5, 0])
+    assert family.line_voltage_cone("cone", x, y, z, line_from, line_to).violated() == ["cone_0_0"]
+    y.variable.value = np.array([0, 0.])
+    assert family.line_current("current", x, y, line_from, line_to, [2, 2], 1).violated() == ["current_0_0"]
+
+def test_node_sum():
+    incidence = np.array([[1, 0], [1, 1]])
+    np.testing.assert_array_equal(family.node_sum(incidence, np.array([[1, 2], [3, 4]])), [[1, 2], [4, 6]])
+    np.testing.assert_array_equal(family.node_sum(np.zeros((2, 0)), np.zeros((0, 3))), np.zeros((2, 3)))
+
+def test_first_hour_ramps():
+    x = group("x", [[3], [1]])
+    init = np.array([1, 1])
+    assert family.ramp_first_up("up", x, [1, 1], init).violated() == ["up_0"]
+    assert family.ramp_first_down("down", x, [1, 1], init).violated() == []
+
+def test_piece_consume():
+    y = group("y", [[3, 2]])
+    x_k = MatrixVariableGroup("x_k", indexes=(range(1), range(2)), pieces=[2])
+    s_k = MatrixVariableGroup("s_k", indexes=(range(1), range(2)), is_binary_var=True, pieces=[2])
+    x_k.variable.value = np.array([2, 0, 0, 1.])
+    s_k.variable.value = np.array([1, 0, 0, 1.])
+    #|1*2| + 0*2 + 1*1 = 3 in the first hour, |2*1| + 1*1 + 0*1 = 3 in the second
+    consume = family.piece_consume("consume", y, s_k, [[1, 0]], [(x_k, [[1, 2]], [[0, 1]])])
+    assert consume.violated() == ["consume_0_1"]
+
+def test_line_reverse():
+    flows = group("h_mn", [[2], [-2], [3], [1]])
+    #lines 0 and 1 run between two nodes, as do lines 2 and 3
+    reverse = family.line_reverse("line_heat", flows, np.array([1, 0, 3, 2]))
+    assert reverse.names() == ["line_heat_0_0", "line_heat_2_0"]
+    assert reverse.violated() == ["line_heat_2_0"]
+    assert family.line_reverse("line_heat", flows, np.array([-1, -1, -1, -1])).names() == []
@@ -0,0 +1,65 @@
+'''
+DemandStore: the TestData read back from a store holds the same series and
+timestamps as the TestData it was written from.
+'''
+
+import os
+import pickle
+import datetime
+
+import numpy as np
+import pytest
+
+test_data_module = pytest.importorskip('class_definition.test_data')
+from dispatch.demand_store import write_demand_store, load_test_data, DemandStore
+
+
+#electric demand of one row, heat demand of nodes with different lengths
+def source_test_data():
+    hours = 72
+    rng = np.random.RandomState(0)
+    timestamp = [datetime.datetime(2009, 1, 1) + datetime.timedelta(hours=h) for h in range(hours)]
+    demand = test_data_module.Demand(e=rng.rand(1, hours)*800, h=[rng.rand(hours)*1000, rng.rand(hours - 24)*500])
+    weather = test_data_module.Weather(irrad_dire_norm=list(rng.rand(hours)), t_db=rng.rand(hours)*30)
+    return test_data_module.TestData(timestamp=timestamp, demand=demand, weather=weather)
+
+
+def test_store_matches_the_source_test_data(tmp_path):
+    source = source_test_data()
+    stored = write_demand_store(str(tmp_path / 'store'), source).test_data()
+    np.testing.assert_array_equal(stored.demand.e, source.demand.e)
+    np.testing.assert_array_equal(stored.demand.h[0], source.demand.h[0])
+    #the shorter row is padded with NaN after its hours
+    np.testing.assert_array_equal(stored.demand.h[1][:48], source.demand.h[1])
+    assert np.all(np.isnan(stored.demand.h[1][48:]))
+    assert len(stored.demand.c) == 0
+    np.testing.assert_array_equal(stored.weather.irrad_dire_norm, source.weather.irrad_dire_norm)
+    np.testing.assert_array_equal(stored.weather.t_db, source.weather.t_db)
+    np.testing.assert_array_equal(stored.timestamp, np.array(source.timestamp, dtype='datetime64[us]'))
+
+def test_horizons_match_the_source_test_data(tmp_path):
+    source = source_test_data()
+    stored = write_demand_store(str(tmp_path / 'store'), source).test_data()
+    start = datetime.datetime(2009, 1, 2, 5)
+    f_ind = source.time_index().horizon(start, 24)
+    assert stored.time_index().horizon(start, 24) == f_ind
+    np.testing.assert_array_equal(stored.demand.e[0, f_ind], source.demand.e[0, f_ind])
+    np.testing.assert_array_equal(stored.demand.h[0][f_ind], source.demand.h[0][f_ind])
+
+def test_series_are_read_only_memmaps(tmp_path):
+    store = write_demand_store(str(tmp_path / 'store'), source_test_data())
+    reopened = DemandStore(store.directory)
+    assert isinstance(reopened.series['demand.e'], np.memmap)
+    with pytest.raises(ValueError):
+        reopened.series['demand.e'][0, 0] = 0
+
+def test_load_test_data(tmp_path):
+    source = source_test_data()
+    directory = str(tmp_path / 'store')
+    write_demand_store(directory, source)
+    file_name = str(tmp_path / 'demand.pickle')
+    with open(file_name, 'wb') as file_object:
+        pickle.dump(source, file_object)
+    for test_data in (load_test_data(directory), load_test_data(file_name)):
+        np.testing.assert_array_equal(test_data.demand.e, source.demand.e)
+    assert os.path.isfile(os.path.join(directory, 'metadata.json'))
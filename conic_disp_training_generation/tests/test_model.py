@@ -0,0 +1,184 @@
+'''
+DispatchModel on a two-node plant: the families of a build, the forecast
+parameters and a feasibility check of the heat and cooling produced at the
+first node reaching the demands of the second.
+'''
+
+import datetime
+
+import numpy as np
+import pytest
+import cvxpy
+
+pytest.importorskip('class_definition.specifiable')
+pytest.importorskip('function.setup.piecewise_fit')
+from class_definition.component import Utility, ElectricGenerator, Heater, ElectricChiller, Solar, ThermalStorage
+from class_definition.generator_struct import Output
+from class_definition.plant_struct import Optimoptions, Network, Location, NetworkDemand, Plant
+from class_definition.test_data import TestData, Demand, Weather
+from dispatch.model import DispatchModel
+from dispatch.solver_config import SolverConfig
+
+
+START = datetime.datetime(2009, 1, 1, 10)
+CAPACITY = np.linspace(0, 1, 11)
+
+
+#generators, boiler, chiller and cold storage at the first node, solar panels and every
+#demand at the second
+def two_node_plant(boiler_size=500., chiller_size=2000., days=2):
+    start = datetime.datetime(2009, 1, 1)
+    elec_utility = Utility(name='Elec Utility', sum_rate_table=np.ones((7, 24))*0.05, win_rate_table=np.ones((7, 24))*0.05,
+                           sum_start_month=6, sum_start_day=1, win_start_month=10, win_start_day=1)
+    gas_utility = Utility(name='Gas Utility', source='ng', size=0, timestamp=[start + datetime.timedelta(days=d) for d in range(days)],
+                          rate=np.ones(days)*5.6)
+    turbine = ElectricGenerator(name='turbine', source='ng', output=Output(capacity=CAPACITY, electricity=0.3*np.sqrt(CAPACITY)),
+                                size=400., start_cost=0, ramp_rate=200.)
+    diesel = ElectricGenerator(name='diesel', source='diesel', output=Output(capacity=CAPACITY, electricity=0.35*np.sqrt(CAPACITY)),
+                               size=200., start_cost=0, ramp_rate=100.)
+    boiler = Heater(name='boiler', output=Output(capacity=CAPACITY, heat=np.ones(len(CAPACITY))*0.85), size=boiler_size,
+                    start_cost=0, ramp_rate=boiler_size)
+    chiller = ElectricChiller(name='chiller', output=Output(capacity=CAPACITY, cooling=4*CAPACITY + 1), size=chiller_size,
+                              start_cost=0, ramp_rate=chiller_size, source='electricity')
+    solar = Solar(name='solar', output=Output(capacity=CAPACITY, electricity=np.ones(len(CAPACITY))), size=30,
+                  eff=0.174, size_m2=200., gen_frac=0.5)
+    cold_storage = ThermalStorage(name='cold_storage', source='cooling', size=1000., charge_eff=1., disch_eff=1., max_dod=0, peak_disch=0.5)
+    generator = [elec_utility, gas_utility, turbine, diesel, boiler, chiller, cold_storage, solar]
+    network = []
+    for m, equipment in enumerate([generator[:-1], [solar]]):
+        demands = {}
+        for carrier in ('electrical', 'district_heat', 'district_cooling'):
+            load = 0 if m == 1 else []
+            demands[carrier] = NetworkDemand({'connections': ['node_{}'.format(1 - m)], 'trans_eff': [], 'trans_limit': [], 'load': load})
+        network.append(Network(gens=True, info_dct=dict(equipment=equipment, name='node_{}'.format(m), location=Location(), **demands)))
+    optimoptions = Optimoptions({'interval': days, 'horizon': 24, 'resolution': 1, 'excess_heat': True, 'mixed_integer': True, 'excess_cool': True})
+    plant = Plant({'name': 'two_nodes', 'generator': generator, 'optimoptions': optimoptions, 'network': network})
+    hours = 24*days
+    test_data = TestData(timestamp=[start + datetime.timedelta(hours=i) for i in range(hours)],
+                         demand=Demand(e=np.ones((1, hours))*100, h=np.ones((1, hours))*800, c=np.ones((1, hours))*1000),
+                         weather=Weather(irrad_dire_norm=np.ones(hours)*0.8, t_db=np.ones(hours)*20))
+    return plant, test_data
+
+def built_model(T=3, network_limits=True, **kwargs):
+    plant, test_data = two_node_plant(**kwargs)
+    model = DispatchModel(T=T, network_limits=network_limits)
+    model.load_plant(plant, test_data)
+    model.build()
+    model.update_forecast(START)
+    return model
+
+
+def test_build_names_the_families_of_the_script():
+    model = built_model()
+    for name in ('boiler_y_consume', 'boiler_x_k_upper', 'boiler_ramp1_up', 'chiller_yp_consume', 'heat_balance', 'line_heat'):
+        assert name in model.families
+    assert model.families['heat_balance'].names()[:2] == ['heat_balance_0_0', 'heat_balance_0_1']
+    assert model.prob.is_dcp(dpp=True)
+
+def test_forecast_fills_the_parameters():
+    model = built_model()
+    np.testing.assert_array_equal(model.parameters['h_demand'].value, [[0, 0, 0], [800, 800, 800]])
+    np.testing.assert_array_equal(model.parameters['pelec_cost'].value, [0.05, 0.05, 0.05])
+    np.testing.assert_array_equal(model.parameters['gas_rate'].value, [5.6, 5.6, 5.6])
+
+#every variable at zero, then the given (components x T) values
+def set_values(model, **values):
+    for name, group in model.groups.items():
+        if group.variable.size > 0:
+            group.variable.value = np.zeros(group.variable.size)
+    for name, value in values.items():
+        model.groups[name].variable.value = np.asarray(value, dtype=float).ravel()
+
+def test_heat_and_cooling_reach_the_other_node():
+    model = built_model()
+    heat = model.topology.district_heat
+    out, back = heat.line_index[(0, 1)], heat.line_index[(1, 0)]
+    h_mn = np.zeros((heat.n_lines, model.T))
+    #the boiler is smaller than the demand and the rest is unserved
+    h_mn[out], h_mn[back] = 500, -500
+    set_values(model, boiler_x=[[500]*3], heat_unserve=[[0]*3, [300]*3], h_mn=h_mn,
+               chiller_x=[[1000]*3], c_mn=[[1000]*3, [-1000]*3])
+    for name in ('heat_balance', 'line_heat', 'cool_balance', 'line_cooling'):
+        assert model.families[name].violated() == []
+    #the demand cannot be met by more heat arriving than leaves
+    h_mn[back] = -800
+    set_values(model, boiler_x=[[500]*3], h_mn=h_mn)
+    assert model.families['heat_balance'].violated() == []
+    assert model.families['line_heat'].violated() == ['line_heat_{}_{}'.format(min(out, back), t) for t in range(3)]
+
+def test_signed_line_coefficients_are_rejected():
+    plant, test_data = two_node_plant()
+    #a signed table counts the flow of a line pair at both of its nodes
+    heat_loss = np.array([[0, 1.], [-1, 0]])
+    with pytest.raises(ValueError):
+        DispatchModel(T=3).load_plant(plant, test_data, heat_loss=heat_loss)
+    model = DispatchModel(T=3)
+    model.load_plant(plant, test_data, heat_loss=np.array([[0, 0.9], [0.95, 0]]))
+    np.testing.assert_array_equal(model.heat_line_loss.toarray(), [[0.9, 0], [0, 0.95]])
+
+def test_units_may_stay_off_in_the_first_hour():
+    model = built_model()
+    set_values(model)
+    for name in ('turbine', 'dieselgen', 'boiler', 'chiller'):
+        assert model.families[name + '_ramp1_up'].violated() == []
+        assert model.families[name + '_ramp1_down'].violated() == []
+    #and reach at most the initial output plus the ramp rate
+    set_values(model, turbine_xp=[[250]*3])
+    assert model.families['turbine_ramp1_up'].violated() == ['turbine_ramp1_up_0']
+
+def test_renewables_at_their_node():
+    model = built_model()
+    np.testing.assert_allclose(model.parameters['renew'].value, [[0]*3, [80]*3])
+
+def test_grid_rows_are_grid_components():
+    model = built_model()
+    assert model.groups['ep_elecfromgrid'].shape == (1, 3)
+    #buying one unit in every hour costs the price of every hour
+    set_values(model, ep_elecfromgrid=[[1]*3])
+    assert model.prob.objective.value == pytest.approx(0.15)
+
+def test_reactive_output_comes_from_the_pieces():
+    model = built_model()
+    #reactive output without any reactive pieces behind it
+    set_values(model, turbine_xq=[[10]*3], dieselgen_xq=[[10]*3])
+    assert model.families['turbine_xq_generate'].violated() == ['turbine_xq_generate_0_{}'.format(t) for t in range(3)]
+    assert model.families['dieselgen_xq_generator'].violated() == ['dieselgen_xq_generator_0_{}'.format(t) for t in range(3)]
+    #and the diesel pieces are bounded in apparent power as the turbine pieces
+    set_values(model, dieselgen_xp_k=[80, 0]*3, dieselgen_xq_k=[80, 0]*3, dieselgen_s_k=[1, 0]*3)
+    assert len(model.families['dieselgen_xp_k_upper'].violated()) == 3
+
+def test_cold_storage_steps_from_the_hour_before():
+    model = built_model()
+    assert model.families['c_storage_init'].names() == ['c_storage_init_0']
+    #charging 100 in every hour from the initial 500
+    set_values(model, c_storage_state=[[600, 700, 800]], c_storage_ch=[[100]*3])
+    assert model.families['c_storage_init'].violated() == []
+    assert model.families['c_storage_state_constraint'].violated() == []
+
+def test_admittance_diagonal_sums_the_neighbors():
+    model = built_model()
+    np.testing.assert_array_equal(np.diag(model.G), [4, 4])
+    np.testing.assert_array_equal(np.diag(model.B), [6, 6])
+
+def test_network_limits():
+    names = ('voltage_limit_lower', 'voltage_limit_upper', 'current_limit', 'voltage_cone')
+    model = built_model()
+    assert all(name in model.families for name in names)
+    assert not any(name in built_model(network_limits=False).families for name in names)
+    #the two lines of the pair each carry a current limit and a cone
+    assert model.families['voltage_cone'].names()[:2] == ['voltage_cone_0_0', 'voltage_cone_0_1']
+    set_values(model, x_m=[[1]*3]*2, y_mn=[[1]*3]*2)
+    assert model.families['voltage_cone'].violated() == []
+    assert model.families['voltage_limit_lower'].violated() == []
+
+def test_unit_commitment_without_a_mixed_integer_solver():
+    model = built_model()
+    #Clarabel takes second order cones but no binaries
+    model.solver_config = SolverConfig(solver='CLARABEL', fallback=(), time_limit=60)
+    assert model.solve() is not None
+    assert model.solve_stats['method'] == 'polish'
+    assert model.solve_stats['mip']['status'] == 'error'
+    assert model.families['heat_balance'].violated() == []
+    model.solver_config.heuristic_fallback = False
+    with pytest.raises(cvxpy.error.SolverError):
+        model.solve()
@@ -0,0 +1,28 @@
+'''
+ProblemCache: a model is compiled for the first solver of its chain, keyed
+on that solver, and read back by the next cold start.
+'''
+
+import os
+import pickle
+
+import pytest
+
+pytest.importorskip('class_definition.specifiable')
+pytest.importorskip('function.setup.piecewise_fit')
+from dispatch.problem_cache import ProblemCache, cache_key
+from test_model import two_node_plant
+
+
+def test_cache_is_keyed_on_the_first_solver_of_the_chain(tmp_path):
+    plant, test_data = two_node_plant()
+    plant_file = str(tmp_path / 'plant.pickle')
+    with open(plant_file, 'wb') as file_object:
+        pickle.dump(plant, file_object)
+    cache = ProblemCache(str(tmp_path / 'cache'))
+    model = cache.load_or_build(plant_file, test_data, T=3)
+    solver = model.solver_config.chain()[0]
+    key = cache_key(plant_file, 3, model.options, solver)
+    assert os.listdir(cache.directory) == [key + '.pickle']
+    assert cache.load_or_build(plant_file, test_data, T=3) is not model
+    assert os.listdir(cache.directory) == [key + '.pickle']
@@ -0,0 +1,68 @@
+'''
+ResultStore: append, grow and reopen round trips, and the columns of the
+solution arrays of variable groups.
+'''
+
+import datetime
+
+import numpy as np
+import pytest
+
+from dispatch.variable_group import MatrixVariableGroup
+from dispatch.result_store import ResultStore, group_columns
+
+
+def hours(start, n):
+    return [start + datetime.timedelta(hours=h) for h in range(n)]
+
+
+def test_append_grow_reopen(tmp_path):
+    directory = str(tmp_path / 'store')
+    store = ResultStore(directory, columns=['a', 'b'], capacity=4)
+    start = datetime.datetime(2009, 1, 1)
+    store.append(hours(start, 3), np.array([[1, 2, 3], [4, 5, 6]]))
+    #the second horizon starts one hour later and does not fit in 4 rows
+    store.append(hours(start + datetime.timedelta(hours=1), 3), {'a': [7, 8, 9]})
+    assert store.capacity == 8 and store.rows == 6
+    store.flush()
+
+    reopened = ResultStore(directory)
+    assert reopened.columns == ['a', 'b'] and reopened.capacity == 8 and reopened.rows == 6
+    np.testing.assert_array_equal(reopened.column('a'), [1, 2, 3, 7, 8, 9])
+    np.testing.assert_array_equal(reopened.column('b')[:3], [4, 5, 6])
+    assert np.all(np.isnan(reopened.column('b')[3:]))
+    np.testing.assert_array_equal(reopened.timestamp[:reopened.rows], np.array(hours(start, 3) + hours(start + datetime.timedelta(hours=1), 3), dtype='datetime64[s]'))
+    #the dispatch carried out is the first hour of every horizon
+    np.testing.assert_array_equal(reopened.column('a', first_hour=True), [1, 7])
+
+    #appending to the reopened store continues after its rows
+    reopened.append(hours(start + datetime.timedelta(hours=2), 1), np.array([[10], [11]]))
+    np.testing.assert_array_equal(ResultStore(directory).column('b')[-1:], [11])
+
+def test_new_store_replaces_the_old_one(tmp_path):
+    directory = str(tmp_path / 'store')
+    ResultStore(directory, columns=['a'], capacity=2).append(hours(datetime.datetime(2009, 1, 1), 2), np.array([[1, 2]]))
+    store = ResultStore(directory, columns=['a', 'b'], capacity=2, new=True)
+    assert store.rows == 0 and store.columns == ['a', 'b']
+
+def test_store_needs_columns(tmp_path):
+    with pytest.raises(ValueError):
+        ResultStore(str(tmp_path / 'missing'))
+
+def test_solution_columns(tmp_path):
+    groups = {'turbine_xp': MatrixVariableGroup('turbine_xp', indexes=(range(2), range(3))),
+              'turbine_s_k': MatrixVariableGroup('turbine_s_k', indexes=(range(2), range(3)), pieces=[2, 1])}
+    columns, layout = group_columns(groups)
+    assert columns == ['turbine_xp_0', 'turbine_xp_1', 'turbine_s_k_0_0', 'turbine_s_k_0_1', 'turbine_s_k_1']
+    assert layout == {'turbine_xp': [1, 1], 'turbine_s_k': [2, 1]}
+
+    store = ResultStore(str(tmp_path / 'store'), columns=columns + ['objective'], layout=layout)
+    s_k = np.full((2, 3, 2), np.nan)
+    s_k[0] = [[1, 0], [0, 1], [0, 0]]
+    s_k[1, :, 0] = [1, 1, 0]
+    solution = {'turbine_xp': np.array([[1., 2, 3], [4, 5, 6]]), 'turbine_s_k': s_k}
+    store.append_solution(hours(datetime.datetime(2009, 1, 1), 3), solution, extra={'objective': [9, 9, 9]})
+    np.testing.assert_array_equal(store.column('turbine_xp_1'), [4, 5, 6])
+    np.testing.assert_array_equal(store.column('turbine_s_k_0_1'), [0, 1, 0])
+    np.testing.assert_array_equal(store.column('turbine_s_k_1'), [1, 1, 0])
+    np.testing.assert_array_equal(store.column('objective'), [9, 9, 9])
@@ -0,0 +1,51 @@
+'''
+SolverConfig: options of each solver and the time limit shared by the
+solvers of the chain.
+'''
+
+import time
+
+import cvxpy
+import pytest
+
+from dispatch.solver_config import SolverConfig
+
+
+#problem that every solver takes some time to fail on, recording the options
+class FailingProblem(object):
+    value = None
+    solver_stats = None
+    compilation_time = None
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.calls = []
+
+    def solve(self, solver, **options):
+        self.calls.append((solver, options))
+        time.sleep(self.seconds)
+        raise cvxpy.error.SolverError("{} failed".format(solver))
+
+
+def test_options_take_the_limits():
+    config = SolverConfig(time_limit=60, mip_gap=1e-3, threads=2, solver_options={'GUROBI': {'NumericFocus': 3}})
+    assert config.options('GUROBI') == {'TimeLimit': 60, 'MIPGap': 1e-3, 'Threads': 2, 'NumericFocus': 3}
+    assert config.options('HIGHS', 5) == {'time_limit': 5, 'mip_rel_gap': 1e-3, 'threads': 2}
+    assert SolverConfig().options('SCS') == {}
+
+def test_time_limit_is_shared_by_the_chain():
+    config = SolverConfig(solver='CLARABEL', fallback=('SCS',), time_limit=10)
+    prob = FailingProblem(0.05)
+    with pytest.raises(cvxpy.error.SolverError):
+        config.solve(prob)
+    (first, first_options), (second, second_options) = prob.calls
+    assert (first, second) == ('CLARABEL', 'SCS')
+    assert 9.9 < first_options['time_limit'] <= 10
+    assert second_options['time_limit_secs'] <= first_options['time_limit'] - 0.05
+
+def test_no_solver_starts_after_the_deadline():
+    config = SolverConfig(solver='CLARABEL', fallback=('SCS',))
+    prob = FailingProblem(0.05)
+    with pytest.raises(cvxpy.error.SolverError, match='time limit'):
+        config.solve(prob, deadline=time.perf_counter())
+    assert prob.calls == []
@@ -0,0 +1,56 @@
+'''
+DispatchState: the state handed from one horizon to the next, read from
+the solution arrays of DispatchModel.extract.
+'''
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from dispatch.state import DispatchState
+
+
+def units(*sizes):
+    return [SimpleNamespace(size=size) for size in sizes]
+
+
+def test_initial_state_from_sizes():
+    state = DispatchState(turbine=units(1000, 800), boiler=units(2000), e_storage=units(500))
+    np.testing.assert_array_equal(state.output['turbine'], [0, 0])
+    np.testing.assert_array_equal(state.status['turbine'], [False, False])
+    np.testing.assert_array_equal(state.storage['e_storage'], [250])
+    assert state.output['dieselgen'].shape == (0,)
+    running = DispatchState(turbine=units(1000), output_fraction=0.5, state_of_charge=0.2, h_storage=units(100))
+    np.testing.assert_array_equal(running.output['turbine'], [500])
+    np.testing.assert_array_equal(running.status['turbine'], [True])
+    np.testing.assert_array_equal(running.storage['h_storage'], [20])
+
+def test_update_from_solution():
+    state = DispatchState(turbine=units(1000, 800), e_storage=units(500))
+    solution = {'turbine_xp': np.array([[400, 500], [0, 300]]),
+                #pieces a component does not have are NaN
+                'turbine_s_k': np.array([[[0, 1], [1, 0]], [[0, np.nan], [1, np.nan]]]),
+                'e_storage_state': np.array([[260, 270]]),
+                'boiler_x': None}
+    state.update_from_solution(solution)
+    np.testing.assert_array_equal(state.output['turbine'], [400, 0])
+    np.testing.assert_array_equal(state.status['turbine'], [True, False])
+    np.testing.assert_array_equal(state.storage['e_storage'], [260])
+    state.update_from_solution(solution, hour=1)
+    np.testing.assert_array_equal(state.output['turbine'], [500, 300])
+    np.testing.assert_array_equal(state.status['turbine'], [True, True])
+
+def test_initial_conditions_are_copies():
+    state = DispatchState(turbine=units(1000), c_storage=units(400))
+    initial = state.initial_conditions()
+    assert sorted(initial) == ['boiler', 'c_storage', 'chiller', 'dieselgen', 'e_storage', 'h_storage', 'turbine']
+    initial['c_storage'][0] = 0
+    np.testing.assert_array_equal(state.storage['c_storage'], [200])
+
+def test_copy_is_independent():
+    state = DispatchState(turbine=units(1000))
+    copy = state.copy()
+    state.update(output={'turbine': [700]}, status={'turbine': [1]})
+    np.testing.assert_array_equal(copy.output['turbine'], [0])
+    np.testing.assert_array_equal(copy.status['turbine'], [False])
+    assert state.status['turbine'].dtype == bool
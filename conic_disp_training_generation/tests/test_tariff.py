@@ -0,0 +1,108 @@
+'''
+Tariff prices against the per-timestamp find_utility_pricing of the
+dispatch scripts, on the WSU electric utility of wsu_plant_pickle_file_03_mod3.
+'''
+
+import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+from class_definition.tariff import Tariff
+
+
+#setup_elec_utility of wsu_plant_pickle_file_03_mod3: tier 2 from 8:00 to
+#20:00 on every day, tier 0 otherwise
+def wsu_utility():
+    rt_summer = [[0]*24]*7
+    i_day = 0
+    for day in rt_summer:
+        rt_summer[i_day][8:20] = [2]*12
+        i_day = i_day+1
+    r_summer = np.array([[0.04, 0], [0.0551, 0], [0.06, 0]])
+    r_winter = np.array([[0.03, 0], [0.0551, 0], [0.07, 0]])
+    return SimpleNamespace(sum_rate_table=rt_summer, win_rate_table=rt_summer, sum_rates=r_summer, win_rates=r_winter,
+                           sum_start_month=6, sum_start_day=1, win_start_month=10, win_start_day=1)
+
+#find_utility_pricing of cvx_conic_opt_test_multinode_ac_04_iterate and _05_PID
+def find_utility_pricing(u, date_stamp):
+    weekday = date_stamp.weekday()
+    hour = date_stamp.hour
+    month = date_stamp.month
+    day = date_stamp.day
+    if month > u.sum_start_month and month < u.win_start_month:
+        rate = u.sum_rates[u.sum_rate_table[weekday][hour],0]
+    elif month < u.sum_start_month or month > u.win_start_month:
+        rate = u.win_rates[u.win_rate_table[weekday][hour],0]
+    elif month == u.sum_start_month:
+        if day >= u.sum_start_day:
+            rate = u.sum_rates[u.sum_rate_table[weekday][hour],0]
+        else:
+            rate = u.win_rates[u.win_rate_table[weekday][hour],0]
+    elif month == u.win_start_month:
+        if day >= u.win_start_day:
+            rate = u.win_rates[u.win_rate_table[weekday][hour],0]
+        else:
+            rate = u.sum_rates[u.sum_rate_table[weekday][hour],0]
+    return rate
+
+#find_utility_pricing of the other scripts, the table entries are prices
+def find_table_pricing(u, date_stamp):
+    summer = u.sum_start_month < date_stamp.month < u.win_start_month\
+        or (date_stamp.month == u.sum_start_month and date_stamp.day >= u.sum_start_day)\
+        or (date_stamp.month == u.win_start_month and date_stamp.day < u.win_start_day)
+    table = u.sum_rate_table if summer else u.win_rate_table
+    return table[date_stamp.weekday()][date_stamp.hour]
+
+
+def test_wsu_tiered_prices_match_find_utility_pricing():
+    u = wsu_utility()
+    start = datetime.datetime(2009, 1, 1)
+    hours = 4*365*24 + 24
+    expected = [find_utility_pricing(u, start + datetime.timedelta(hours=h)) for h in range(hours)]
+    np.testing.assert_array_equal(Tariff(u, tiered=True).prices(start, hours), expected)
+
+def test_wsu_tiered_prices():
+    tariff = Tariff(wsu_utility(), tiered=True)
+    summer = tariff.prices(datetime.datetime(2011, 7, 4), 24)
+    winter = tariff.prices(datetime.datetime(2011, 1, 4), 24)
+    np.testing.assert_array_equal(summer, [0.04]*8 + [0.06]*12 + [0.04]*4)
+    np.testing.assert_array_equal(winter, [0.03]*8 + [0.07]*12 + [0.03]*4)
+
+def test_season_boundaries():
+    u = wsu_utility()
+    tariff = Tariff(u, tiered=True)
+    for date in (datetime.datetime(2010, 5, 31, 12), datetime.datetime(2010, 6, 1, 12),
+                 datetime.datetime(2010, 9, 30, 12), datetime.datetime(2010, 10, 1, 12)):
+        assert tariff.prices(date, 1)[0] == find_utility_pricing(u, date)
+
+def test_untiered_table_prices():
+    rate_table = np.ones((7, 24))*0.0551
+    rate_table[1:6, 8:20] = 3*0.0551
+    u = SimpleNamespace(sum_rate_table=rate_table, win_rate_table=rate_table/2,
+                        sum_start_month=6, sum_start_day=15, win_start_month=10, win_start_day=1)
+    start = datetime.datetime(2009, 12, 25)
+    hours = 400*24
+    expected = [find_table_pricing(u, start + datetime.timedelta(hours=h)) for h in range(hours)]
+    np.testing.assert_array_equal(Tariff(u).prices(start, hours), expected)
+
+def test_horizon_prices():
+    tariff = Tariff(wsu_utility(), tiered=True)
+    horizon = tariff.horizon(datetime.datetime(2011, 7, 4), 24)
+    np.testing.assert_allclose(horizon['qelec_cost'], 0.2*horizon['pelec_cost'])
+    np.testing.assert_allclose(horizon['pselback_rate'], -0.5*horizon['pelec_cost'])
+    np.testing.assert_allclose(horizon['qselback_rate'], -horizon['qelec_cost'])
+
+def test_prices_follow_changed_rate_tables():
+    u = wsu_utility()
+    tariff = Tariff(u, tiered=True)
+    date = datetime.datetime(2011, 7, 4, 12)
+    assert tariff.prices(date, 1)[0] == 0.06
+    u.sum_rates[2, 0] = 0.08
+    assert tariff.prices(date, 1)[0] == 0.08
+    u.sum_rate_table[0][12] = 1
+    assert tariff.prices(date, 1)[0] == 0.0551
+    u.sum_start_month = 8
+    assert tariff.prices(date, 1)[0] == 0.0551
+    u.win_rates = np.array([[0.03, 0], [0.05, 0], [0.07, 0]])
+    assert tariff.prices(date, 1)[0] == 0.05
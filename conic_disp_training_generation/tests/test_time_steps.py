@@ -0,0 +1,46 @@
+'''
+Time steps of a horizon: step lengths of each spacing, step starts, step
+means and the ramp hours between steps.
+'''
+
+import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from dispatch.time_steps import step_hours, plant_steps, step_starts, step_mean, ramp_hours
+
+
+def test_constant_steps():
+    np.testing.assert_array_equal(step_hours(), np.ones(24))
+    np.testing.assert_array_equal(step_hours(10, 3), [3, 3, 3, 1])
+
+def test_linear_steps():
+    np.testing.assert_array_equal(step_hours(24, 1, 'linear', 4), [1, 1, 1, 1, 2, 3, 4, 5, 6])
+
+def test_logarithm_steps():
+    np.testing.assert_array_equal(step_hours(48, 1, 'logarithm', 6), [1, 1, 1, 1, 1, 1, 2, 4, 8, 16, 12])
+
+def test_manual_steps():
+    np.testing.assert_array_equal(step_hours(manual=[1, 2, 4, 8], t_spacing='manual'), [1, 1, 2, 4])
+    with pytest.raises(ValueError):
+        step_hours(manual=[1, 1, 4], t_spacing='manual')
+
+def test_unknown_spacing():
+    with pytest.raises(ValueError):
+        step_hours(24, 1, 'quadratic')
+
+def test_plant_steps():
+    optimoptions = SimpleNamespace(horizon=12, resolution=2, t_spacing='constant')
+    np.testing.assert_array_equal(plant_steps(optimoptions), [2, 2, 2, 2, 2, 2])
+
+def test_step_starts_and_means():
+    dt = np.array([1, 1, 2, 4])
+    start = datetime.datetime(2009, 1, 1, 6)
+    assert step_starts(start, dt) == [start + datetime.timedelta(hours=h) for h in (0, 1, 2, 4)]
+    hourly = np.vstack((np.arange(8, dtype=float), np.ones(8)))
+    np.testing.assert_array_equal(step_mean(hourly, dt), [[0, 1, 2.5, 5.5], [1, 1, 1, 1]])
+
+def test_ramp_hours():
+    np.testing.assert_array_equal(ramp_hours([1, 1, 2, 4]), [1, 1.5, 3])
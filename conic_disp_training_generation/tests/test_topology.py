@@ -0,0 +1,57 @@
+'''
+Network topology index on a small network of SimpleNamespace nodes: lines,
+reverse lines, neighbors, incidence and the component maps.
+'''
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from dispatch.topology import NetworkTopology
+
+
+#a - b - c on every carrier, c also lists a substation outside the
+#network, the district heat network leaves b out
+def line_network():
+    def node(name, connections, heat, equipment):
+        return SimpleNamespace(name=name, equipment=[SimpleNamespace(name=e) for e in equipment],
+                               electrical=SimpleNamespace(connections=connections),
+                               district_heat=SimpleNamespace(connections=heat),
+                               district_cooling=SimpleNamespace(connections=connections))
+    return [node('a', ['b'], ['c'], ['GT1', 'Grid']),
+            node('b', ['c', 'a'], [], ['Boiler']),
+            node('c', ['b', 'substation'], ['a'], ['GT2', 'Chiller'])]
+
+
+def test_lines_and_reverse():
+    electrical = NetworkTopology(line_network()).electrical
+    assert electrical.lines_by_node == [[0], [1, 2], [3, 4]]
+    np.testing.assert_array_equal(electrical.line_from, [0, 1, 1, 2, 2])
+    np.testing.assert_array_equal(electrical.line_to, [1, 2, 0, 1, -1])
+    np.testing.assert_array_equal(electrical.reverse, [2, 3, 0, 1, -1])
+    assert electrical.neighbors == [[1], [0, 2], [1]]
+
+def test_carriers_are_indexed_separately():
+    heat = NetworkTopology(line_network()).district_heat
+    assert heat.nodes == [0, 2]
+    np.testing.assert_array_equal(heat.reverse, [1, 0])
+
+def test_incidence_and_loss_matrices():
+    electrical = NetworkTopology(line_network()).electrical
+    incidence = electrical.incidence().toarray()
+    np.testing.assert_array_equal(incidence[:, 0], [1, -1, 0])
+    #the line to the substation only leaves its node
+    np.testing.assert_array_equal(incidence[:, 4], [0, 0, 1])
+    np.testing.assert_array_equal(electrical.outgoing().toarray().sum(axis=1), [1, 2, 2])
+    loss = electrical.loss_matrix([0.5, 1, 2, 3, 4]).toarray()
+    np.testing.assert_array_equal(loss[:, 2], [0, 2, 0])
+    np.testing.assert_array_equal(loss.sum(axis=0), [0.5, 1, 2, 3, 4])
+    table = np.arange(9, dtype=float).reshape(3, 3)
+    #b lists c before a, the line to the substation has no entry
+    np.testing.assert_array_equal(electrical.line_coefficients(table), [1, 5, 3, 7, 0])
+
+def test_component_maps():
+    topology = NetworkTopology(line_network())
+    turbines = [SimpleNamespace(name='GT1'), SimpleNamespace(name='GT2')]
+    assert topology.components_by_node(turbines) == [[0], [], [1]]
+    np.testing.assert_array_equal(topology.component_incidence(turbines).toarray(), [[1, 0], [0, 0], [0, 1]])
@@ -0,0 +1,69 @@
+'''
+Variable groups: RANGE lookups, piecewise layout, warm start shifts and
+solution arrays of MatrixVariableGroup and VariableGroup.
+'''
+
+import numpy as np
+
+from dispatch.variable_group import MatrixVariableGroup, VariableGroup, RANGE, constant_zero, shift_hours, piece_array
+
+
+def test_shift_hours():
+    values = np.arange(8).reshape(2, 4)
+    np.testing.assert_array_equal(shift_hours(values), [[1, 2, 3, 3], [5, 6, 7, 7]])
+    np.testing.assert_array_equal(shift_hours(values, 2), [[2, 3, 3, 3], [6, 7, 7, 7]])
+
+def test_piece_array_pads_missing_pieces():
+    #two components of three hours, with two and one pieces
+    values = np.arange(9, dtype=float)
+    array = piece_array(values, [2, 2, 2, 1, 1, 1], (2, 3))
+    assert array.shape == (2, 3, 2)
+    np.testing.assert_array_equal(array[0], [[0, 1], [2, 3], [4, 5]])
+    np.testing.assert_array_equal(array[1, :, 0], [6, 7, 8])
+    assert np.all(np.isnan(array[1, :, 1]))
+
+def test_range_lookup_matches_variable_group():
+    matrix = MatrixVariableGroup("x", indexes=(range(3), range(4)), lower_bound_func=constant_zero)
+    legacy = VariableGroup("x", indexes=(range(3), range(4)), lower_bound_func=constant_zero)
+    matrix.variable.value = np.arange(12, dtype=float)
+    for key, var in legacy.variables.items():
+        var.value = np.array([matrix.position(key)], dtype=float)
+    for key in ((1, RANGE), (RANGE, 2), (RANGE,)):
+        assert [float(v.value[0]) for v in matrix[key]] == [float(v.value[0]) for v in legacy[key]]
+    assert float(matrix[2, 3].value[0]) == 11
+
+def test_piecewise_offsets_and_items():
+    group = MatrixVariableGroup("x_k", indexes=(range(2), range(3)), pieces=[2, 3])
+    np.testing.assert_array_equal(group.offsets, [0, 2, 4, 6, 9, 12, 15])
+    assert group[1, 0].shape == (3,)
+    group.variable.value = np.arange(15, dtype=float)
+    np.testing.assert_array_equal(group[1, 2].value, [12, 13, 14])
+    np.testing.assert_array_equal(group.array()[0, :, 1], [1, 3, 5])
+
+def test_binary_states_follow_the_pieces():
+    #one state per piecewise section, so the status constraint
+    #1 >= sum(s_k) lets a unit run in one section at a time
+    s_k = MatrixVariableGroup("s_k", indexes=(range(2), range(3)), is_binary_var=True, pieces=[2, 3])
+    assert s_k.variable.attributes['boolean']
+    assert s_k[0, 1].shape == (2,) and s_k[1, 1].shape == (3,)
+
+def test_shift_moves_every_component_one_hour():
+    group = MatrixVariableGroup("x_k", indexes=(range(2), range(3)), pieces=[2, 1])
+    group.variable.value = np.arange(9, dtype=float)
+    group.shift()
+    np.testing.assert_array_equal(group.variable.value, [2, 3, 4, 5, 4, 5, 7, 8, 8])
+    legacy = VariableGroup("x", indexes=(range(1), range(3)))
+    for t in range(3):
+        legacy[0, t].value = np.array([t], dtype=float)
+    legacy.shift()
+    assert [float(legacy[0, t].value[0]) for t in range(3)] == [1, 2, 2]
+
+def test_shift_keeps_binary_states():
+    binary = MatrixVariableGroup("s", indexes=(range(2), range(3)), is_binary_var=True)
+    binary.variable.value = np.array([0, 1, 1, 1, 0, 0])
+    binary.shift()
+    np.testing.assert_array_equal(binary.variable.value, [1, 1, 1, 0, 0, 0])
+
+def test_unsolved_group_has_no_array():
+    assert MatrixVariableGroup("x", indexes=(range(2), range(3))).array() is None
+    assert VariableGroup("x", indexes=(range(2), range(3))).array() is None
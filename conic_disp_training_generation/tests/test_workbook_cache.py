@@ -0,0 +1,104 @@
+'''
+Workbook cache: sheet arrays of xlrd sheets, and the .npz cache that is
+read instead of the workbook until the workbook changes. xlrd is replaced
+by sheets of fixed cells, the workbooks are files of any content.
+'''
+
+import os
+
+import numpy as np
+import xlrd
+
+from dispatch import workbook_cache
+from dispatch.workbook_cache import sheet_array, load_workbook, load_cache, cache_file, file_digest
+
+
+class Sheet(object):
+    '''Cells of one sheet, given by column.'''
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.ncols = len(columns)
+        self.nrows = max(len(column) for column in columns)
+
+    def col_values(self, col):
+        return [value for value, _ in self.columns[col]]
+
+    def col_types(self, col):
+        return [cell_type for _, cell_type in self.columns[col]]
+
+
+class Workbook(object):
+    def __init__(self, sheets):
+        self.sheets = sheets
+        self.nsheets = len(sheets)
+
+    def sheet_by_index(self, i):
+        return self.sheets[i]
+
+
+#a header row and two rows of numbers, dates and an empty cell
+def demand_sheet(scale=1.0):
+    return Sheet([[('time', xlrd.XL_CELL_TEXT), (39814.0, xlrd.XL_CELL_DATE), (39814.5, xlrd.XL_CELL_DATE)],
+                  [('kW', xlrd.XL_CELL_TEXT), (scale*500.0, xlrd.XL_CELL_NUMBER), ('', xlrd.XL_CELL_EMPTY)]])
+
+#counts the workbooks opened by xlrd
+def fake_xlrd(monkeypatch, workbooks):
+    opened = []
+    def open_workbook(file_name):
+        opened.append(file_name)
+        return workbooks[file_name]
+    monkeypatch.setattr(xlrd, 'open_workbook', open_workbook)
+    return opened
+
+
+def test_sheet_array():
+    array = sheet_array(demand_sheet())
+    assert array.shape == (3, 2)
+    np.testing.assert_array_equal(array[1:, 0], [39814.0, 39814.5])
+    assert array[1, 1] == 500
+    assert np.isnan(array[0, 0]) and np.isnan(array[2, 1])
+
+def test_load_workbook_reads_the_cache(tmp_path, monkeypatch):
+    file_name = str(tmp_path / 'demand.xlsx')
+    with open(file_name, 'wb') as file_object:
+        file_object.write(b'version 1')
+    opened = fake_xlrd(monkeypatch, {file_name: Workbook([demand_sheet(), Sheet([[(1.0, xlrd.XL_CELL_BOOLEAN)]])])})
+    sheets = load_workbook(file_name)
+    assert len(sheets) == 2 and os.path.isfile(cache_file(file_name))
+    cached = load_workbook(file_name)
+    assert len(opened) == 1
+    for sheet, cached_sheet in zip(sheets, cached):
+        np.testing.assert_array_equal(sheet, cached_sheet)
+
+def test_cache_is_invalidated_when_the_workbook_changes(tmp_path, monkeypatch):
+    file_name = str(tmp_path / 'demand.xlsx')
+    with open(file_name, 'wb') as file_object:
+        file_object.write(b'version 1')
+    workbooks = {file_name: Workbook([demand_sheet()])}
+    opened = fake_xlrd(monkeypatch, workbooks)
+    load_workbook(file_name)
+    old_digest = file_digest(file_name)
+
+    with open(file_name, 'wb') as file_object:
+        file_object.write(b'version 2')
+    workbooks[file_name] = Workbook([demand_sheet(scale=2.0)])
+    assert load_cache(cache_file(file_name), file_digest(file_name)) is None
+    assert load_workbook(file_name)[0][1, 1] == 1000
+    assert len(opened) == 2
+    #the cache now holds the new workbook only
+    assert load_cache(cache_file(file_name), old_digest) is None
+    assert load_cache(cache_file(file_name), file_digest(file_name))[0][1, 1] == 1000
+
+def test_cache_dir(tmp_path, monkeypatch):
+    file_name = str(tmp_path / 'dispatch.xlsx')
+    with open(file_name, 'wb') as file_object:
+        file_object.write(b'workbook')
+    fake_xlrd(monkeypatch, {file_name: Workbook([demand_sheet()])})
+    cache_dir = str(tmp_path / 'cache')
+    load_workbook(file_name, cache_dir=cache_dir)
+    assert os.path.isfile(os.path.join(cache_dir, 'dispatch.xlsx.npz'))
+    assert not os.path.isfile(cache_file(file_name))
+
+def test_missing_cache():
+    assert load_cache(os.path.join(os.path.dirname(workbook_cache.__file__), 'missing.npz'), 'digest') is None